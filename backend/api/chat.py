@@ -1,13 +1,14 @@
 """V1 chat endpoint - handles intent classification, PII masking, SQL pipeline, and general chat."""
 import re
 import time
+import asyncio
 import logging
-from typing import Optional, List, Tuple
+from typing import Callable, Dict, Optional, List, Tuple
 from pydantic import BaseModel
 from fastapi import APIRouter, HTTPException
 
 from backend.auth.jwt_handler import verify_token
-from backend.core.intent_router import classify_intent
+from backend.core.intent_router import GENERAL_PATTERNS, classify_intent
 from backend.core.query_rewriter import rewrite_query, needs_rewriting
 from backend.core.conversation_manager import ConversationManager, get_user_conversations
 from backend.sql.sql_pipeline import SQLPipeline
@@ -142,6 +143,7 @@ class ChatResponse(BaseModel):
     suggestions: Optional[List[str]] = None
     follow_up_question: Optional[str] = None
     processing_time_ms: int
+    stage_timings_ms: Optional[Dict[str, int]] = None
 
 
 class FeedbackRequest(BaseModel):
@@ -150,6 +152,22 @@ class FeedbackRequest(BaseModel):
     comment: Optional[str] = None
 
 
+async def _run_stage(timings: Dict[str, int], name: str, fn: Callable, *args, **kwargs):
+    """Run a blocking stage in a worker thread and record how long it took."""
+    stage_start = time.time()
+    try:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    finally:
+        timings[name] = int((time.time() - stage_start) * 1000)
+
+
+def _mask_user_input(message: str):
+    """PII settings and the masked message (both read the PII config)."""
+    pii_settings = get_pii_settings()
+    masked_query, pii_map = mask_pii(message)
+    return pii_settings, masked_query, pii_map
+
+
 @router.post("/message", response_model=ChatResponse)
 async def send_message(request: ChatRequest, token: str):
     """Process a chat message and return response."""
@@ -164,13 +182,19 @@ async def send_message(request: ChatRequest, token: str):
     conv_manager = ConversationManager(token_data.user_id)
     conv_id = conv_manager.get_or_create_conversation(request.conversation_id)
 
-    # Get conversation history
-    history = conv_manager.get_recent_turns(5)
-
     logger.info(f"V1 request: conv={conv_id} query=\"{request.message[:120]}\"")
+    timings: Dict[str, int] = {}
+
+    # Stages run as a small DAG - independent ones concurrently:
+    #   history ─┬─ save user message (off the critical path) ──┐
+    #   masking ─┴─ rewrite ─┬─ intent ─────────────────────────┴─ route
+    #                        └─ schema retrieval (speculative) ─┘
+    history, (pii_settings, masked_query, pii_map) = await asyncio.gather(
+        _run_stage(timings, "history", conv_manager.get_recent_turns, 5),
+        _run_stage(timings, "pii_masking", _mask_user_input, request.message),
+    )
 
     # PII masking with audit logging
-    pii_settings = get_pii_settings()
     pii_log_enabled = pii_settings.get('log_enabled', True)
 
     if pii_log_enabled:
@@ -178,7 +202,6 @@ async def send_message(request: ChatRequest, token: str):
         pii_logger.info(f"[PII] PII masking enabled: {pii_settings.get('enabled', True)}")
         pii_logger.info(f"[PII] STEP 1 - User Input: \"{request.message}\"")
 
-    masked_query, pii_map = mask_pii(request.message)
     if pii_map:
         logger.info(f"V1 PII masked: {len(pii_map)} items")
         if pii_log_enabled:
@@ -190,22 +213,38 @@ async def send_message(request: ChatRequest, token: str):
         pii_logger.info(f"[PII] STEP 2 - No PII detected in input")
         pii_logger.info(f"[PII] STEP 3 - Input to LLM (unchanged): \"{masked_query[:200]}\"")
 
+    # History is read, so the user message can be saved without showing up in it
+    save_user_message = asyncio.create_task(_run_stage(
+        timings, "save_user_message", conv_manager.add_message,
+        role="user", content=request.message, pii_masked=len(pii_map) > 0
+    ))
+
     # Query rewriting for follow-ups
     processed_query = masked_query
     if history and needs_rewriting(masked_query):
-        processed_query = rewrite_query(masked_query, history)
+        processed_query = await _run_stage(timings, "rewrite", rewrite_query, masked_query, history)
         logger.info(f"V1 rewritten query: \"{processed_query[:120]}\"")
 
+    # Check for meta-queries (about database structure) - pure regex
+    is_meta, meta_type = check_meta_query(processed_query)
+
+    # Speculative schema retrieval overlaps intent classification; discarded unless DATA
+    sql_pipeline = SQLPipeline()
+    schema_task = None
+    if (settings.V1_SPECULATIVE_SCHEMA_RETRIEVAL and not is_meta
+            and not GENERAL_PATTERNS.match(processed_query.strip())):
+        schema_task = asyncio.create_task(
+            _run_stage(timings, "schema_retrieval", sql_pipeline.retrieve_schemas, processed_query)
+        )
+        # Unused results (GENERAL intent, clarification) must not log "exception never retrieved"
+        schema_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
     # Intent classification
-    intent_result = classify_intent(processed_query, history)
+    intent_result = await _run_stage(timings, "intent", classify_intent, processed_query, history)
     logger.info(f"V1 intent: {intent_result.intent} confidence={intent_result.confidence}")
 
-    # Save user message
-    user_msg_id = conv_manager.add_message(
-        role="user",
-        content=request.message,
-        pii_masked=len(pii_map) > 0
-    )
+    # Assistant messages must be saved after the user message
+    await save_user_message
 
     # Check if we need clarification
     if intent_result.follow_up_question:
@@ -217,6 +256,7 @@ async def send_message(request: ChatRequest, token: str):
             confidence=intent_result.confidence,
             processing_time_ms=int((time.time() - start_time) * 1000)
         )
+        logger.info(f"V1 stage timings: {timings}")
 
         return ChatResponse(
             response=intent_result.follow_up_question,
@@ -225,7 +265,8 @@ async def send_message(request: ChatRequest, token: str):
             conversation_id=conv_id,
             message_id=assistant_msg_id,
             follow_up_question=intent_result.follow_up_question,
-            processing_time_ms=int((time.time() - start_time) * 1000)
+            processing_time_ms=int((time.time() - start_time) * 1000),
+            stage_timings_ms=timings
         )
 
     # Route to appropriate pipeline
@@ -235,9 +276,6 @@ async def send_message(request: ChatRequest, token: str):
     sources = None
     suggestions = None
 
-    # Check for meta-queries (about database structure) first
-    is_meta, meta_type = check_meta_query(processed_query)
-
     if is_meta and meta_type:
         # Handle meta-queries directly without SQL generation
         response_text, sql_results = get_meta_response(meta_type)
@@ -262,9 +300,16 @@ async def send_message(request: ChatRequest, token: str):
                     context_parts.append(f"Assistant: {content[:80]}")
             conversation_context = "\n".join(context_parts)
 
+        schemas = None
+        if schema_task is not None:
+            try:
+                schemas = await schema_task
+            except Exception as e:
+                logger.warning(f"V1 speculative schema retrieval failed, retrying in pipeline: {e}")
+
         try:
-            sql_pipeline = SQLPipeline()
-            result = sql_pipeline.run(processed_query, context=conversation_context)
+            result = await _run_stage(timings, "sql_pipeline", sql_pipeline.run, processed_query,
+                                      context=conversation_context, schemas=schemas)
 
             if result["success"]:
                 response_text = result.get("summary") or ""
@@ -314,7 +359,8 @@ async def send_message(request: ChatRequest, token: str):
                 query=processed_query
             )
 
-            response_text = client.chat_completion(
+            response_text = await _run_stage(
+                timings, "general_chat", client.chat_completion,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.7,
                 max_tokens=500,
@@ -338,6 +384,7 @@ async def send_message(request: ChatRequest, token: str):
     logger.info(f"V1 response: intent={intent_result.intent} has_sql={sql_query is not None} "
                 f"has_results={sql_results is not None} suggestions={len(suggestions) if suggestions else 0} "
                 f"time={elapsed_ms}ms")
+    logger.info(f"V1 stage timings: {timings}")
 
     # Log full PII pipeline trace (dedicated log file)
     if intent_result.intent == "DATA" and sql_query and not sql_query.startswith("-- Meta"):
@@ -380,7 +427,8 @@ async def send_message(request: ChatRequest, token: str):
         sql_results=sql_results,
         sources=sources,
         suggestions=suggestions,
-        processing_time_ms=int((time.time() - start_time) * 1000)
+        processing_time_ms=int((time.time() - start_time) * 1000),
+        stage_timings_ms=timings
     )
 
 
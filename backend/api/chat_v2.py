@@ -3,14 +3,22 @@ V2 chat endpoint - uses the full-schema pipeline for SQL generation.
 Handles greetings, PII masking, and routes queries through the V2 pipeline.
 """
 
+import json
 import time
+import asyncio
+import queue
 import logging
+import threading
 from typing import Optional, List
 from pydantic import BaseModel
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
+from backend.config import settings
 from backend.auth.jwt_handler import verify_token
+from backend.core.deadline import Deadline
 from backend.sql.pipeline_v2 import get_sql_pipeline
+from backend.sql.summary_jobs import get_summary_job_manager
 from backend.pii.masker import mask_pii, unmask_pii, get_pii_settings
 from backend.pii.pipeline_logger import log_pii_trace
 from backend.pii.column_masker import get_column_mask_settings
@@ -27,6 +35,8 @@ class ChatRequest(BaseModel):
     message: str
     conversation_id: Optional[str] = None
     context: Optional[str] = None  # Previous conversation context
+    async_summary: bool = False  # Return rows immediately; poll /summary/{summary_job_id} for the summary
+    previous_sql: Optional[str] = None  # SQL of the answer being refined (defaults to the conversation's last one)
 
 
 class ChatResponse(BaseModel):
@@ -40,6 +50,13 @@ class ChatResponse(BaseModel):
     suggestions: Optional[List[str]] = None
     processing_time_ms: int
     error: Optional[str] = None
+    summary_job_id: Optional[str] = None  # Set when the summary is still being generated (async_summary)
+
+
+class BatchRequest(BaseModel):
+    questions: List[str]
+    context: Optional[str] = None  # Shared context for every question
+    max_concurrency: Optional[int] = None  # Capped at BATCH_MAX_CONCURRENCY
 
 
 # Simple in-memory conversation store (replace with DB in production)
@@ -61,7 +78,7 @@ def _get_conversation_context(conversation_id: str, limit: int = 5) -> str:
     return "\n".join(context_parts)
 
 
-def _save_message(conversation_id: str, role: str, content: str):
+def _save_message(conversation_id: str, role: str, content: str, sql: Optional[str] = None):
     """Save message to conversation history."""
     if conversation_id:
         if conversation_id not in _conversations:
@@ -69,10 +86,19 @@ def _save_message(conversation_id: str, role: str, content: str):
         _conversations[conversation_id].append({
             "role": role,
             "content": content,
+            "sql": sql,
             "timestamp": time.time()
         })
 
 
+def _get_previous_sql(conversation_id: str) -> Optional[str]:
+    """SQL behind the conversation's last assistant answer, if it was a data answer."""
+    for msg in reversed(_conversations.get(conversation_id) or []):
+        if msg["role"] == "assistant":
+            return msg.get("sql")
+    return None
+
+
 def _is_greeting(message: str) -> bool:
     """Check if message is a simple greeting."""
     greetings = {
@@ -100,36 +126,8 @@ def _get_greeting_response(message: str) -> str:
     return responses.get(msg_lower, "Hello! How can I help you today?")
 
 
-@router.post("/message", response_model=ChatResponse)
-async def send_message(request: ChatRequest, token: str = None):
-    """Process a chat message and return response."""
-    start_time = time.time()
-
-    # Optional: Verify token (comment out for testing)
-    if token:
-        token_data = verify_token(token)
-        if not token_data:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-    # Generate conversation ID if not provided
-    conv_id = request.conversation_id or f"conv_{int(time.time() * 1000)}"
-
-    # Save user message
-    _save_message(conv_id, "user", request.message)
-
-    # Handle simple greetings (no LLM needed)
-    if _is_greeting(request.message):
-        response_text = _get_greeting_response(request.message)
-        _save_message(conv_id, "assistant", response_text)
-
-        return ChatResponse(
-            success=True,
-            response=response_text,
-            intent="general",
-            conversation_id=conv_id,
-            processing_time_ms=int((time.time() - start_time) * 1000)
-        )
-
+def _mask_request(conv_id: str, message: str):
+    """Mask PII in the user message. Returns (masked_query, pii_map, pii_settings)."""
     # PII masking with comprehensive logging
     pii_settings = get_pii_settings()
     pii_enabled = pii_settings.get('enabled', True)
@@ -138,9 +136,9 @@ async def send_message(request: ChatRequest, token: str = None):
     if pii_log_enabled:
         pii_logger.info(f"[PII] === REQUEST START (conv={conv_id}) ===")
         pii_logger.info(f"[PII] PII masking enabled: {pii_enabled}")
-        pii_logger.info(f"[PII] STEP 1 - User Input: \"{request.message}\"")
+        pii_logger.info(f"[PII] STEP 1 - User Input: \"{message}\"")
 
-    masked_query, pii_map = mask_pii(request.message)
+    masked_query, pii_map = mask_pii(message)
 
     if pii_log_enabled:
         if pii_map:
@@ -152,36 +150,41 @@ async def send_message(request: ChatRequest, token: str = None):
             pii_logger.info(f"[PII] STEP 2 - No PII detected in input")
             pii_logger.info(f"[PII] STEP 3 - Input to LLM (unchanged): \"{masked_query[:200]}\"")
 
-    # Get conversation context
-    context = request.context or _get_conversation_context(conv_id)
+    return masked_query, pii_map, pii_settings
+
+
+def _pipeline_error_response(conv_id: str, error: Exception, elapsed: int) -> ChatResponse:
+    """Response for an unexpected pipeline exception."""
+    return ChatResponse(
+        success=False,
+        response="I'm having trouble processing your request right now. Could you try rephrasing your question?",
+        intent="error",
+        conversation_id=conv_id,
+        error=str(error),
+        processing_time_ms=elapsed
+    )
 
-    # Run SQL pipeline
-    try:
-        logger.info(f"V2 request: conv={conv_id} query=\"{masked_query[:120]}\"")
-        pipeline = get_sql_pipeline()
-        result = pipeline.run(masked_query, context)
-        logger.info(f"V2 result: success={result.get('success')} intent={result.get('intent')} "
-                     f"time={result.get('processing_time_ms')}ms error={result.get('error')}")
-    except Exception as e:
-        elapsed = int((time.time() - start_time) * 1000)
-        logger.error(f"V2 pipeline EXCEPTION for query '{masked_query}' after {elapsed}ms: "
-                     f"{type(e).__name__}: {e}", exc_info=True)
-        return ChatResponse(
-            success=False,
-            response="I'm having trouble processing your request right now. Could you try rephrasing your question?",
-            intent="error",
-            conversation_id=conv_id,
-            error=str(e),
-            processing_time_ms=elapsed
-        )
+
+def _build_chat_response(request: ChatRequest, conv_id: str, result: dict, masked_query: str,
+                         pii_map: dict, pii_settings: dict, start_time: float,
+                         save_history: bool = True) -> ChatResponse:
+    """Turn a pipeline result into the final response (unmask PII, log trace, save history).
+
+    save_history=False (batch answers) leaves the in-memory conversation store untouched.
+    """
+    pii_log_enabled = pii_settings.get('log_enabled', True)
 
     # Build response based on intent
     intent = result.get("intent", "data")
+    summary_job_id = result.get("summary_job_id")
 
     if intent == "meta":
         response_text = result.get("answer", "")
     elif intent == "ambiguous":
         response_text = result.get("clarification", "Could you please provide more details?")
+    elif summary_job_id:
+        row_count = (result.get("results") or {}).get("row_count", 0)
+        response_text = f"Found {row_count} row(s). The summary is being prepared..."
     elif result.get("success"):
         response_text = result.get("summary") or ""
         if not response_text.strip():
@@ -222,8 +225,21 @@ async def send_message(request: ChatRequest, token: str = None):
     except Exception:
         logger.debug("PII pipeline trace logging failed", exc_info=True)
 
-    # Save assistant response
-    _save_message(conv_id, "assistant", response_text)
+    # Kept with the answer so a follow-up can refine it without regenerating
+    answer_sql = result.get("sql") if result.get("success") and intent == "data" else None
+
+    if summary_job_id:
+        # The summary lands in history (unmasked) once the background job finishes
+        def finish_summary(job):
+            if job.summary and pii_map:
+                job.summary = unmask_pii(job.summary, pii_map)
+            if job.summary and save_history:
+                _save_message(conv_id, "assistant", job.summary, sql=answer_sql)
+
+        get_summary_job_manager().add_done_callback(summary_job_id, finish_summary)
+    elif save_history:
+        # Save assistant response
+        _save_message(conv_id, "assistant", response_text, sql=answer_sql)
 
     return ChatResponse(
         success=result.get("success", False) or intent in ("meta", "ambiguous"),
@@ -235,10 +251,200 @@ async def send_message(request: ChatRequest, token: str = None):
         clarification=result.get("clarification") if intent == "ambiguous" else None,
         suggestions=result.get("suggestions"),
         processing_time_ms=result.get("processing_time_ms", int((time.time() - start_time) * 1000)),
-        error=result.get("error")
+        error=result.get("error"),
+        summary_job_id=summary_job_id
     )
 
 
+def _sse(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.post("/message", response_model=ChatResponse)
+async def send_message(request: ChatRequest, token: str = None):
+    """Process a chat message and return response."""
+    start_time = time.time()
+    deadline = Deadline.after(settings.CHAT_REQUEST_TIMEOUT_SECONDS)
+
+    # Optional: Verify token (comment out for testing)
+    if token:
+        token_data = verify_token(token)
+        if not token_data:
+            raise HTTPException(status_code=401, detail="Invalid token")
+
+    # Generate conversation ID if not provided
+    conv_id = request.conversation_id or f"conv_{int(time.time() * 1000)}"
+
+    # Save user message
+    _save_message(conv_id, "user", request.message)
+
+    # Handle simple greetings (no LLM needed)
+    if _is_greeting(request.message):
+        response_text = _get_greeting_response(request.message)
+        _save_message(conv_id, "assistant", response_text)
+
+        return ChatResponse(
+            success=True,
+            response=response_text,
+            intent="general",
+            conversation_id=conv_id,
+            processing_time_ms=int((time.time() - start_time) * 1000)
+        )
+
+    masked_query, pii_map, pii_settings = _mask_request(conv_id, request.message)
+
+    # Get conversation context
+    context = request.context or _get_conversation_context(conv_id)
+    previous_sql = request.previous_sql or _get_previous_sql(conv_id)
+
+    # Run SQL pipeline
+    try:
+        logger.info(f"V2 request: conv={conv_id} query=\"{masked_query[:120]}\"")
+        pipeline = get_sql_pipeline()
+        result = pipeline.run(masked_query, context, defer_summary=request.async_summary, deadline=deadline,
+                              previous_sql=previous_sql)
+        logger.info(f"V2 result: success={result.get('success')} intent={result.get('intent')} "
+                     f"time={result.get('processing_time_ms')}ms error={result.get('error')}")
+    except Exception as e:
+        elapsed = int((time.time() - start_time) * 1000)
+        logger.error(f"V2 pipeline EXCEPTION for query '{masked_query}' after {elapsed}ms: "
+                     f"{type(e).__name__}: {e}", exc_info=True)
+        return _pipeline_error_response(conv_id, e, elapsed)
+
+    return _build_chat_response(request, conv_id, result, masked_query, pii_map, pii_settings, start_time)
+
+
+@router.post("/message/stream")
+async def send_message_stream(request: ChatRequest, token: str = None):
+    """Process a chat message and stream the answer as server-sent events.
+
+    Events, in order: "sql" (generated SQL), "rows" (query results),
+    "summary_token" (summary text as it is generated) and finally "done"
+    carrying the same payload as /message.
+    """
+    start_time = time.time()
+    deadline = Deadline.after(settings.CHAT_REQUEST_TIMEOUT_SECONDS)
+
+    if token:
+        token_data = verify_token(token)
+        if not token_data:
+            raise HTTPException(status_code=401, detail="Invalid token")
+
+    conv_id = request.conversation_id or f"conv_{int(time.time() * 1000)}"
+    _save_message(conv_id, "user", request.message)
+
+    if _is_greeting(request.message):
+        response_text = _get_greeting_response(request.message)
+        _save_message(conv_id, "assistant", response_text)
+        done = ChatResponse(
+            success=True,
+            response=response_text,
+            intent="general",
+            conversation_id=conv_id,
+            processing_time_ms=int((time.time() - start_time) * 1000)
+        )
+        return StreamingResponse(iter([_sse("done", done.model_dump())]), media_type="text/event-stream")
+
+    masked_query, pii_map, pii_settings = _mask_request(conv_id, request.message)
+    context = request.context or _get_conversation_context(conv_id)
+    previous_sql = request.previous_sql or _get_previous_sql(conv_id)
+    events: queue.Queue = queue.Queue()
+
+    def on_event(event: str, data: dict):
+        events.put((event, data))
+
+    def worker():
+        try:
+            logger.info(f"V2 stream request: conv={conv_id} query=\"{masked_query[:120]}\"")
+            result = get_sql_pipeline().run(masked_query, context, on_event=on_event, deadline=deadline,
+                                            previous_sql=previous_sql)
+            response = _build_chat_response(request, conv_id, result, masked_query, pii_map, pii_settings, start_time)
+        except Exception as e:
+            elapsed = int((time.time() - start_time) * 1000)
+            logger.error(f"V2 stream pipeline EXCEPTION after {elapsed}ms: {type(e).__name__}: {e}", exc_info=True)
+            response = _pipeline_error_response(conv_id, e, elapsed)
+        events.put(("done", response.model_dump()))
+        events.put(None)
+
+    threading.Thread(target=worker, name=f"chat-stream-{conv_id}", daemon=True).start()
+
+    def stream():
+        while True:
+            item = events.get()
+            if item is None:
+                break
+            event, data = item
+            if event == "summary_token" and pii_map:
+                # Tokens arrive whole-word, so PII placeholders are never split across chunks
+                data = {"text": unmask_pii(data["text"], pii_map)}
+            yield _sse(event, data)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.post("/batch")
+async def send_batch(request: BatchRequest, token: str = None):
+    """Run a list of questions and stream results back as NDJSON, in completion order.
+
+    Each line is {"index": i, "result": <same payload as /message>}; the last line is
+    {"done": true, ...}. Questions are independent (no conversation history) and run
+    with bounded parallelism; duplicates are answered once.
+    """
+    start_time = time.time()
+
+    if token:
+        token_data = verify_token(token)
+        if not token_data:
+            raise HTTPException(status_code=401, detail="Invalid token")
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="No questions provided")
+
+    batch_id = f"batch_{int(time.time() * 1000)}"
+    masked = [_mask_request(batch_id, question) for question in request.questions]
+    context = request.context or ""
+    logger.info(f"V2 batch request: {batch_id} questions={len(request.questions)}")
+
+    def stream():
+        pipeline = get_sql_pipeline()
+        ok = 0
+        for index, result in pipeline.run_batch([m[0] for m in masked], context, request.max_concurrency):
+            masked_query, pii_map, pii_settings = masked[index]
+            item = ChatRequest(message=request.questions[index], conversation_id=batch_id, context=request.context)
+            try:
+                # Batch questions are independent - nothing goes into conversation history
+                response = _build_chat_response(item, batch_id, result, masked_query, pii_map, pii_settings,
+                                                start_time, save_history=False)
+            except Exception as e:
+                response = _pipeline_error_response(batch_id, e, int((time.time() - start_time) * 1000))
+            ok += int(response.success)
+            yield json.dumps({"index": index, "result": response.model_dump()}, default=str) + "\n"
+
+        yield json.dumps({
+            "done": True,
+            "total": len(request.questions),
+            "succeeded": ok,
+            "processing_time_ms": int((time.time() - start_time) * 1000),
+        }) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/summary/{job_id}")
+async def get_summary(job_id: str, wait: float = 0, token: str = None):
+    """Get the summary for an async_summary response.
+
+    wait (seconds, max 30) long-polls until the job finishes instead of returning
+    status "pending"/"running" straight away.
+    """
+    wait = max(0.0, min(wait, 30.0))
+    manager = get_summary_job_manager()
+    job = await asyncio.to_thread(manager.get, job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Summary job not found or expired")
+    return {"success": job.status != "failed", **job.to_dict()}
+
+
 @router.get("/schema/info")
 async def get_schema_info(token: str = None):
     """Get information about available databases and tables."""
@@ -431,8 +431,8 @@ async def update_column_descriptions(
         conn.commit()
         conn.close()
 
-        # Refresh all schema caches
-        refresh_all_schema()
+        # Refresh schema caches for this database
+        refresh_all_schema(db_name)
 
         return {
             "success": True,
@@ -0,0 +1,271 @@
+"""Approximate nearest-neighbour indexes layered over a vector store's exact index.
+
+FAISSVectorStore keeps every vector in an exact, ID-mapped flat index (the
+ground truth used for updates and rebuilds). For large stores an ANN index
+can be configured per store (FAISS_SCHEMA_INDEX_TYPE / FAISS_DOCUMENT_INDEX_TYPE):
+
+- hnsw:     graph index, no training; efSearch trades recall for latency
+- ivf_flat: inverted lists over k-means cells; nprobe cells scanned per query
+- ivf_pq:   as ivf_flat with product-quantized vectors (smaller, less exact)
+
+The ANN index is only built once the store holds FAISS_ANN_MIN_VECTORS
+vectors (IVF needs enough points to train); below that the flat index is
+searched. IVF indexes are updated in place and retrained when the store has
+grown or shrunk 4x since training; HNSW cannot delete, so changes other than
+pure additions trigger a rebuild at the next save. Search parameters
+(nprobe / efSearch) are persisted in a JSON sidecar next to the index, so a
+value picked with `benchmark()` sticks across restarts.
+"""
+import json
+import math
+import time
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+logger = logging.getLogger("chatbot.cache.ann_index")
+
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+# Retrain IVF when the vector count has changed this much since training
+RETRAIN_GROWTH = 4
+# Default parameter sweeps for benchmark()
+NPROBE_SWEEP = (1, 2, 4, 8, 16, 32, 64)
+EF_SEARCH_SWEEP = (16, 32, 64, 128, 256)
+
+
+class AnnIndex:
+    """One store's ANN index, its parameters and its sidecar file."""
+
+    def __init__(self, name: str, index_type: str, dimension: int, directory: str,
+                 min_vectors: int = 2000, hnsw_m: int = 32, ef_search: int = 64,
+                 nprobe: int = 8, pq_m: int = 32):
+        if index_type not in INDEX_TYPES or index_type == "flat":
+            raise ValueError(f"Unknown ANN index type '{index_type}' (expected one of {INDEX_TYPES[1:]})")
+        self.name = name
+        self.index_type = index_type
+        self.dimension = dimension
+        self.min_vectors = min_vectors
+        self.hnsw_m = hnsw_m
+        self.pq_m = pq_m
+        self.params: Dict = {"nprobe": nprobe, "ef_search": ef_search}
+        self.index: Optional["faiss.Index"] = None
+        self.stale = False
+        self.trained_on = 0
+        self.generation = -1  # Store generation the index reflects
+        self.index_path = Path(directory) / f"{name}.{index_type}.index"
+        self.params_path = Path(directory) / f"{name}.params.json"
+        self._load_params()
+
+    # ----- parameters / persistence -----
+
+    @property
+    def padded_dimension(self) -> int:
+        """PQ needs the dimension to be a multiple of the sub-quantizer count; vectors are zero-padded."""
+        if self.index_type != "ivf_pq":
+            return self.dimension
+        return int(math.ceil(self.dimension / self.pq_m) * self.pq_m)
+
+    def _pad(self, x: np.ndarray) -> np.ndarray:
+        extra = self.padded_dimension - x.shape[1]
+        return np.ascontiguousarray(np.pad(x, ((0, 0), (0, extra))) if extra else x, dtype=np.float32)
+
+    def _load_params(self):
+        if not self.params_path.exists():
+            return
+        try:
+            with open(self.params_path) as f:
+                sidecar = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"[ann] Ignoring unreadable {self.params_path.name}: {e}")
+            return
+        if sidecar.get("index_type") == self.index_type:
+            self.params.update({k: v for k, v in sidecar.get("params", {}).items() if k in self.params})
+            self.trained_on = sidecar.get("trained_on", 0)
+            self.generation = sidecar.get("generation", -1)
+
+    def _save_params(self):
+        sidecar = {
+            "index_type": self.index_type,
+            "params": self.params,
+            "trained_on": self.trained_on,
+            "generation": self.generation,
+            "dimension": self.dimension,
+            "padded_dimension": self.padded_dimension,
+            "saved_at": time.time(),
+        }
+        tmp_path = self.params_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(sidecar, f, indent=2)
+        tmp_path.replace(self.params_path)
+
+    def set_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        """Change and persist the search parameters."""
+        if nprobe is not None:
+            self.params["nprobe"] = int(nprobe)
+        if ef_search is not None:
+            self.params["ef_search"] = int(ef_search)
+        self._apply_params(self.index)
+        self._save_params()
+
+    def load(self, generation: int) -> bool:
+        """Load the persisted index if it reflects the store's current generation."""
+        if faiss is None or not self.index_path.exists() or self.generation != generation:
+            return False
+        try:
+            self.index = faiss.read_index(str(self.index_path))
+        except Exception as e:
+            logger.warning(f"[ann] Could not load {self.index_path.name}: {e}")
+            return False
+        self._apply_params(self.index)
+        self.stale = False
+        return True
+
+    def save(self, generation: int):
+        self.generation = generation
+        if self.index is not None and not self.stale:
+            faiss.write_index(self.index, str(self.index_path))
+        self._save_params()
+
+    def drop(self):
+        """Go back to exact search (too few vectors) and remove the persisted index."""
+        self.index = None
+        self.stale = False
+        if self.index_path.exists():
+            self.index_path.unlink()
+
+    # ----- building -----
+
+    def _new_index(self, n: int) -> "faiss.Index":
+        d = self.padded_dimension
+        if self.index_type == "hnsw":
+            return faiss.IndexIDMap2(faiss.IndexHNSWFlat(d, self.hnsw_m, faiss.METRIC_INNER_PRODUCT))
+        nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))  # FAISS wants ~39 training points per cell
+        quantizer = faiss.IndexFlatIP(d)
+        if self.index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, d, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            # 8-bit codes need 256 * 39 training points; use fewer bits on smaller stores
+            nbits = min(8, max(4, int(math.log2(max(n, 1) / 39))))
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, self.pq_m, nbits, faiss.METRIC_INNER_PRODUCT)
+        return index
+
+    def _apply_params(self, index: Optional["faiss.Index"]):
+        if index is None:
+            return
+        inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+        if hasattr(inner, "hnsw"):
+            inner.hnsw.efSearch = self.params["ef_search"]
+        if hasattr(inner, "nprobe"):
+            inner.nprobe = self.params["nprobe"]
+
+    def build(self, vectors: np.ndarray, ids: np.ndarray) -> "faiss.Index":
+        """Build (and train) a fresh index over vectors."""
+        step_start = time.time()
+        index = self._new_index(len(vectors))
+        x = self._pad(vectors)
+        if not index.is_trained:
+            index.train(x)
+        index.add_with_ids(x, ids.astype(np.int64))
+        self._apply_params(index)
+        step_ms = int((time.time() - step_start) * 1000)
+        logger.info(f"[ann] Built {self.index_type} index for '{self.name}' over {len(vectors)} vectors in {step_ms}ms")
+        return index
+
+    def needs_rebuild(self, n: int) -> bool:
+        if self.index is None or self.stale:
+            return True
+        if self.index_type != "hnsw" and self.trained_on:
+            return n > self.trained_on * RETRAIN_GROWTH or n * RETRAIN_GROWTH < self.trained_on
+        return False
+
+    def refresh(self, vectors_fn, n: int):
+        """Rebuild from the store's exact vectors if needed; drop below min_vectors."""
+        if n < self.min_vectors:
+            if self.index is not None or self.index_path.exists():
+                self.drop()
+            return
+        if self.needs_rebuild(n):
+            vectors, ids = vectors_fn()
+            self.index = self.build(vectors, ids)
+            self.trained_on = n
+            self.stale = False
+
+    # ----- incremental updates -----
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray):
+        """Mirror an addition of new ids."""
+        if self.index is None or self.stale:
+            return
+        self.index.add_with_ids(self._pad(vectors), ids.astype(np.int64))
+
+    def remove(self, ids: np.ndarray):
+        if self.index is None or self.stale:
+            return
+        if self.index_type == "hnsw":
+            self.stale = True  # HNSW graphs do not support deletion
+            return
+        self.index.remove_ids(ids.astype(np.int64))
+
+    # ----- search -----
+
+    @property
+    def usable(self) -> bool:
+        return self.index is not None and not self.stale
+
+    def search(self, x: np.ndarray, k: int, selector=None, params: Optional[Dict] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(scores, ids) for the queries x; params overrides nprobe / ef_search for this call."""
+        params = dict(self.params, **(params or {}))
+        kwargs = {}
+        if hasattr(faiss, "SearchParameters"):
+            if self.index_type == "hnsw":
+                kwargs["params"] = faiss.SearchParametersHNSW(efSearch=params["ef_search"], sel=selector)
+            else:
+                kwargs["params"] = faiss.SearchParametersIVF(nprobe=params["nprobe"], sel=selector)
+        return self.index.search(self._pad(x), k, **kwargs)
+
+    # ----- evaluation -----
+
+    def benchmark(self, vectors: np.ndarray, ids: np.ndarray, k: int = 10, n_queries: int = 200,
+                  sweep: Optional[Sequence[int]] = None, seed: int = 0) -> List[Dict]:
+        """Recall@k against exact search and latency per query, for each sweep value.
+
+        Queries are stored vectors with a little noise (no embedding calls).
+        The sweep is over nprobe (IVF) or efSearch (HNSW). An index is built
+        for the benchmark if the store is below FAISS_ANN_MIN_VECTORS.
+        """
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)]
+        queries = (sample + rng.normal(0, 0.05, sample.shape)).astype(np.float32)
+        faiss.normalize_L2(queries)
+        k = min(k, len(vectors))
+
+        exact = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+        exact.add_with_ids(vectors, ids.astype(np.int64))
+        step_start = time.perf_counter()
+        _, truth = exact.search(queries, k)
+        flat_ms = (time.perf_counter() - step_start) * 1000 / len(queries)
+
+        index = self.index if self.usable else self.build(vectors, ids)
+        saved, self.index = self.index, index
+        key = "ef_search" if self.index_type == "hnsw" else "nprobe"
+        sweep = sweep or (EF_SEARCH_SWEEP if self.index_type == "hnsw" else NPROBE_SWEEP)
+        report = [{"index": "flat", key: None, f"recall@{k}": 1.0, "ms_per_query": round(flat_ms, 4)}]
+        try:
+            for value in sweep:
+                step_start = time.perf_counter()
+                _, found = self.search(queries, k, params={key: value})
+                ms = (time.perf_counter() - step_start) * 1000 / len(queries)
+                hits = sum(len(set(t) & set(f)) for t, f in zip(truth.tolist(), found.tolist()))
+                report.append({"index": self.index_type, key: value,
+                               f"recall@{k}": round(hits / truth.size, 4), "ms_per_query": round(ms, 4)})
+        finally:
+            self.index = saved
+        return report
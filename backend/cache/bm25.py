@@ -0,0 +1,85 @@
+"""Small in-memory BM25 index for lexical retrieval (no embedding calls).
+
+Documents are tokenized into lowercase word stems; snake_case and camelCase
+identifiers are split so "crew_members" matches "crew members".
+"""
+import re
+import math
+from collections import Counter
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+_CAMEL_RE = re.compile(r'([a-z])([A-Z])')
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "at", "to", "for", "by", "with", "from", "and", "or",
+    "is", "are", "was", "were", "be", "do", "does", "did", "me", "my", "i", "we", "our", "you",
+    "show", "list", "give", "get", "find", "what", "which", "who", "how", "all", "please", "there",
+}
+
+
+def _stem(word: str) -> str:
+    """Very light plural stripping - enough to match "flights" with "flight"."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase stems of the words in text, without stopwords."""
+    text = _CAMEL_RE.sub(r'\1 \2', text or "").replace("_", " ").lower()
+    return [_stem(w) for w in _WORD_RE.findall(text) if w not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed set of documents."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._doc_ids: List[Hashable] = []
+        self._doc_lengths: List[int] = []
+        self._postings: Dict[str, Dict[int, int]] = {}  # term -> {doc position: term frequency}
+        self._avg_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def add(self, doc_id: Hashable, text: str):
+        """Index one document."""
+        position = len(self._doc_ids)
+        terms = Counter(tokenize(text))
+        self._doc_ids.append(doc_id)
+        self._doc_lengths.append(sum(terms.values()))
+        for term, freq in terms.items():
+            self._postings.setdefault(term, {})[position] = freq
+        self._avg_length = sum(self._doc_lengths) / len(self._doc_lengths)
+
+    def search(self, query: str, k: int = 10,
+               allow: Optional[Callable[[Hashable], bool]] = None) -> List[Tuple[Hashable, float]]:
+        """Top-k (doc_id, score) for query, best first. Documents sharing no term are omitted.
+
+        allow, if given, filters doc ids before the top-k cut, so k results
+        are returned even when many of the best matches are excluded.
+        """
+        n_docs = len(self._doc_ids)
+        if not n_docs:
+            return []
+
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, freq in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[position] / (self._avg_length or 1))
+                scores[position] = scores.get(position, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+
+        if allow is not None:
+            doc_ids = self._doc_ids
+            scores = {position: score for position, score in scores.items() if allow(doc_ids[position])}
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self._doc_ids[position], score) for position, score in ranked]
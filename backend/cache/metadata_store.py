@@ -0,0 +1,139 @@
+"""SQLite-backed metadata for a vector store, keyed by vector id.
+
+Replaces the pickled list that was loaded whole at startup and rewritten on
+every save: rows are written only when an item is added, changed or removed,
+and read only for the ids a search returns, so startup time and memory no
+longer grow with the corpus. Metadata is stored as JSON (never unpickled).
+"""
+import json
+import sqlite3
+from pathlib import Path
+from typing import Collection, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# SQLite caps host parameters per statement; batch larger id lists
+_BATCH = 500
+
+
+def _batches(items: Sequence, size: int = _BATCH) -> Iterable[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class VectorMetadataStore:
+    """items(id, text_hash, partition, meta) plus a small key/value info table."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._ensure_tables()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30)
+
+    def _ensure_tables(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS items (
+                id         INTEGER PRIMARY KEY,
+                text_hash  TEXT,
+                partition  TEXT,
+                meta       TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_items_partition ON items(partition)")
+        conn.execute("CREATE TABLE IF NOT EXISTS store_info (key TEXT PRIMARY KEY, value TEXT)")
+        conn.commit()
+        conn.close()
+
+    # ----- info -----
+
+    def get_info(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        conn = self._connect()
+        row = conn.execute("SELECT value FROM store_info WHERE key = ?", (key,)).fetchone()
+        conn.close()
+        return row[0] if row else default
+
+    # ----- reads -----
+
+    def count(self) -> int:
+        conn = self._connect()
+        (n,) = conn.execute("SELECT COUNT(*) FROM items").fetchone()
+        conn.close()
+        return n
+
+    def get_many(self, ids: Sequence[int]) -> Dict[int, Dict]:
+        """Metadata for the given ids (missing ids are left out)."""
+        found: Dict[int, Dict] = {}
+        if not ids:
+            return found
+        conn = self._connect()
+        for batch in _batches(list(ids)):
+            rows = conn.execute(f"SELECT id, meta FROM items WHERE id IN ({','.join('?' * len(batch))})",
+                                tuple(batch)).fetchall()
+            found.update((vector_id, json.loads(meta)) for vector_id, meta in rows)
+        conn.close()
+        return found
+
+    def states(self, ids: Sequence[int]) -> Dict[int, Tuple[Optional[str], str]]:
+        """(text_hash, meta JSON) for the given ids that exist."""
+        found: Dict[int, Tuple[Optional[str], str]] = {}
+        if not ids:
+            return found
+        conn = self._connect()
+        for batch in _batches(list(ids)):
+            rows = conn.execute(f"SELECT id, text_hash, meta FROM items WHERE id IN ({','.join('?' * len(batch))})",
+                                tuple(batch)).fetchall()
+            found.update((vector_id, (text_hash, meta)) for vector_id, text_hash, meta in rows)
+        conn.close()
+        return found
+
+    def ids(self, partitions: Optional[Collection[str]] = None) -> List[int]:
+        """All ids, or those in the given partitions."""
+        conn = self._connect()
+        if partitions is None:
+            rows = conn.execute("SELECT id FROM items").fetchall()
+        else:
+            rows = []
+            for batch in _batches(list(partitions)):
+                rows += conn.execute(f"SELECT id FROM items WHERE partition IN ({','.join('?' * len(batch))})",
+                                     tuple(batch)).fetchall()
+        conn.close()
+        return [row[0] for row in rows]
+
+    def partitions(self) -> List[str]:
+        """Distinct partition values."""
+        conn = self._connect()
+        rows = conn.execute("SELECT DISTINCT partition FROM items WHERE partition IS NOT NULL").fetchall()
+        conn.close()
+        return [row[0] for row in rows]
+
+    # ----- writes -----
+
+    def apply(self, rows: List[Tuple[int, Optional[str], Optional[str], str]], deleted: Sequence[int] = (),
+              info: Optional[Dict[str, str]] = None):
+        """Write (id, text_hash, partition, meta JSON) rows, delete ids and set info in one transaction."""
+        conn = self._connect()
+        try:
+            if rows:
+                conn.executemany("INSERT OR REPLACE INTO items (id, text_hash, partition, meta) VALUES (?, ?, ?, ?)",
+                                 rows)
+            for batch in _batches(list(deleted)):
+                conn.execute(f"DELETE FROM items WHERE id IN ({','.join('?' * len(batch))})", tuple(batch))
+            if info:
+                conn.executemany("INSERT OR REPLACE INTO store_info (key, value) VALUES (?, ?)", list(info.items()))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM items")
+        conn.execute("DELETE FROM store_info")
+        conn.commit()
+        conn.close()
+
+
+def dump_meta(meta: Dict) -> str:
+    """Canonical JSON for a metadata dict (so unchanged metadata compares equal)."""
+    return json.dumps(meta, sort_keys=True, default=str)
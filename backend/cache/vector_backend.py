@@ -0,0 +1,267 @@
+"""Exact vector index backends used by the vector stores.
+
+Both backends hold L2-normalised vectors under int64 ids and score them by
+inner product (cosine similarity), behind the same small interface, so the
+store code is identical with or without FAISS:
+
+- faiss: IndexIDMap2(IndexFlatIP), persisted as {name}.index
+- numpy: a vector matrix and an id array persisted as {name}.vectors.npy and
+  {name}.ids.npy; the matrix is memory-mapped on load and searched with
+  blocked matrix multiplies and an argpartition top-k. Vectors can be kept
+  as float16 (VECTOR_FALLBACK_DTYPE) to halve the file and page-cache size;
+  each block is converted to float32 for scoring, which makes search several
+  times slower than with float32 storage.
+
+`get_backend()` picks faiss when it is installed (VECTOR_BACKEND=auto).
+"""
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+
+BACKENDS = ("auto", "faiss", "numpy")
+# Rows scored per matrix multiply by the numpy backend
+SEARCH_BLOCK_ROWS = 8192
+
+
+def normalize(x: np.ndarray) -> np.ndarray:
+    """L2-normalise the rows of a float32 matrix in place (as faiss.normalize_L2)."""
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    x /= norms
+    return x
+
+
+class VectorBackend:
+    """An exact inner-product index over vectors with int64 ids."""
+
+    kind = ""
+
+    def __init__(self, name: str, dimension: int, directory: str):
+        self.name = name
+        self.dimension = dimension
+        self.directory = Path(directory)
+
+    @property
+    def ntotal(self) -> int:
+        raise NotImplementedError
+
+    def ids(self) -> np.ndarray:
+        """Ids of every stored vector."""
+        raise NotImplementedError
+
+    def vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Every stored vector (float32) and its id."""
+        raise NotImplementedError
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray):
+        """Add normalised vectors under ids that are not stored yet."""
+        raise NotImplementedError
+
+    def remove(self, ids: np.ndarray):
+        raise NotImplementedError
+
+    def search(self, queries: np.ndarray, k: int,
+               subset: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(scores, ids) of the top k per query, best first, scoring only subset ids if given.
+
+        Rows may be longer than k or padded with id -1; callers filter and cut.
+        """
+        raise NotImplementedError
+
+    def exists(self) -> bool:
+        """Whether a persisted index is on disk."""
+        raise NotImplementedError
+
+    def load(self):
+        raise NotImplementedError
+
+    def save(self):
+        raise NotImplementedError
+
+    def reset(self):
+        """Empty the index (files are kept until the next save)."""
+        raise NotImplementedError
+
+    def delete_files(self):
+        raise NotImplementedError
+
+
+class FaissBackend(VectorBackend):
+    """IndexIDMap2 over an exact IndexFlatIP."""
+
+    kind = "faiss"
+
+    def __init__(self, name: str, dimension: int, directory: str):
+        super().__init__(name, dimension, directory)
+        self.path = self.directory / f"{name}.index"
+        self.index: "faiss.Index" = None
+        self.reset()
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    def ids(self) -> np.ndarray:
+        if not isinstance(self.index, faiss.IndexIDMap2):
+            return np.arange(self.index.ntotal, dtype=np.int64)  # Pre-id index: ids are positions
+        return faiss.vector_to_array(self.index.id_map)
+
+    def vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        if not isinstance(self.index, faiss.IndexIDMap2):
+            return self.index.reconstruct_n(0, self.index.ntotal), self.ids()
+        flat = faiss.downcast_index(self.index.index)
+        return flat.reconstruct_n(0, flat.ntotal), self.ids()
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray):
+        self.index.add_with_ids(vectors, ids.astype(np.int64))
+
+    def remove(self, ids: np.ndarray):
+        self.index.remove_ids(ids.astype(np.int64))
+
+    def search(self, queries: np.ndarray, k: int,
+               subset: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        if subset is None:
+            return self.index.search(queries, k)
+        if hasattr(faiss, "SearchParameters"):
+            # Only the selected vectors are scored - no over-fetching and filtering afterwards
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(subset.astype(np.int64)))
+            return self.index.search(queries, k, params=params)
+        return self.index.search(queries, self.index.ntotal)  # FAISS < 1.7.3: score everything
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self):
+        self.index = faiss.read_index(str(self.path))
+
+    def save(self):
+        faiss.write_index(self.index, str(self.path))
+
+    def reset(self):
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+
+    def delete_files(self):
+        if self.path.exists():
+            self.path.unlink()
+
+
+class NumpyBackend(VectorBackend):
+    """Vector matrix plus id array, memory-mapped from .npy files."""
+
+    kind = "numpy"
+
+    def __init__(self, name: str, dimension: int, directory: str, dtype: str = "float32"):
+        super().__init__(name, dimension, directory)
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported vector dtype '{dtype}' (expected float32 or float16)")
+        self.dtype = np.dtype(dtype)
+        self.vectors_path = self.directory / f"{name}.vectors.npy"
+        self.ids_path = self.directory / f"{name}.ids.npy"
+        self._vectors = np.zeros((0, dimension), dtype=self.dtype)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._dirty = False  # Arrays differ from the files
+
+    @property
+    def ntotal(self) -> int:
+        return len(self._ids)
+
+    def ids(self) -> np.ndarray:
+        return self._ids.copy()
+
+    def vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        # A copy, so no caller keeps the memory-mapped file open
+        return np.array(self._vectors, dtype=np.float32), self.ids()
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray):
+        # Appending copies a memory-mapped matrix into memory until the next save
+        self._vectors = np.concatenate([self._vectors, vectors.astype(self.dtype)])
+        self._ids = np.concatenate([self._ids, ids.astype(np.int64)])
+        self._dirty = True
+
+    def remove(self, ids: np.ndarray):
+        keep = ~np.isin(self._ids, ids)
+        if not keep.all():
+            self._vectors = self._vectors[keep]
+            self._ids = self._ids[keep]
+            self._dirty = True
+
+    def search(self, queries: np.ndarray, k: int,
+               subset: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.flatnonzero(np.isin(self._ids, subset)) if subset is not None else None
+        n = len(rows) if rows is not None else self.ntotal
+        k = min(k, n)
+        if k <= 0:
+            return np.zeros((len(queries), 0), dtype=np.float32), np.zeros((len(queries), 0), dtype=np.int64)
+
+        scores = np.empty((len(queries), n), dtype=np.float32)
+        for start in range(0, n, SEARCH_BLOCK_ROWS):
+            block = (self._vectors[start:start + SEARCH_BLOCK_ROWS] if rows is None
+                     else self._vectors[rows[start:start + SEARCH_BLOCK_ROWS]])
+            scores[:, start:start + len(block)] = queries @ block.astype(np.float32, copy=False).T
+
+        # Unordered top k per row, then sort just those
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        positions = top if rows is None else rows[top]
+        return np.take_along_axis(top_scores, order, axis=1), self._ids[positions]
+
+    def exists(self) -> bool:
+        return self.vectors_path.exists() and self.ids_path.exists()
+
+    def load(self):
+        vectors = np.load(self.vectors_path, mmap_mode="r")
+        ids = np.load(self.ids_path)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension or len(vectors) != len(ids):
+            raise ValueError(f"{self.vectors_path.name} has shape {vectors.shape}, "
+                             f"expected ({len(ids)}, {self.dimension})")
+        if vectors.dtype != self.dtype:
+            vectors = vectors.astype(self.dtype)  # VECTOR_FALLBACK_DTYPE changed; rewritten on the next save
+        self._vectors, self._ids = vectors, ids.astype(np.int64)
+        self._dirty = not isinstance(self._vectors, np.memmap)  # Converted dtype
+
+    def save(self):
+        """Write the arrays if they changed since they were loaded or saved."""
+        if not self._dirty and self.exists():
+            return
+        # Windows cannot replace a file that is still mapped: hold the data in memory and drop the map
+        if isinstance(self._vectors, np.memmap):
+            self._vectors = np.array(self._vectors)
+        for path, array in ((self.vectors_path, self._vectors), (self.ids_path, self._ids)):
+            tmp_path = path.with_name(path.stem + ".tmp.npy")
+            np.save(tmp_path, np.ascontiguousarray(array))
+            os.replace(tmp_path, path)
+        # Serve from the file again rather than from the in-memory copy
+        self._vectors = np.load(self.vectors_path, mmap_mode="r")
+        self._dirty = False
+
+    def reset(self):
+        self._vectors = np.zeros((0, self.dimension), dtype=self.dtype)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._dirty = True
+
+    def delete_files(self):
+        for path in (self.vectors_path, self.ids_path):
+            if path.exists():
+                path.unlink()
+
+
+def get_backend(name: str, dimension: int, directory: str, kind: str = "auto",
+                dtype: str = "float32") -> VectorBackend:
+    """Backend for a store: faiss if requested or available (auto), else numpy."""
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown vector backend '{kind}' (expected one of {BACKENDS})")
+    if kind == "faiss" and faiss is None:
+        raise ImportError("VECTOR_BACKEND=faiss but faiss is not installed")
+    if kind == "faiss" or (kind == "auto" and faiss is not None):
+        return FaissBackend(name, dimension, directory)
+    return NumpyBackend(name, dimension, directory, dtype=dtype)
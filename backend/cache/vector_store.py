@@ -1,9 +1,33 @@
-"""FAISS-based vector store for embeddings."""
+"""Vector store for embeddings (FAISS, or NumPy where FAISS is not installed).
+
+Vectors live in an ID-mapped exact index under stable 63-bit ids:
+a hash of the item's key fields (e.g. db_name + table_name for the schema
+store) or of its text. `upsert` only embeds items that are new or whose text
+changed, `delete` removes by id, and `sync` makes a store (or some of its
+partitions) match a full list of items - so index maintenance costs are
+proportional to what changed, not to the corpus.
+
+A store can be partitioned by a metadata field (the schema store uses
+db_name): searches restricted to some partitions only score their vectors,
+through a FAISS IDSelector, so top-k always returns k hits from them.
+
+The exact index is a FAISS IndexIDMap2(IndexFlatIP), or a memory-mapped
+NumPy matrix when FAISS is not installed (see vector_backend); it is always
+kept as the copy of every vector. Stores configured with an ANN index type
+(FAISS only) search that instead (see ann_index).
+
+Item metadata (and the hash of each embedded text) is kept in a SQLite file
+next to the index (see metadata_store), not in memory: changes are buffered
+until `save()` and written as rows, and searches read only the rows of their
+hits. Legacy pickled metadata is migrated into it once on load.
+"""
 import os
 import json
+import time
 import pickle
+import hashlib
 import numpy as np
-from typing import List, Dict, Tuple, Optional
+from typing import Collection, Iterable, List, Dict, Tuple, Optional, Sequence
 from pathlib import Path
 
 try:
@@ -13,116 +37,395 @@ except ImportError:
 
 from backend.config import settings
 from backend.llm.embeddings import embed_query, embed_documents
+from backend.cache.ann_index import AnnIndex
+from backend.cache.metadata_store import VectorMetadataStore, dump_meta
+from backend.cache.vector_backend import VectorBackend, get_backend, normalize
+
+
+# Metadata row: (text hash, partition value, metadata JSON); None = deleted
+PendingRow = Optional[Tuple[Optional[str], Optional[str], str]]
+
+
+def stable_id(key: str) -> int:
+    """Stable non-negative int64 id for an item key."""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big") & 0x7FFFFFFFFFFFFFFF
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
 
 
 class FAISSVectorStore:
     """FAISS-based vector store for similarity search."""
 
-    def __init__(self, name: str, dimension: int = None):
+    def __init__(self, name: str, dimension: int = None, partition_key: Optional[str] = None,
+                 key_fields: Optional[Sequence[str]] = None, index_type: str = "flat"):
         self.name = name
         self.dimension = dimension or settings.EMBEDDING_DIMENSIONS
-        self.index: Optional['faiss.Index'] = None
-        self.metadata: List[Dict] = []
-        self.index_path = Path(settings.FAISS_INDEX_DIR) / f"{name}.index"
-        self.metadata_path = Path(settings.FAISS_INDEX_DIR) / f"{name}.meta"
+        self.partition_key = partition_key
+        self.key_fields = tuple(key_fields) if key_fields else None
+        self.index: VectorBackend = get_backend(
+            name, self.dimension, settings.FAISS_INDEX_DIR,
+            kind=getattr(settings, "VECTOR_BACKEND", "auto"),
+            dtype=getattr(settings, "VECTOR_FALLBACK_DTYPE", "float32"),
+        )
+        self._pending: Dict[int, PendingRow] = {}  # vector id -> metadata row not yet written
+        self._generation = 0  # Bumped on every change; the ANN index records the one it reflects
+        self.ann: Optional[AnnIndex] = None
+        if index_type != "flat" and self.index.kind == "faiss":
+            self.ann = AnnIndex(
+                name, index_type, self.dimension, settings.FAISS_INDEX_DIR,
+                min_vectors=getattr(settings, "FAISS_ANN_MIN_VECTORS", 2000),
+                hnsw_m=getattr(settings, "FAISS_HNSW_M", 32),
+                ef_search=getattr(settings, "FAISS_HNSW_EF_SEARCH", 64),
+                nprobe=getattr(settings, "FAISS_IVF_NPROBE", 8),
+                pq_m=getattr(settings, "FAISS_PQ_M", 32),
+            )
+        self.legacy_metadata_path = Path(settings.FAISS_INDEX_DIR) / f"{name}.meta"
 
         # Ensure directory exists
-        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.legacy_metadata_path.parent.mkdir(parents=True, exist_ok=True)
+        self.meta_store = VectorMetadataStore(Path(settings.FAISS_INDEX_DIR) / f"{name}.meta.db")
 
         # Load existing index if available
         self.load()
 
     def load(self):
         """Load index from disk if exists."""
-        if faiss is None:
-            print("Warning: FAISS not installed, using numpy fallback")
-            self.embeddings = []
-            return
-
-        if self.index_path.exists() and self.metadata_path.exists():
+        if self.index.exists():
             try:
-                self.index = faiss.read_index(str(self.index_path))
-                with open(self.metadata_path, 'rb') as f:
-                    self.metadata = pickle.load(f)
-                print(f"Loaded FAISS index '{self.name}' with {len(self.metadata)} items")
+                self.index.load()
+                if self.legacy_metadata_path.exists():
+                    self._migrate_legacy()
+                self._generation = int(self.meta_store.get_info("generation", "0"))
+                self._reconcile()
+                if self.ann is not None and not self.ann.load(self._generation):
+                    self._refresh_ann()
+                print(f"Loaded {self.index.kind} index '{self.name}' with {self.index.ntotal} items")
             except Exception as e:
                 print(f"Error loading index: {e}")
                 self._create_new_index()
         else:
             self._create_new_index()
 
+    def _migrate_legacy(self):
+        """Move pickled metadata (written by older versions) into the metadata store, then remove it.
+
+        This is the only place a pickle is still read, and only for a file
+        this store wrote itself.
+        """
+        with open(self.legacy_metadata_path, 'rb') as f:
+            stored = pickle.load(f)
+        if isinstance(stored, list):
+            self._migrate_positional(stored)
+        else:
+            for vector_id, meta in stored["items"].items():
+                self._pending[vector_id] = (stored["hashes"].get(vector_id), self._partition(meta), dump_meta(meta))
+            self._generation = stored.get("generation", 0)
+            self.save()
+        self.legacy_metadata_path.unlink()
+        print(f"Migrated metadata of FAISS index '{self.name}' to {self.meta_store.path.name}")
+
+    def _migrate_positional(self, metadata_list: List[Dict]):
+        """Move a pre-id index (flat, metadata by position) to stable ids without re-embedding."""
+        vectors = self.index.vectors()[0] if self.index.ntotal else None
+        self._create_new_index()
+        if vectors is None:
+            return
+        ids, keep = [], []
+        for position, meta in enumerate(metadata_list[:len(vectors)]):
+            key = self._key(meta, None) or f"legacy:{position}"
+            vector_id = stable_id(key)
+            if vector_id in self._pending:
+                continue
+            ids.append(vector_id)
+            keep.append(position)
+            # Text unknown - re-embedded on the next upsert/sync
+            self._pending[vector_id] = (None, self._partition(meta), dump_meta(meta))
+        self.index.add(vectors[keep], np.array(ids, dtype=np.int64))
+        self.save()
+        print(f"Migrated FAISS index '{self.name}' to stable ids ({len(ids)} items)")
+
+    def _reconcile(self):
+        """Drop metadata rows without a vector and vectors without metadata.
+
+        The index file and the metadata store are written one after the
+        other, so a crash in between can leave them apart; dropped items are
+        simply embedded again by the next upsert/sync.
+        """
+        if self.meta_store.count() == self.index.ntotal:
+            return
+        index_ids = set(self.index.ids().tolist())
+        stored_ids = set(self.meta_store.ids())
+        orphans = index_ids - stored_ids
+        if orphans:
+            self.index.remove(np.array(sorted(orphans), dtype=np.int64))
+            self._generation += 1
+        self.meta_store.apply([], sorted(stored_ids - index_ids), {"generation": str(self._generation)})
+        print(f"Reconciled FAISS index '{self.name}': dropped {len(orphans)} vectors, "
+              f"{len(stored_ids - index_ids)} metadata rows")
+
     def _create_new_index(self):
-        """Create a new FAISS index."""
-        if faiss is None:
-            self.embeddings = []
+        """Create a new, empty index."""
+        # Inner product (cosine with normalized vectors), addressed by stable ids
+        self.index.reset()
+        self._pending = {}
+        self.meta_store.clear()
+
+    def _partition(self, meta: Dict) -> Optional[str]:
+        return str(meta.get(self.partition_key, "")) if self.partition_key else None
+
+    def _states(self, ids: Sequence[int]) -> Dict[int, Tuple[Optional[str], Optional[str], str]]:
+        """(text hash, partition, metadata JSON) of the given ids, including unsaved changes."""
+        pending = {vector_id: self._pending[vector_id] for vector_id in ids if vector_id in self._pending}
+        stored = self.meta_store.states([vector_id for vector_id in ids if vector_id not in pending])
+        states = {vector_id: (text_hash, None, meta) for vector_id, (text_hash, meta) in stored.items()}
+        states.update((vector_id, row) for vector_id, row in pending.items() if row is not None)
+        return states
+
+    def _ids(self, partitions: Optional[Collection[str]] = None) -> List[int]:
+        """Ids of all items, or of those in the given partitions, including unsaved changes."""
+        pending = self._pending.copy()  # Searches may run while an upsert is in progress
+        ids = {vector_id for vector_id in self.meta_store.ids(partitions) if vector_id not in pending}
+        ids.update(vector_id for vector_id, row in pending.items()
+                   if row is not None and (partitions is None or row[1] in partitions))
+        return list(ids)
+
+    def _key(self, meta: Dict, text: Optional[str]) -> Optional[str]:
+        """Item key: its key fields if the store has them, else its text."""
+        if self.key_fields and all(meta.get(f) is not None for f in self.key_fields):
+            return "\x1f".join(str(meta[f]) for f in self.key_fields)
+        if text is not None:
+            return "text:" + _text_hash(text)
+        return None
+
+    def _refresh_ann(self):
+        """Build, retrain or drop the ANN index for the current vectors, and persist it."""
+        if self.ann is None:
             return
-        self.index = faiss.IndexFlatIP(self.dimension)  # Inner product (cosine with normalized vectors)
-        self.metadata = []
+        try:
+            self.ann.refresh(self.index.vectors, self.index.ntotal)
+            self.ann.save(self._generation)
+        except Exception as e:
+            print(f"Warning: Could not build {self.ann.index_type} index for '{self.name}', "
+                  f"using exact search: {e}")
+            self.ann.drop()
 
     def save(self):
         """Save index to disk."""
-        if faiss is None:
-            return
-        if self.index is not None:
-            faiss.write_index(self.index, str(self.index_path))
-            with open(self.metadata_path, 'wb') as f:
-                pickle.dump(self.metadata, f)
-            print(f"Saved FAISS index '{self.name}' with {len(self.metadata)} items")
+        self.index.save()
+        # Vectors first: if the metadata write is lost, the old hashes make the next sync re-embed
+        written = len(self._pending)
+        self.meta_store.apply(
+            [(vector_id,) + row for vector_id, row in self._pending.items() if row is not None],
+            [vector_id for vector_id, row in self._pending.items() if row is None],
+            {"generation": str(self._generation)},
+        )
+        self._pending = {}
+        self._refresh_ann()
+        print(f"Saved {self.index.kind} index '{self.name}' with {self.index.ntotal} items ({written} metadata rows written)")
 
-    def add(self, texts: List[str], metadata_list: List[Dict]):
-        """Add texts with their metadata to the index."""
+    # ----- maintenance -----
+
+    def upsert(self, texts: List[str], metadata_list: List[Dict], save: bool = True) -> int:
+        """Add or update items; only new or changed texts are embedded. Returns how many were."""
         if not texts:
-            return
+            return 0
+
+        items: Dict[int, Tuple[str, Dict]] = {}  # Duplicate keys: last one wins
+        for text, meta in zip(texts, metadata_list):
+            items[stable_id(self._key(meta, text))] = (text, meta)
+        states = self._states(list(items))
+        changed = {vector_id: text for vector_id, (text, _) in items.items()
+                   if vector_id not in states or states[vector_id][0] != _text_hash(text)}
+
+        if changed:
+            # Generate embeddings
+            embeddings_np = np.array(embed_documents(list(changed.values())), dtype=np.float32)
+
+            # Normalize for cosine similarity
+            normalize(embeddings_np)
+
+            ids = np.array(list(changed), dtype=np.int64)
+            replaced = np.array([vector_id for vector_id in changed if vector_id in states], dtype=np.int64)
+            self.index.remove(ids)
+            self.index.add(embeddings_np, ids)
+            if self.ann is not None:
+                if len(replaced):
+                    self.ann.remove(replaced)
+                self.ann.add(embeddings_np, ids)
+            self._generation += 1
 
-        # Generate embeddings
-        embeddings = embed_documents(texts)
+        for vector_id, (text, meta) in items.items():
+            # Metadata-only changes need no embedding; unchanged items are not rewritten
+            row = (_text_hash(text), self._partition(meta), dump_meta(meta))
+            current = states.get(vector_id)
+            if current is None or current[0] != row[0] or current[2] != row[2]:
+                self._pending[vector_id] = row
 
-        # Normalize for cosine similarity
-        embeddings_np = np.array(embeddings, dtype=np.float32)
-        faiss.normalize_L2(embeddings_np)
+        if save:
+            self.save()
+        return len(changed)
 
-        # Add to index
-        self.index.add(embeddings_np)
-        self.metadata.extend(metadata_list)
+    def add(self, texts: List[str], metadata_list: List[Dict]):
+        """Add texts with their metadata to the index."""
+        self.upsert(texts, metadata_list)
+
+    def delete(self, ids: Iterable[int], save: bool = True) -> int:
+        """Remove items by id. Returns how many were removed."""
+        ids = list(self._states(list(ids)))
+        if not ids:
+            return 0
+        self.index.remove(np.array(ids, dtype=np.int64))
+        if self.ann is not None:
+            self.ann.remove(np.array(ids, dtype=np.int64))
+        self._generation += 1
+        for vector_id in ids:
+            self._pending[vector_id] = None
+        if save:
+            self.save()
+        return len(ids)
 
-        # Save after adding
+    def sync(self, texts: List[str], metadata_list: List[Dict],
+             partitions: Optional[Collection[str]] = None) -> Tuple[int, int]:
+        """Make the store (or just the given partitions) hold exactly these items.
+
+        Returns (embedded, deleted).
+        """
+        keep = {stable_id(self._key(meta, text)) for text, meta in zip(texts, metadata_list)}
+        scope = self._ids(partitions if self.partition_key else None)
+        deleted = self.delete([vector_id for vector_id in scope if vector_id not in keep], save=False)
+        embedded = self.upsert(texts, metadata_list, save=False)
         self.save()
+        print(f"Synced FAISS index '{self.name}': {embedded} embedded, {deleted} deleted, "
+              f"{len(keep) - embedded} unchanged")
+        return embedded, deleted
+
+    # ----- search -----
 
-    def search(self, query: str, top_k: int = 5) -> List[Tuple[Dict, float]]:
-        """Search for similar items."""
-        if faiss is None or self.index is None or self.index.ntotal == 0:
+    def search(self, query: str, top_k: int = 5,
+               partitions: Optional[Collection[str]] = None) -> List[Tuple[Dict, float]]:
+        """Search for similar items, optionally only within some partitions (e.g. visible databases)."""
+        if self.index.ntotal == 0:
             return []
 
+        subset = allowed_ids = None
+        if partitions is not None and self.partition_key:
+            ids = self._ids(partitions)
+            if not ids:
+                return []
+            if len(ids) < self.index.ntotal:
+                # Only the selected vectors are scored, so top-k always holds k of them
+                subset = np.array(ids, dtype=np.int64)
+                allowed_ids = set(ids)  # Backstop for FAISS < 1.7.3, which scores everything
+
         # Generate query embedding
-        query_embedding = np.array([embed_query(query)], dtype=np.float32)
-        faiss.normalize_L2(query_embedding)
+        query_embedding = normalize(np.array([embed_query(query)], dtype=np.float32))
 
         # Search
-        scores, indices = self.index.search(query_embedding, min(top_k, self.index.ntotal))
+        k = min(top_k, len(subset) if subset is not None else self.index.ntotal)
+        scores, indices = self._search_vectors(query_embedding, k, subset)
+
+        # Return results with metadata, read only for the hits
+        hits = [(int(vector_id), float(score)) for score, vector_id in zip(scores[0], indices[0])
+                if vector_id >= 0 and (allowed_ids is None or vector_id in allowed_ids)][:k]
+        metas = self._metadata([vector_id for vector_id, _ in hits])
+        return [(metas[vector_id], score) for vector_id, score in hits if vector_id in metas]
+
+    def _search_vectors(self, queries: np.ndarray, k: int,
+                        subset: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """ANN index for unrestricted searches, exact index for partition-restricted ones.
+
+        IVF only scans nprobe cells, so a selector holding one partition's ids
+        would mostly miss them; scoring just the subset exactly is cheap and
+        always returns k hits.
+        """
+        if subset is None and self.ann is not None and self.ann.usable:
+            return self.ann.search(queries, k)
+        return self.index.search(queries, k, subset)
+
+    def _metadata(self, ids: List[int]) -> Dict[int, Dict]:
+        """Metadata of the given ids, including unsaved changes."""
+        metas = self.meta_store.get_many([vector_id for vector_id in ids if vector_id not in self._pending])
+        for vector_id in ids:
+            row = self._pending.get(vector_id)
+            if row is not None:
+                metas[vector_id] = json.loads(row[2])
+        return metas
+
+    def benchmark_ann(self, index_type: Optional[str] = None, k: int = 10, n_queries: int = 200,
+                      sweep: Optional[Sequence[int]] = None) -> List[Dict]:
+        """Recall@k vs exact search and latency of an ANN index over this store's vectors.
+
+        Uses the store's configured ANN index unless index_type names another one.
+        Partitioned stores also get a "filtered" row: searches restricted to one
+        partition through the store's own search path, with `full_k` the share
+        of them that returned min(k, partition size) hits.
+        """
+        if faiss is None or not self.count:
+            return []  # ANN indexes need FAISS
+        ann = self.ann
+        if index_type is not None and (ann is None or ann.index_type != index_type):
+            ann = AnnIndex(f"{self.name}.benchmark", index_type, self.dimension, settings.FAISS_INDEX_DIR,
+                           hnsw_m=getattr(settings, "FAISS_HNSW_M", 32),
+                           pq_m=getattr(settings, "FAISS_PQ_M", 32))
+        if ann is None:
+            raise ValueError(f"Store '{self.name}' has no ANN index configured; pass index_type")
+        vectors, ids = self.index.vectors()
+        report = ann.benchmark(vectors, ids, k=k, n_queries=n_queries, sweep=sweep)
+        if self.partition_key:
+            report.append(self._benchmark_filtered(vectors, ids, k, n_queries, report[0]))
+        return report
 
-        # Return results with metadata
-        results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx < len(self.metadata):
-                results.append((self.metadata[idx], float(score)))
+    def _benchmark_filtered(self, vectors: np.ndarray, ids: np.ndarray, k: int, n_queries: int,
+                            flat_row: Dict) -> Dict:
+        """Recall@k and hit count of partition-restricted searches (see benchmark_ann)."""
+        rng = np.random.default_rng(0)
+        partitions = self.meta_store.partitions()
+        positions = {int(vector_id): position for position, vector_id in enumerate(ids.tolist())}
+        hits = expected = full = searches = 0
+        elapsed = 0.0
+        for value in rng.permutation(partitions)[:n_queries].tolist():
+            subset = np.array([i for i in self._ids([value]) if i in positions], dtype=np.int64)
+            if not len(subset):
+                continue
+            rows = vectors[[positions[i] for i in subset.tolist()]]
+            query = rows[rng.integers(len(rows))][None, :] + rng.normal(0, 0.05, (1, vectors.shape[1]))
+            query = normalize(query.astype(np.float32))
+            k_part = min(k, len(subset))
+            truth = set(subset[np.argsort(-(rows @ query[0]))[:k_part]].tolist())
 
-        return results
+            step_start = time.perf_counter()
+            _, found = self._search_vectors(query, k_part, subset if len(subset) < len(ids) else None)
+            elapsed += time.perf_counter() - step_start
+            found = [i for i in found[0].tolist() if i >= 0][:k_part]
+            hits += len(truth & set(found))
+            expected += k_part
+            full += len(found) == k_part
+            searches += 1
+        row = {key: None for key in flat_row}
+        row.update({
+            "index": "filtered",
+            f"recall@{k}": round(hits / expected, 4) if expected else 1.0,
+            "ms_per_query": round(elapsed * 1000 / searches, 4) if searches else 0.0,
+            "full_k": round(full / searches, 4) if searches else 1.0,
+        })
+        return row
 
     def clear(self):
         """Clear the index."""
         self._create_new_index()
+        if self.ann is not None:
+            self.ann.drop()
         # Remove files
-        if self.index_path.exists():
-            self.index_path.unlink()
-        if self.metadata_path.exists():
-            self.metadata_path.unlink()
+        self.index.delete_files()
+        if self.legacy_metadata_path.exists():
+            self.legacy_metadata_path.unlink()
 
     @property
     def count(self) -> int:
         """Get number of items in index."""
-        if faiss is None:
-            return len(self.embeddings) if hasattr(self, 'embeddings') else 0
-        return self.index.ntotal if self.index else 0
+        return self.index.ntotal
 
 
 # Singleton instances
@@ -134,7 +437,9 @@ def get_schema_store() -> FAISSVectorStore:
     """Get the schema metadata vector store."""
     global _schema_store
     if _schema_store is None:
-        _schema_store = FAISSVectorStore("schema_metadata")
+        _schema_store = FAISSVectorStore("schema_metadata", partition_key="db_name",
+                                         key_fields=("db_name", "table_name"),
+                                         index_type=getattr(settings, "FAISS_SCHEMA_INDEX_TYPE", "flat"))
     return _schema_store
 
 
@@ -142,5 +447,7 @@ def get_document_store() -> FAISSVectorStore:
     """Get the document chunks vector store."""
     global _document_store
     if _document_store is None:
-        _document_store = FAISSVectorStore("document_chunks")
+        _document_store = FAISSVectorStore("document_chunks",
+                                           key_fields=("document_name", "chunk_index"),
+                                           index_type=getattr(settings, "FAISS_DOCUMENT_INDEX_TYPE", "flat"))
     return _document_store
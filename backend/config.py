@@ -37,9 +37,52 @@ class Settings(BaseSettings):
 
     # App
     INTENT_CONFIDENCE_THRESHOLD: float = 0.7
+    LOCAL_ROUTER_ENABLED: bool = True  # Local intent/rewrite classifier trained from past LLM decisions
+    LOCAL_ROUTER_CONFIDENCE: float = 0.9  # Below this the LLM still decides
+    LOCAL_ROUTER_MIN_EXAMPLES: int = 50  # Per task, before a model is trained at all
+    LOCAL_ROUTER_MIN_PRECISION: float = 0.95  # Held-out precision of confident predictions required to use a model
+    LOCAL_ROUTER_RETRAIN_SECONDS: int = 1800
+    SCHEMA_SNAPSHOT_ENABLED: bool = True  # Load the parsed schema from a binary snapshot at startup when unchanged
+    V1_SPECULATIVE_SCHEMA_RETRIEVAL: bool = True  # v1 chat: retrieve schemas while the intent is being classified
     SQL_MAX_RETRIES: int = 3
     SQL_TIMEOUT_SECONDS: int = 10
+    CHAT_REQUEST_TIMEOUT_SECONDS: int = 90  # Overall budget per chat request (0 = no deadline)
+    LLM_REQUEST_TIMEOUT_SECONDS: int = 120  # Upper bound for a single LLM HTTP call
+    DEADLINE_MIN_CORRECTION_SECONDS: int = 15  # Don't start an LLM correction/rewrite with less budget left
+    DEADLINE_MIN_SUMMARY_SECONDS: int = 8  # Below this, skip the LLM summary and return a plain one
     SCHEMA_TOP_K: int = 8
+    SCHEMA_RRF_K: int = 60  # Reciprocal rank fusion constant for keyword + vector schema retrieval
+    SCHEMA_DENSE_TIMEOUT_SECONDS: float = 5  # Use keyword results alone if vector retrieval takes longer
+    SCHEMA_JOIN_MAX_BRIDGE_TABLES: int = 3  # Extra tables added to connect retrieved tables via the FK graph
+    SCHEMA_JOIN_KEYS: str = "employee_id"  # Comma-separated columns that join tables across databases
+    FAISS_SCHEMA_INDEX_TYPE: str = "flat"  # flat | hnsw | ivf_flat | ivf_pq (ANN types need FAISS_ANN_MIN_VECTORS)
+    FAISS_DOCUMENT_INDEX_TYPE: str = "flat"  # flat | hnsw | ivf_flat | ivf_pq
+    FAISS_ANN_MIN_VECTORS: int = 2000  # Below this many vectors the exact flat index is searched
+    FAISS_HNSW_M: int = 32  # HNSW graph degree
+    FAISS_HNSW_EF_SEARCH: int = 64  # Default HNSW search breadth (persisted per store once tuned)
+    FAISS_IVF_NPROBE: int = 8  # Default IVF cells scanned per query (persisted per store once tuned)
+    FAISS_PQ_M: int = 32  # IVF-PQ sub-quantizers (vectors are zero-padded to a multiple)
+    VECTOR_BACKEND: str = "auto"  # auto | faiss | numpy (auto = faiss if installed)
+    VECTOR_FALLBACK_DTYPE: str = "float32"  # float32 | float16 (half the size, slower search) for the numpy backend
+    SQL_STREAMING_GENERATION: bool = False  # Stream SQL generation and execute as soon as the "sql" field is complete
+    FEW_SHOT_TOP_K: int = 3  # Past (question, SQL) examples added to each generation prompt
+    FEW_SHOT_TOKEN_BUDGET: int = 800  # Token cap for those examples
+    FEW_SHOT_REFRESH_SECONDS: int = 600  # How often the examples are reloaded from the query log
+    SQL_FOLLOWUP_EDITS: bool = True  # Apply simple follow-ups ("only captains", "top 10") to the previous SQL without the LLM
+    SQL_PARALLEL_CANDIDATES: int = 0  # >1: race this many corrections concurrently after the first failure
+    BATCH_MAX_CONCURRENCY: int = 4  # Upper bound on questions run in parallel by the batch API
+    SUMMARY_JOB_WORKERS: int = 4  # Background summarization workers (async_summary requests)
+    SUMMARY_JOB_TTL_SECONDS: int = 600  # How long finished summary jobs stay pollable
+    TEMPLATE_SUMMARY_MAX_ROWS: int = 5  # Results up to this size are summarised locally (0 = always use the LLM)
+    TEMPLATE_SUMMARY_MAX_COLUMNS: int = 4  # Max columns for a templated single-row summary
+    SUMMARY_ROWS_TOKEN_BUDGET: int = 4000  # Rows are sent to the summary LLM only if they all fit; else stats mode
+    SUMMARY_SAMPLE_TOKEN_BUDGET: int = 400  # Sample rows shown alongside stats-mode summaries
+    SUMMARY_MAX_VALUE_CHARS: int = 200  # Longer cell values are truncated in summary prompts
+    # Cost guard (EXPLAIN QUERY PLAN before execution): off | limit | rewrite | reject
+    SQL_COST_POLICY: str = "limit"
+    SQL_COST_MAX_SCAN_ROWS: int = 500000  # Full scans above this are flagged
+    SQL_COST_MAX_ESTIMATED_ROWS: int = 5000000  # Nested-loop row combinations above this are flagged
+    SQL_COST_AUTO_LIMIT: int = 5000  # LIMIT appended to unbounded expensive queries
 
     # PII Masking (disabled by default - client enables via Admin Panel)
     PII_MASKING_ENABLED: bool = False
@@ -68,6 +111,11 @@ class Settings(BaseSettings):
         """FAISS index directory - always relative to project root."""
         return str(BASE_DIR / "data" / "faiss_indexes")
 
+    @property
+    def SCHEMA_SNAPSHOT_DIR(self) -> str:
+        """Binary schema snapshots (fast startup) - always relative to project root."""
+        return str(BASE_DIR / "data" / "schema_snapshots")
+
     @property
     def POLICY_DOCS_DIR(self) -> str:
         """Policy documents directory - always relative to project root."""
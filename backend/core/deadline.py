@@ -0,0 +1,58 @@
+"""Request-scoped deadlines.
+
+A Deadline is created once per chat request at the API layer and handed down
+through the pipeline. Each stage asks it for a timeout (the remaining budget,
+capped by the stage's own default) and whether there is still time for
+optional work such as SQL corrections or an LLM-written summary.
+"""
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a stage is started after the request's deadline has passed."""
+
+
+class Deadline:
+    """Absolute point in time by which a request should be answered."""
+
+    def __init__(self, expires_at: Optional[float] = None):
+        self.expires_at = expires_at  # time.monotonic() value; None = unbounded
+
+    @classmethod
+    def after(cls, seconds: Optional[float]) -> "Deadline":
+        """Deadline `seconds` from now (unbounded if seconds is None or <= 0)."""
+        if not seconds or seconds <= 0:
+            return cls(None)
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None if unbounded."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def allows(self, seconds: float) -> bool:
+        """True if at least `seconds` of budget is left."""
+        remaining = self.remaining()
+        return remaining is None or remaining >= seconds
+
+    def check(self, stage: str = "request"):
+        """Raise DeadlineExceeded if the deadline has passed."""
+        if self.expired:
+            raise DeadlineExceeded(f"Deadline exceeded before {stage}")
+
+    def timeout(self, default: float, stage: str = "request") -> float:
+        """Timeout for the next blocking call: the remaining budget, capped at default."""
+        self.check(stage)
+        remaining = self.remaining()
+        return default if remaining is None else min(default, remaining)
+
+    def __repr__(self) -> str:
+        remaining = self.remaining()
+        return "Deadline(unbounded)" if remaining is None else f"Deadline(remaining={remaining:.1f}s)"
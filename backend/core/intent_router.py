@@ -6,6 +6,7 @@ from pydantic import BaseModel
 from backend.llm.client import get_llm_client
 from backend.llm.prompts import INTENT_CLASSIFICATION_PROMPT
 from backend.config import settings
+from backend.core.local_router import TASK_INTENT, get_local_router
 
 
 class IntentResult(BaseModel):
@@ -58,6 +59,18 @@ def classify_intent(
             detected_entities=[]
         )
 
+    # Local classifier trained on past decisions - only trusted when confident
+    router = get_local_router()
+    local = router.predict(TASK_INTENT, query)
+    if local is not None:
+        is_data, probability = local
+        return IntentResult(
+            intent="DATA" if is_data else "GENERAL",
+            confidence=round(probability, 3),
+            reasoning="Local classifier",
+            detected_entities=[]
+        )
+
     # LLM classification for ambiguous queries - use fast model (gpt-4o-mini)
     client = get_llm_client()
 
@@ -92,6 +105,9 @@ def classify_intent(
         follow_up = result.get("follow_up_question")
         entities = result.get("detected_entities", [])
 
+        if intent in ("DATA", "GENERAL") and confidence >= settings.INTENT_CONFIDENCE_THRESHOLD:
+            router.log_decision(TASK_INTENT, query, intent == "DATA")
+
         # If confidence is below threshold, set follow-up question
         if confidence < settings.INTENT_CONFIDENCE_THRESHOLD and not follow_up:
             follow_up = generate_clarification_question(query, intent)
@@ -0,0 +1,291 @@
+"""Local routing classifier - answers intent / rewrite decisions without an LLM call.
+
+Two small binary models (hashed word and character n-grams + logistic
+regression) are trained from past routing decisions:
+
+- intent:  DATA vs GENERAL, from LLM classifications in `routing_log`
+- rewrite: whether a follow-up really needed rewriting into a standalone
+           question, from past LLM rewrites in `routing_log`
+
+A model is only used for predictions at or beyond LOCAL_ROUTER_CONFIDENCE
+(either side), and only if those confident predictions were at least
+LOCAL_ROUTER_MIN_PRECISION accurate on a held-out split. Everything near the
+decision boundary still goes to the LLM, whose answer is logged for the next
+retrain. Only LLM decisions are trained on - never the model's own predictions,
+which would just reinforce its mistakes. Training runs in a background thread
+every LOCAL_ROUTER_RETRAIN_SECONDS.
+"""
+import re
+import math
+import time
+import zlib
+import random
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from backend.config import settings
+
+logger = logging.getLogger("chatbot.core.local_router")
+
+
+# Feature space size (hashed)
+FEATURE_DIM = 1 << 18
+# Share of examples held out to measure precision before a model is trusted
+HOLDOUT_FRACTION = 0.2
+# Most recent log rows read per task
+MAX_TRAINING_EXAMPLES = 20000
+
+TASK_INTENT = "intent"
+TASK_REWRITE = "rewrite"
+
+# Text is lowercased first, so PII placeholders like [EMAIL_1] appear as [email_1]
+_WORD_RE = re.compile(r"[a-z0-9]+|\[[a-z_0-9]+\]|[?!]")
+
+
+def _ensure_routing_log_table():
+    """Create the routing_log table if it doesn't exist."""
+    conn = sqlite3.connect(settings.app_db_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS routing_log (
+            log_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+            task        TEXT NOT NULL,
+            query       TEXT NOT NULL,
+            label       INTEGER NOT NULL,
+            source      TEXT NOT NULL,
+            created_at  TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+
+def features(text: str) -> Dict[int, float]:
+    """L2-normalised hashed word uni/bigrams and character trigrams."""
+    words = _WORD_RE.findall((text or "").lower())
+    grams = [f"w:{w}" for w in words]
+    grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    padded = f" {' '.join(words)} "
+    grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    grams.append(f"n:{min(len(words), 12)}")  # Length bucket
+
+    vector: Dict[int, float] = {}
+    for gram in grams:
+        index = zlib.crc32(gram.encode("utf-8")) & (FEATURE_DIM - 1)
+        vector[index] = vector.get(index, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {i: v / norm for i, v in vector.items()}
+
+
+def _sigmoid(z: float) -> float:
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+
+class LogisticModel:
+    """Binary logistic regression over sparse hashed features, trained with SGD."""
+
+    def __init__(self, epochs: int = 8, learning_rate: float = 0.5, l2: float = 1e-5):
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.weights: Dict[int, float] = {}
+        self.bias = 0.0
+
+    def fit(self, examples: List[Tuple[Dict[int, float], int]]) -> "LogisticModel":
+        positives = sum(label for _, label in examples)
+        negatives = len(examples) - positives
+        if not positives or not negatives:
+            raise ValueError("need examples of both classes")
+        # Balance the classes so a skewed log doesn't just learn the majority label
+        class_weight = {1: len(examples) / (2 * positives), 0: len(examples) / (2 * negatives)}
+
+        order = list(range(len(examples)))
+        rng = random.Random(0)
+        weights = self.weights
+        for epoch in range(self.epochs):
+            rng.shuffle(order)
+            rate = self.learning_rate / (1 + epoch)
+            for position in order:
+                x, label = examples[position]
+                gradient = (self._score(x) - label) * class_weight[label]
+                for i, value in x.items():
+                    w = weights.get(i, 0.0)
+                    weights[i] = w - rate * (gradient * value + self.l2 * w)
+                self.bias -= rate * gradient
+        return self
+
+    def _score(self, x: Dict[int, float]) -> float:
+        weights = self.weights
+        return _sigmoid(self.bias + sum(weights.get(i, 0.0) * v for i, v in x.items()))
+
+    def predict_proba(self, text: str) -> float:
+        """Probability of the positive class."""
+        return self._score(features(text))
+
+
+@dataclass
+class RouterModel:
+    """A trained model and how far it can be trusted."""
+    model: LogisticModel
+    examples: int
+    precision: float  # On confident held-out predictions
+    coverage: float   # Share of held-out examples predicted confidently
+    trusted: bool
+
+
+class LocalRouter:
+    """Holds the per-task models, retrains them from the logs and answers confident cases."""
+
+    def __init__(self):
+        self.enabled = getattr(settings, "LOCAL_ROUTER_ENABLED", True)
+        self.confidence = getattr(settings, "LOCAL_ROUTER_CONFIDENCE", 0.9)
+        self.min_examples = getattr(settings, "LOCAL_ROUTER_MIN_EXAMPLES", 50)
+        self.min_precision = getattr(settings, "LOCAL_ROUTER_MIN_PRECISION", 0.95)
+        self.retrain_seconds = getattr(settings, "LOCAL_ROUTER_RETRAIN_SECONDS", 1800)
+        self._models: Dict[str, RouterModel] = {}
+        self._trained_at = 0.0
+        self._training = False
+        self._lock = threading.Lock()
+
+    # ----- training data -----
+
+    def log_decision(self, task: str, query: str, label: bool, source: str = "llm"):
+        """Record a decision made by the LLM (or patterns) for the next retrain."""
+        if not self.enabled or not query:
+            return
+        try:
+            _ensure_routing_log_table()
+            conn = sqlite3.connect(settings.app_db_path)
+            conn.execute("INSERT INTO routing_log (task, query, label, source) VALUES (?, ?, ?, ?)",
+                         (task, query.strip()[:500], int(label), source))
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"[local_router] Could not log {task} decision: {e}")
+
+    def _load_examples(self, task: str) -> List[Tuple[str, int]]:
+        _ensure_routing_log_table()
+        conn = sqlite3.connect(settings.app_db_path)
+        try:
+            rows = conn.execute(
+                "SELECT query, label FROM routing_log WHERE task = ? AND source = 'llm' "
+                "ORDER BY log_id DESC LIMIT ?",
+                (task, MAX_TRAINING_EXAMPLES)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"[local_router] Could not read {task} examples: {e}")
+            rows = []
+        finally:
+            conn.close()
+
+        examples, seen = [], set()
+        for query, label in rows:
+            key = " ".join((query or "").lower().split())
+            if key and key not in seen:  # Newest label wins
+                seen.add(key)
+                examples.append((key, int(label)))
+        return examples
+
+    def _train_task(self, task: str) -> Optional[RouterModel]:
+        texts = self._load_examples(task)
+        if len(texts) < self.min_examples:
+            logger.info(f"[local_router] {task}: {len(texts)} examples, need {self.min_examples} - using LLM")
+            return None
+        examples = [(features(text), label) for text, label in texts]
+        if len({label for _, label in examples}) < 2:
+            return None
+
+        rng = random.Random(42)
+        rng.shuffle(examples)
+        split = max(1, int(len(examples) * HOLDOUT_FRACTION))
+        holdout, train = examples[:split], examples[split:]
+        try:
+            model = LogisticModel().fit(train)
+        except ValueError:
+            return None
+
+        confident = correct = 0
+        for x, label in holdout:
+            p = model._score(x)
+            if p >= self.confidence or p <= 1 - self.confidence:
+                confident += 1
+                correct += int((p >= 0.5) == bool(label))
+        precision = correct / confident if confident else 0.0
+        coverage = confident / len(holdout)
+        trusted = confident > 0 and precision >= self.min_precision
+
+        if trusted:
+            model = LogisticModel().fit(examples)  # Final model uses every example
+        return RouterModel(model=model, examples=len(examples), precision=precision,
+                           coverage=coverage, trusted=trusted)
+
+    def retrain(self):
+        """Retrain every task model from the logs (blocking)."""
+        step_start = time.time()
+        models = {}
+        for task in (TASK_INTENT, TASK_REWRITE):
+            try:
+                trained = self._train_task(task)
+            except Exception as e:
+                logger.warning(f"[local_router] Training {task} failed: {e}")
+                continue
+            if trained:
+                models[task] = trained
+                logger.info(f"[local_router] {task}: {trained.examples} examples | "
+                            f"held-out precision={trained.precision:.3f} coverage={trained.coverage:.2f} | "
+                            f"{'trusted' if trained.trusted else 'not trusted, using LLM'}")
+        self._models = models
+        self._trained_at = time.time()
+        step_ms = int((time.time() - step_start) * 1000)
+        logger.info(f"[local_router] Retrained in {step_ms}ms")
+
+    def _retrain_in_background(self):
+        try:
+            self.retrain()
+        finally:
+            self._trained_at = time.time()
+            self._training = False
+
+    def _ensure_fresh(self):
+        """Kick off a background retrain when the models are stale; never blocks a request."""
+        if self._training or time.time() - self._trained_at < self.retrain_seconds:
+            return
+        with self._lock:
+            if self._training or time.time() - self._trained_at < self.retrain_seconds:
+                return
+            self._training = True
+        threading.Thread(target=self._retrain_in_background, name="local-router-train", daemon=True).start()
+
+    # ----- predictions -----
+
+    def predict(self, task: str, query: str) -> Optional[Tuple[bool, float]]:
+        """(label, probability of that label) if the model is confident, else None (ask the LLM)."""
+        if not self.enabled:
+            return None
+        self._ensure_fresh()
+        trained = self._models.get(task)
+        if trained is None or not trained.trusted:
+            return None
+        p = trained.model.predict_proba(" ".join(query.lower().split()))
+        if p >= self.confidence:
+            return True, p
+        if p <= 1 - self.confidence:
+            return False, 1 - p
+        return None
+
+
+# Singleton
+_local_router: Optional[LocalRouter] = None
+
+
+def get_local_router() -> LocalRouter:
+    """Get or create local router singleton."""
+    global _local_router
+    if _local_router is None:
+        _local_router = LocalRouter()
+    return _local_router
@@ -2,6 +2,11 @@
 from typing import List, Dict
 from backend.llm.client import get_llm_client
 from backend.llm.prompts import QUERY_REWRITE_PROMPT
+from backend.core.local_router import TASK_REWRITE, get_local_router
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().strip().rstrip("?.!").split())
 
 
 def rewrite_query(query: str, conversation_history: List[Dict[str, str]]) -> str:
@@ -29,11 +34,26 @@ def rewrite_query(query: str, conversation_history: List[Dict[str, str]]) -> str
         max_tokens=500
     )
 
-    return response.strip()
+    rewritten = response.strip()
+    # Whether the LLM actually changed anything trains the local rewrite model
+    get_local_router().log_decision(TASK_REWRITE, query, _normalize(rewritten) != _normalize(query))
+    return rewritten
 
 
 def needs_rewriting(query: str) -> bool:
-    """Check if a query likely needs rewriting (contains pronouns, references, or follow-up patterns)."""
+    """Check if a query likely needs rewriting (contains pronouns, references, or follow-up patterns).
+
+    Queries flagged by the heuristics are passed to the local rewrite classifier,
+    which can confidently clear standalone questions and save the rewrite LLM call.
+    """
+    if not _looks_like_followup(query):
+        return False
+    local = get_local_router().predict(TASK_REWRITE, query)
+    return local is None or local[0]
+
+
+def _looks_like_followup(query: str) -> bool:
+    """Pronoun / reference / follow-up-starter heuristics."""
     query_lower = f' {query.lower()} '
 
     # Pronouns that reference previous context
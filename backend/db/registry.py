@@ -211,6 +211,10 @@ class DatabaseRegistry:
         if not self.unregister_database(db_name):
             return False
 
+        # Close pooled connections that still have the file attached
+        from backend.db.session import get_multi_db_pool
+        get_multi_db_pool().clear()
+
         # Delete the actual file
         try:
             if os.path.exists(db_path):
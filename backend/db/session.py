@@ -1,7 +1,8 @@
 """SQLite database session management."""
 import sqlite3
+import threading
 from contextlib import contextmanager
-from typing import Generator, Dict
+from typing import Generator, Dict, List, Optional, Tuple
 from backend.config import settings
 
 
@@ -135,24 +136,8 @@ def get_db_path_by_name(db_name: str) -> str:
     return mapping[db_name]
 
 
-def get_multi_db_connection(visible_only: bool = True) -> sqlite3.Connection:
-    """Get a connection with operational databases ATTACHed.
-
-    This enables cross-database JOINs using the syntax:
-        SELECT * FROM crew_management.crew_members cm
-        JOIN hr_payroll.payroll_records pr ON cm.employee_id = pr.employee_id
-
-    Args:
-        visible_only: If True, only attach visible databases from registry.
-                     If False, attach all databases.
-
-    All databases are attached by their logical name:
-        crew_management, flight_operations, hr_payroll, compliance_training, etc.
-    """
-    conn = sqlite3.connect(":memory:")
-    conn.row_factory = sqlite3.Row
-
-    # Get database mapping based on visibility setting
+def _get_attach_mapping(visible_only: bool = True) -> Dict[str, str]:
+    """Get the {db_name: db_path} mapping to ATTACH, excluding the app database."""
     if visible_only:
         try:
             from backend.db.registry import get_database_registry
@@ -168,9 +153,15 @@ def get_multi_db_connection(visible_only: bool = True) -> sqlite3.Connection:
         except Exception:
             db_mapping = {k: v for k, v in DB_MAPPING.items() if k != "app"}
 
+    return {k: v for k, v in db_mapping.items() if k != "app"}
+
+
+def _open_attached_connection(db_mapping: Dict[str, str], check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open an in-memory connection and ATTACH every database in db_mapping."""
+    conn = sqlite3.connect(":memory:", check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+
     for db_name, db_path in db_mapping.items():
-        if db_name == "app":
-            continue
         try:
             conn.execute(f"ATTACH DATABASE ? AS [{db_name}]", (db_path,))
         except sqlite3.Error:
@@ -179,6 +170,107 @@ def get_multi_db_connection(visible_only: bool = True) -> sqlite3.Connection:
     return conn
 
 
+def get_multi_db_connection(visible_only: bool = True) -> sqlite3.Connection:
+    """Get a connection with operational databases ATTACHed.
+
+    This enables cross-database JOINs using the syntax:
+        SELECT * FROM crew_management.crew_members cm
+        JOIN hr_payroll.payroll_records pr ON cm.employee_id = pr.employee_id
+
+    Args:
+        visible_only: If True, only attach visible databases from registry.
+                     If False, attach all databases.
+
+    All databases are attached by their logical name:
+        crew_management, flight_operations, hr_payroll, compliance_training, etc.
+    """
+    return _open_attached_connection(_get_attach_mapping(visible_only))
+
+
+class MultiDbConnectionPool:
+    """Pool of connections with the operational databases already ATTACHed.
+
+    Opening a connection and attaching every database costs a few milliseconds
+    per query; the pool keeps idle connections around instead. Connections are
+    keyed by the attached {db_name: db_path} mapping, so a visibility change or
+    an upload simply starts a fresh set and stale connections are closed.
+    """
+
+    def __init__(self, max_idle: int = 8):
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle: List[sqlite3.Connection] = []
+        self._key: Optional[Tuple] = None
+
+    def _acquire(self, key: Tuple, db_mapping: Dict[str, str]) -> sqlite3.Connection:
+        with self._lock:
+            if key != self._key:
+                stale, self._idle, self._key = self._idle, [], key
+            else:
+                stale = []
+            conn = self._idle.pop() if self._idle else None
+
+        for old in stale:
+            old.close()
+        if conn is None:
+            conn = _open_attached_connection(db_mapping, check_same_thread=False)
+        return conn
+
+    def _release(self, key: Tuple, conn: sqlite3.Connection) -> None:
+        # Never hand out a connection still inside a transaction or with a callback set
+        try:
+            conn.set_authorizer(None)
+            conn.set_progress_handler(None, 0)
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+
+        with self._lock:
+            if key == self._key and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self, visible_only: bool = True) -> Generator[sqlite3.Connection, None, None]:
+        """Borrow a pooled multi-db connection for the duration of the block."""
+        db_mapping = _get_attach_mapping(visible_only)
+        key = tuple(sorted(db_mapping.items()))
+        conn = self._acquire(key, db_mapping)
+        try:
+            yield conn
+        finally:
+            self._release(key, conn)
+
+    def clear(self) -> None:
+        """Close all idle connections (e.g. after a database file is deleted)."""
+        with self._lock:
+            stale, self._idle, self._key = self._idle, [], None
+        for conn in stale:
+            conn.close()
+
+
+_multi_db_pool: Optional[MultiDbConnectionPool] = None
+_multi_db_pool_lock = threading.Lock()
+
+
+def get_multi_db_pool() -> MultiDbConnectionPool:
+    """Get the multi-db connection pool singleton."""
+    global _multi_db_pool
+    if _multi_db_pool is None:
+        with _multi_db_pool_lock:
+            if _multi_db_pool is None:
+                _multi_db_pool = MultiDbConnectionPool()
+    return _multi_db_pool
+
+
+def pooled_multi_db_connection(visible_only: bool = True):
+    """Context manager yielding a pooled connection with databases ATTACHed."""
+    return get_multi_db_pool().connection(visible_only)
+
+
 def execute_multi_db_query(query: str, params: tuple = ()) -> list:
     """Execute a read query across all attached databases. Returns list of dicts."""
     conn = get_multi_db_connection()
@@ -1,10 +1,12 @@
 """LLM client - uses company API (Coforge/Quasar) only via REST calls."""
+import json
 import time
 import logging
 import requests
 import urllib3
-from typing import Optional, List
+from typing import Iterator, Optional, List
 from backend.config import settings
+from backend.core.deadline import Deadline
 
 logger = logging.getLogger("chatbot.llm.client")
 
@@ -28,6 +30,7 @@ class LLMClient:
         self.verify_ssl = settings.LLM_VERIFY_SSL
         self.proxy = settings.LLM_PROXY
         self.proxies = {"http": self.proxy, "https": self.proxy} if self.proxy else None
+        self.request_timeout = getattr(settings, "LLM_REQUEST_TIMEOUT_SECONDS", 120)
 
         # Validate configuration
         if not self.chat_url:
@@ -52,17 +55,25 @@ class LLMClient:
             "X-API-KEY": self.api_key
         }
 
-    def _request_with_fallback(self, primary_url: str, fallback_url: str, payload: dict, call_type: str = "unknown") -> dict:
-        """Make REST request with v2→v3 fallback."""
+    def _timeout(self, deadline: Optional[Deadline], call_type: str) -> float:
+        """Per-call HTTP timeout: LLM_REQUEST_TIMEOUT_SECONDS, or less if the request deadline is closer."""
+        if deadline is None:
+            return self.request_timeout
+        return deadline.timeout(self.request_timeout, stage=call_type)
+
+    def _request_with_fallback(self, primary_url: str, fallback_url: str, payload: dict, call_type: str = "unknown",
+                               deadline: Optional[Deadline] = None) -> dict:
+        """Make REST request with v2→v3 fallback. Both attempts share the deadline, if given."""
         start = time.time()
         model_used = payload.get("model", "N/A")
         try:
-            logger.info(f"[{call_type}] POST {primary_url} | model={model_used}")
+            timeout = self._timeout(deadline, call_type)
+            logger.info(f"[{call_type}] POST {primary_url} | model={model_used} timeout={timeout:.0f}s")
             response = requests.post(
                 primary_url,
                 headers=self._headers(),
                 json=payload,
-                timeout=120,
+                timeout=timeout,
                 verify=self.verify_ssl,
                 proxies=self.proxies
             )
@@ -84,7 +95,7 @@ class LLMClient:
                 fallback_url,
                 headers=self._headers(),
                 json=payload,
-                timeout=120,
+                timeout=self._timeout(deadline, call_type),
                 verify=self.verify_ssl,
                 proxies=self.proxies
             )
@@ -102,9 +113,14 @@ class LLMClient:
         max_tokens: int = 2000,
         json_mode: bool = False,
         use_fast_model: bool = False,
-        top_p: float = 0.9
+        top_p: float = 0.9,
+        deadline: Optional[Deadline] = None
     ) -> str:
-        """Generate chat completion via REST API."""
+        """Generate chat completion via REST API.
+
+        With a deadline, each HTTP call's timeout is capped at the remaining budget
+        and DeadlineExceeded is raised if it has already run out.
+        """
         model_name = self.fast_model if use_fast_model else self.model
         payload = {
             "model": model_name,
@@ -126,28 +142,124 @@ class LLMClient:
 
         start = time.time()
         try:
-            data = self._request_with_fallback(self.chat_url, self.chat_url_v3, payload, call_type="chat_completion")
+            data = self._request_with_fallback(self.chat_url, self.chat_url_v3, payload, call_type="chat_completion",
+                                               deadline=deadline)
         except Exception as e:
             elapsed_ms = int((time.time() - start) * 1000)
             logger.error(f"[chat_completion] FAILED after {elapsed_ms}ms: {type(e).__name__}: {e}")
             raise
 
         elapsed_ms = int((time.time() - start) * 1000)
+        try:
+            content = self._extract_content(data)
+        except ValueError:
+            logger.error(f"[chat_completion] Unexpected response format after {elapsed_ms}ms: {str(data)[:300]}")
+            raise
+        logger.info(f"[chat_completion] OK {elapsed_ms}ms | response_chars={len(content)}")
+        return content
 
-        # Handle response formats
+    @staticmethod
+    def _extract_content(data: dict) -> str:
+        """Pull the completion text out of the supported response formats."""
         if "choices" in data and len(data["choices"]) > 0:
-            content = data["choices"][0]["message"]["content"]
-            logger.info(f"[chat_completion] OK {elapsed_ms}ms | response_chars={len(content)}")
-            return content
+            return data["choices"][0]["message"]["content"]
         elif "response" in data:
-            logger.info(f"[chat_completion] OK {elapsed_ms}ms | response_chars={len(data['response'])}")
             return data["response"]
         elif "content" in data:
-            logger.info(f"[chat_completion] OK {elapsed_ms}ms | response_chars={len(data['content'])}")
             return data["content"]
-        else:
-            logger.error(f"[chat_completion] Unexpected response format after {elapsed_ms}ms: {str(data)[:300]}")
-            raise ValueError(f"Unexpected response format: {data}")
+        raise ValueError(f"Unexpected response format: {data}")
+
+    def chat_completion_stream(
+        self,
+        messages: List[dict],
+        temperature: float = 0.0,
+        max_tokens: int = 2000,
+        json_mode: bool = False,
+        use_fast_model: bool = False,
+        top_p: float = 0.9,
+        deadline: Optional[Deadline] = None
+    ) -> Iterator[str]:
+        """Stream a chat completion, yielding content chunks as they arrive.
+
+        Requests server-sent events ("stream": true). If the API answers with a
+        plain JSON body instead, the whole content is yielded as a single chunk.
+        Falls back to v3 if the primary request fails before streaming starts.
+        With a deadline, the stream is abandoned (DeadlineExceeded) once it passes.
+        """
+        model_name = self.fast_model if use_fast_model else self.model
+        payload = {
+            "model": model_name,
+            "messages": messages,
+            "temperature": temperature,
+            "top_p": top_p,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+
+        urls = [url for url in (self.chat_url, self.chat_url_v3) if url]
+        start = time.time()
+        for i, url in enumerate(urls):
+            try:
+                timeout = self._timeout(deadline, "chat_stream")
+                logger.info(f"[chat_stream] POST {url} | model={model_name} json_mode={json_mode} timeout={timeout:.0f}s")
+                response = requests.post(
+                    url,
+                    headers=self._headers(),
+                    json=payload,
+                    timeout=timeout,
+                    verify=self.verify_ssl,
+                    proxies=self.proxies,
+                    stream=True
+                )
+                if response.status_code >= 400:
+                    logger.error(f"[chat_stream] HTTP {response.status_code} from {url} | body={response.text[:500]}")
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                elapsed_ms = int((time.time() - start) * 1000)
+                if i == len(urls) - 1:
+                    logger.error(f"[chat_stream] FAILED after {elapsed_ms}ms: {type(e).__name__}: {e}")
+                    raise
+                logger.warning(f"[chat_stream] Primary request failed after {elapsed_ms}ms: {e}, falling back to v3")
+                continue
+
+            with response:
+                if "text/event-stream" not in response.headers.get("Content-Type", ""):
+                    # Endpoint ignored "stream" - deliver the whole answer at once
+                    content = self._extract_content(response.json())
+                    elapsed_ms = int((time.time() - start) * 1000)
+                    logger.info(f"[chat_stream] Non-streaming response {elapsed_ms}ms | response_chars={len(content)}")
+                    yield content
+                    return
+
+                first_chunk_ms = None
+                total_chars = 0
+                for line in response.iter_lines(decode_unicode=True):
+                    if deadline is not None and deadline.expired:
+                        elapsed_ms = int((time.time() - start) * 1000)
+                        logger.warning(f"[chat_stream] Deadline reached after {elapsed_ms}ms, abandoning stream")
+                        deadline.check("chat_stream")
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        event = json.loads(data)
+                    except json.JSONDecodeError:
+                        continue
+                    choices = event.get("choices") or []
+                    delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                    if delta:
+                        if first_chunk_ms is None:
+                            first_chunk_ms = int((time.time() - start) * 1000)
+                        total_chars += len(delta)
+                        yield delta
+
+                elapsed_ms = int((time.time() - start) * 1000)
+                logger.info(f"[chat_stream] OK {elapsed_ms}ms | first_chunk={first_chunk_ms}ms response_chars={total_chars}")
+            return
 
     def chat_completion_with_usage(
         self,
@@ -0,0 +1,85 @@
+"""Incremental JSON scanning for streamed LLM responses.
+
+Lets a caller act on a string field (e.g. "sql") as soon as its closing quote
+arrives, while the rest of the JSON object (e.g. "explanation") is still being
+generated. Only string values are reported; the full response should still be
+parsed normally once the stream ends.
+"""
+import json
+from typing import Dict, Iterable, List
+
+
+class StreamingJsonFieldParser:
+    """Feed JSON text chunk by chunk; get watched string fields back as they complete."""
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = set(fields)
+        self.values: Dict[str, str] = {}
+        self._started = False
+        self._stack: List[str] = []  # "obj" / "arr"
+        self._in_string = False
+        self._escape = False
+        self._string_is_value = False
+        self._expect_value = False
+        self._current: List[str] = []
+        self._last_key = ""
+
+    def feed(self, chunk: str) -> Dict[str, str]:
+        """Consume a chunk and return any watched fields completed by it."""
+        completed = {}
+        for ch in chunk:
+            if not self._started:
+                # Skip anything before the JSON object (e.g. a ```json fence)
+                if ch != "{":
+                    continue
+                self._started = True
+
+            if self._in_string:
+                if self._escape:
+                    self._current.append(ch)
+                    self._escape = False
+                elif ch == "\\":
+                    self._current.append(ch)
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._finish_string(completed)
+                else:
+                    self._current.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_is_value = self._expect_value or (self._stack and self._stack[-1] == "arr")
+                self._current = []
+            elif ch == ":":
+                self._expect_value = True
+            elif ch == "{":
+                self._stack.append("obj")
+                self._expect_value = False
+            elif ch == "[":
+                self._stack.append("arr")
+                self._expect_value = False
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                self._expect_value = False
+            elif ch == ",":
+                self._expect_value = False
+        return completed
+
+    def _finish_string(self, completed: Dict[str, str]):
+        raw = "".join(self._current)
+        try:
+            text = json.loads(f'"{raw}"')
+        except json.JSONDecodeError:
+            text = raw
+
+        if not self._string_is_value:
+            self._last_key = text
+            return
+
+        self._expect_value = False
+        if self._last_key in self.fields and self._last_key not in self.values:
+            self.values[self._last_key] = text
+            completed[self._last_key] = text
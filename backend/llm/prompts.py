@@ -179,6 +179,27 @@ IMPORTANT RULES FOR CORRECTION:
 Generate a corrected SQL query that will work.
 Only output the corrected SQL, no explanations."""
 
+SQL_COST_REWRITE_PROMPT = """The following SQL query is valid but too expensive to run.
+
+Original question: {query}
+
+Expensive SQL:
+{sql}
+
+Problems found in the query plan:
+{issues}
+
+Available schemas:
+{schemas}
+
+Rewrite the query so it answers the same question more cheaply:
+1. Add a join condition for every joined table (no cartesian products).
+2. Filter as early as possible and only select the columns you need.
+3. Prefer aggregation (COUNT, SUM, GROUP BY) over returning every row when the question allows it.
+4. Keep the db_name.table_name prefixes.
+
+Only output the rewritten SQL, no explanations."""
+
 # ============================================================
 # SQL RESULT FORMATTING
 # ============================================================
@@ -189,7 +210,7 @@ User's original question: {query}
 SQL query executed:
 {sql}
 
-Query results (as JSON, may be a subset of total rows):
+Query results ({format_note}):
 {results}
 
 Number of rows returned: {row_count}
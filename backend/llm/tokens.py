@@ -0,0 +1,56 @@
+"""Token counting for prompt budgeting.
+
+Uses tiktoken when it is installed (and its encoding can be loaded); otherwise
+falls back to a ~4 characters per token estimate, which is close enough for
+sizing prompts but not exact.
+"""
+import logging
+from functools import lru_cache
+from typing import Optional
+
+logger = logging.getLogger("chatbot.llm.tokens")
+
+# Encoding used by current GPT-family chat models
+DEFAULT_ENCODING = "o200k_base"
+CHARS_PER_TOKEN = 4
+
+_encoder = None
+_encoder_loaded = False
+
+
+def _get_encoder():
+    """Load the tiktoken encoder once; None if tiktoken is unavailable."""
+    global _encoder, _encoder_loaded
+    if _encoder_loaded:
+        return _encoder
+    _encoder_loaded = True
+    try:
+        import tiktoken
+        _encoder = tiktoken.get_encoding(DEFAULT_ENCODING)
+        logger.info(f"[tokens] Using tiktoken encoding {DEFAULT_ENCODING}")
+    except ImportError:
+        logger.info("[tokens] tiktoken not installed - using character-based estimate")
+    except Exception as e:
+        # Encodings are downloaded on first use; offline hosts fall back too
+        logger.warning(f"[tokens] Could not load tiktoken encoding {DEFAULT_ENCODING}: {e}")
+    return _encoder
+
+
+@lru_cache(maxsize=4096)
+def _count_cached(text: str) -> int:
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Number of tokens in text (exact with tiktoken, estimated otherwise)."""
+    if not text:
+        return 0
+    return _count_cached(text)
+
+
+def is_exact() -> bool:
+    """True if counts come from a real tokenizer rather than the estimate."""
+    return _get_encoder() is not None
@@ -129,11 +129,11 @@ def save_pii_settings(enabled: bool, log_enabled: bool, patterns: Dict[str, bool
 
 
 class PIIMasker:
-    """Masks PII in text using regex patterns."""
+    """Masks PII in text using regex patterns.
 
-    def __init__(self):
-        self.token_map: Dict[str, str] = {}
-        self.counters = {}
+    Stateless: each mask() call builds its own token map, so the shared
+    instance can be used from concurrent requests and threads.
+    """
 
     def _get_active_patterns(self) -> Dict[str, str]:
         """Get currently active PII patterns based on settings."""
@@ -146,17 +146,16 @@ class PIIMasker:
                 active[pii_type] = info['pattern']
         return active
 
-    def _get_token(self, pii_type: str) -> str:
+    @staticmethod
+    def _get_token(pii_type: str, counters: Dict[str, int]) -> str:
         """Generate a unique token for a PII type."""
-        if pii_type not in self.counters:
-            self.counters[pii_type] = 0
-        self.counters[pii_type] += 1
-        return f"[{pii_type}_{self.counters[pii_type]}]"
+        counters[pii_type] = counters.get(pii_type, 0) + 1
+        return f"[{pii_type}_{counters[pii_type]}]"
 
     def mask(self, text: str) -> Tuple[str, Dict[str, str]]:
         """Mask PII in text and return masked text with token map."""
-        self.token_map = {}
-        self.counters = {}
+        token_map: Dict[str, str] = {}
+        counters: Dict[str, int] = {}
 
         # Check if PII masking is enabled
         pii_settings = get_pii_settings()
@@ -169,11 +168,11 @@ class PIIMasker:
         for pii_type, pattern in active_patterns.items():
             matches = re.findall(pattern, masked_text, re.IGNORECASE)
             for match in set(matches):
-                token = self._get_token(pii_type)
-                self.token_map[token] = match
+                token = self._get_token(pii_type, counters)
+                token_map[token] = match
                 masked_text = masked_text.replace(match, token)
 
-        return masked_text, self.token_map
+        return masked_text, token_map
 
     def unmask(self, text: str, token_map: Dict[str, str]) -> str:
         """Restore original PII values from tokens."""
@@ -222,6 +221,15 @@ def mask_pii(text: str) -> Tuple[str, Dict[str, str]]:
     return masker.mask(text)
 
 
+def contains_any_pii(text: str) -> bool:
+    """Check text against every known PII pattern, whatever the masking settings.
+
+    For text that is stored or reused outside the request it came from, where
+    masking being switched off for chat is no reason to let PII through.
+    """
+    return any(re.search(info['pattern'], text, re.IGNORECASE) for info in DEFAULT_PII_PATTERNS.values())
+
+
 def unmask_pii(text: str, token_map: Dict[str, str]) -> str:
     """Convenience function to unmask PII."""
     masker = get_masker()
@@ -106,7 +106,6 @@ class DocumentIngestion:
             return
 
         store = get_document_store()
-        store.clear()
 
         all_chunks = []
         for doc in documents:
@@ -118,7 +117,7 @@ class DocumentIngestion:
         texts = [c["chunk_text"] for c in all_chunks]
         metadata = all_chunks
 
-        store.add(texts, metadata)
+        store.sync(texts, metadata)  # Unchanged chunks keep their vectors
         print(f"Ingested {len(all_chunks)} chunks from {len(documents)} documents")
 
 
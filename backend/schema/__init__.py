@@ -4,12 +4,14 @@ from backend.schema.loader import (
     SchemaLoader,
     SchemaStats,
     get_schema_loader,
-    reload_schema
+    reload_schema,
+    reload_database_schema
 )
 
 __all__ = [
     "SchemaLoader",
     "SchemaStats",
     "get_schema_loader",
-    "reload_schema"
+    "reload_schema",
+    "reload_database_schema"
 ]
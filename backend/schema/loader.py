@@ -1,11 +1,26 @@
-"""Schema loader - loads extracted schema for use in prompts."""
+"""Schema loader - loads extracted schema for use in prompts.
 
+Each database carries a version that is bumped whenever it is (re)loaded. The
+prompt text is assembled from per-database fragments cached by version, so
+reloading one database after an upload, delete or description edit only
+re-reads and re-renders that database.
+
+The built model (schema data, versions and rendered fragments) is written to a
+binary snapshot after every change and restored from it at startup when the
+sources haven't changed (see backend.schema.snapshot).
+"""
+
+import copy
 import json
+import time
 import sqlite3
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Set
 from dataclasses import dataclass
 
+# Binary snapshot of the built schema model (see backend.schema.snapshot)
+SNAPSHOT_NAME = "schema_loader"
+
 
 @dataclass
 class SchemaStats:
@@ -35,7 +50,11 @@ class SchemaLoader:
     _instance = None
     _schema_data = None
     _schema_text = None
-    _visible_schema_text = None
+    _visible_schema_text = None  # (visible db names, schema_version, text)
+    _json_databases = None  # Pristine copies of the databases from the JSON file, by name
+    _db_versions = None  # db name -> version, bumped on every reload of that database
+    _fragments = None  # db name -> (version, rendered prompt text)
+    schema_version = 0  # Bumped on every schema change
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
@@ -62,8 +81,42 @@ class SchemaLoader:
 
         return None
 
-    def _load_schema(self):
+    def _restore_snapshot(self) -> bool:
+        """Restore the built schema model from a current snapshot, if there is one."""
+        from backend.schema.snapshot import read_snapshot, source_fingerprint
+
+        payload = read_snapshot(SNAPSHOT_NAME, source_fingerprint(self._schema_path))
+        if payload is None:
+            return False
+        self._schema_data = payload["schema_data"]
+        self._json_databases = payload["json_databases"]
+        self._db_versions = payload["db_versions"]
+        self._fragments = payload["fragments"]
+        self._schema_text = payload["schema_text"]
+        self.schema_version = payload["schema_version"]
+        self._visible_schema_text = None
+        return True
+
+    def _write_snapshot(self):
+        from backend.schema.snapshot import source_fingerprint, write_snapshot
+
+        write_snapshot(SNAPSHOT_NAME, source_fingerprint(self._schema_path), {
+            "schema_data": self._schema_data,
+            "json_databases": self._json_databases,
+            "db_versions": self._db_versions,
+            "fragments": self._fragments,
+            "schema_text": self._schema_text,
+            "schema_version": self.schema_version,
+        })
+
+    def _load_schema(self, use_snapshot: bool = True):
         """Load schema from JSON file and merge uploaded database schemas."""
+        if use_snapshot and self._restore_snapshot():
+            stats = self.get_stats(visible_only=False)
+            print(f"Schema loaded from snapshot: {stats.total_databases} databases, "
+                  f"{stats.total_tables} tables, {stats.total_columns} columns")
+            return
+
         if self._schema_path:
             print(f"Loading schema from: {self._schema_path}")
             with open(self._schema_path, "r", encoding="utf-8") as f:
@@ -77,15 +130,27 @@ class SchemaLoader:
                 "total_columns": 0,
             }
 
+        self._json_databases = {db["name"]: copy.deepcopy(db) for db in self._schema_data["databases"]}
+
         # Merge uploaded database schemas from schema_metadata
         self._merge_uploaded_schemas()
 
         # Apply column descriptions from schema_metadata to ALL databases
         # (including those loaded from JSON that _merge_uploaded_schemas skips)
         self._apply_column_descriptions()
+        self._update_totals()
+
+        # Every database is new to the fragment cache
+        old_versions = self._db_versions or {}
+        self._db_versions = {db["name"]: old_versions.get(db["name"], 0) + 1
+                             for db in self._schema_data["databases"]}
+        self._fragments = {}
+        self._visible_schema_text = None
+        self.schema_version += 1
 
         # Pre-generate text format for prompts
         self._schema_text = self._generate_prompt_schema()
+        self._write_snapshot()
 
         stats = self.get_stats()
         print(f"Schema loaded: {stats.total_databases} databases, "
@@ -99,7 +164,6 @@ class SchemaLoader:
         if the JSON file is missing or doesn't contain them.
         """
         try:
-            from backend.config import settings
             from backend.db.registry import get_database_registry
 
             registry = get_database_registry()
@@ -115,94 +179,10 @@ class SchemaLoader:
             if not missing_dbs:
                 return
 
-            # Load schema_metadata for missing databases
-            conn = sqlite3.connect(settings.app_db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            placeholders = ",".join("?" * len(missing_dbs))
-            cursor.execute(f"""
-                SELECT db_name, table_name, column_details, row_count,
-                       sample_values, ddl_statement, llm_description,
-                       detected_foreign_keys, column_descriptions
-                FROM schema_metadata
-                WHERE db_name IN ({placeholders})
-            """, tuple(missing_dbs.keys()))
-
-            rows = cursor.fetchall()
-            conn.close()
-
-            if not rows:
+            db_tables = self._load_metadata_tables(set(missing_dbs))
+            if not db_tables:
                 return
 
-            # Group by database
-            db_tables: Dict[str, List] = {}
-            for row in rows:
-                db_name = row["db_name"]
-                if db_name not in db_tables:
-                    db_tables[db_name] = []
-
-                # Parse detected FK data
-                fk_list = []
-                fk_columns = set()
-                fk_ref_map = {}  # column_name -> "to_table.to_column"
-                if row["detected_foreign_keys"]:
-                    try:
-                        fk_list = json.loads(row["detected_foreign_keys"])
-                        for fk in fk_list:
-                            fk_columns.add(fk["from_column"])
-                            fk_ref_map[fk["from_column"]] = f"{fk['to_table']}.{fk['to_column']}"
-                    except (json.JSONDecodeError, KeyError):
-                        pass
-
-                # Parse column descriptions JSON if available
-                col_descriptions = {}
-                if row["column_descriptions"]:
-                    try:
-                        col_descriptions = json.loads(row["column_descriptions"])
-                    except (json.JSONDecodeError, TypeError):
-                        pass
-
-                # Parse columns from column_details (format: "col1 (TYPE), col2 (TYPE)")
-                columns = []
-                if row["column_details"]:
-                    for col_str in row["column_details"].split(", "):
-                        parts = col_str.split(" (")
-                        if len(parts) >= 2:
-                            col_name = parts[0].strip()
-                            col_type = parts[1].rstrip(")")
-                            col_dict = {
-                                "name": col_name,
-                                "data_type": col_type,
-                                "is_primary_key": False,
-                                "is_nullable": True,
-                                "is_foreign_key": col_name in fk_columns,
-                                "foreign_key_ref": fk_ref_map.get(col_name, ""),
-                            }
-                            if col_name in col_descriptions:
-                                col_dict["description"] = col_descriptions[col_name]
-                            columns.append(col_dict)
-
-                # Build foreign_keys list for table-level relationships
-                table_fks = []
-                for fk in fk_list:
-                    table_fks.append({
-                        "from_column": fk["from_column"],
-                        "to_schema": db_name,
-                        "to_table": fk["to_table"],
-                        "to_column": fk["to_column"],
-                    })
-
-                db_tables[db_name].append({
-                    "name": row["table_name"],
-                    "full_name": row["table_name"],
-                    "description": row["llm_description"] or "",
-                    "row_count_estimate": row["row_count"] or 0,
-                    "primary_keys": [],
-                    "columns": columns,
-                    "foreign_keys": table_fks,
-                })
-
             # Add to schema_data
             added_tables = 0
             added_columns = 0
@@ -214,23 +194,114 @@ class SchemaLoader:
                 added_tables += len(tables)
                 added_columns += sum(len(t["columns"]) for t in tables)
 
-            # Update totals
-            self._schema_data["total_databases"] = len(self._schema_data["databases"])
-            self._schema_data["total_tables"] = self._schema_data.get("total_tables", 0) + added_tables
-            self._schema_data["total_columns"] = self._schema_data.get("total_columns", 0) + added_columns
-
             print(f"Merged {len(db_tables)} uploaded database(s) into schema "
                   f"({added_tables} tables, {added_columns} columns)")
 
         except Exception as e:
             print(f"Warning: Could not merge uploaded schemas: {e}")
 
-    def _apply_column_descriptions(self):
+    def _load_metadata_tables(self, db_names: Set[str]) -> Dict[str, List[Dict]]:
+        """Build table entries for the given databases from schema_metadata."""
+        if not db_names:
+            return {}
+
+        from backend.config import settings
+
+        conn = sqlite3.connect(settings.app_db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+
+        placeholders = ",".join("?" * len(db_names))
+        cursor.execute(f"""
+            SELECT db_name, table_name, column_details, row_count,
+                   sample_values, ddl_statement, llm_description,
+                   detected_foreign_keys, column_descriptions
+            FROM schema_metadata
+            WHERE db_name IN ({placeholders})
+        """, tuple(db_names))
+
+        rows = cursor.fetchall()
+        conn.close()
+
+        # Group by database
+        db_tables: Dict[str, List] = {}
+        for row in rows:
+            db_name = row["db_name"]
+            if db_name not in db_tables:
+                db_tables[db_name] = []
+
+            # Parse detected FK data
+            fk_list = []
+            fk_columns = set()
+            fk_ref_map = {}  # column_name -> "to_table.to_column"
+            if row["detected_foreign_keys"]:
+                try:
+                    fk_list = json.loads(row["detected_foreign_keys"])
+                    for fk in fk_list:
+                        fk_columns.add(fk["from_column"])
+                        fk_ref_map[fk["from_column"]] = f"{fk['to_table']}.{fk['to_column']}"
+                except (json.JSONDecodeError, KeyError):
+                    pass
+
+            # Parse column descriptions JSON if available
+            col_descriptions = {}
+            if row["column_descriptions"]:
+                try:
+                    col_descriptions = json.loads(row["column_descriptions"])
+                except (json.JSONDecodeError, TypeError):
+                    pass
+
+            # Parse columns from column_details (format: "col1 (TYPE), col2 (TYPE)")
+            columns = []
+            if row["column_details"]:
+                for col_str in row["column_details"].split(", "):
+                    parts = col_str.split(" (")
+                    if len(parts) >= 2:
+                        col_name = parts[0].strip()
+                        col_type = parts[1].rstrip(")")
+                        col_dict = {
+                            "name": col_name,
+                            "data_type": col_type,
+                            "is_primary_key": False,
+                            "is_nullable": True,
+                            "is_foreign_key": col_name in fk_columns,
+                            "foreign_key_ref": fk_ref_map.get(col_name, ""),
+                        }
+                        if col_name in col_descriptions:
+                            col_dict["description"] = col_descriptions[col_name]
+                        columns.append(col_dict)
+
+            # Build foreign_keys list for table-level relationships
+            table_fks = []
+            for fk in fk_list:
+                table_fks.append({
+                    "from_column": fk["from_column"],
+                    "to_schema": db_name,
+                    "to_table": fk["to_table"],
+                    "to_column": fk["to_column"],
+                })
+
+            db_tables[db_name].append({
+                "name": row["table_name"],
+                "full_name": row["table_name"],
+                "description": row["llm_description"] or "",
+                "row_count_estimate": row["row_count"] or 0,
+                "primary_keys": [],
+                "columns": columns,
+                "foreign_keys": table_fks,
+            })
+
+        return db_tables
+
+    def _apply_column_descriptions(self, only_db: str = None):
         """Apply column descriptions from schema_metadata to ALL databases in schema_data.
 
         This ensures that column descriptions edited via the UI are applied to
         databases loaded from the JSON schema file (not just uploaded ones).
         _merge_uploaded_schemas only handles databases NOT in the JSON file.
+
+        Args:
+            only_db: Only read and apply descriptions for this database.
         """
         try:
             from backend.config import settings
@@ -239,11 +310,15 @@ class SchemaLoader:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
-            cursor.execute("""
+            query = """
                 SELECT db_name, table_name, column_descriptions
                 FROM schema_metadata
                 WHERE column_descriptions IS NOT NULL AND column_descriptions != ''
-            """)
+            """
+            if only_db:
+                cursor.execute(query + " AND db_name = ?", (only_db,))
+            else:
+                cursor.execute(query)
 
             rows = cursor.fetchall()
             conn.close()
@@ -293,6 +368,25 @@ class SchemaLoader:
         except Exception as e:
             print(f"Warning: Could not apply column descriptions: {e}")
 
+    def _update_totals(self):
+        """Recompute the database/table/column totals from schema data."""
+        databases = self._schema_data["databases"]
+        self._schema_data["total_databases"] = len(databases)
+        self._schema_data["total_tables"] = sum(len(db["tables"]) for db in databases)
+        self._schema_data["total_columns"] = sum(
+            len(t.get("columns", [])) for db in databases for t in db["tables"]
+        )
+
+    def _database_fragment(self, db: Dict) -> str:
+        """Prompt text for one database, cached until its version changes."""
+        version = self._db_versions.get(db["name"], 0)
+        cached = self._fragments.get(db["name"])
+        if cached and cached[0] == version:
+            return cached[1]
+        text = self._render_database(db)
+        self._fragments[db["name"]] = (version, text)
+        return text
+
     def _generate_prompt_schema(self, all_dbs: Set[str] = None) -> str:
         """Generate optimized schema text for LLM prompts.
 
@@ -322,55 +416,63 @@ class SchemaLoader:
         lines.append("")
 
         for db in databases:
-            lines.append(f"\n{'─' * 60}")
-            lines.append(f"DATABASE: {db['name']}")
-            lines.append(f"{'─' * 60}")
+            lines.append(self._database_fragment(db))
 
-            for table in db["tables"]:
-                # Use db_name.table_name format (SQLite compatible)
-                table_name = table.get("name", table.get("full_name", ""))
-                qualified_name = f"{db['name']}.{table_name}"
-
-                # Table header
-                lines.append(f"\n■ {qualified_name}")
-                if table.get("description"):
-                    lines.append(f"  Description: {table['description']}")
-                if table.get("row_count_estimate", 0) > 0:
-                    lines.append(f"  Rows: ~{table['row_count_estimate']:,}")
-
-                # Primary keys
-                if table.get("primary_keys"):
-                    lines.append(f"  Primary Key: {', '.join(table['primary_keys'])}")
-
-                # Columns
-                lines.append("  Columns:")
-                for col in table["columns"]:
-                    col_line = f"    • {col['name']}: {col['data_type']}"
-
-                    flags = []
-                    if col.get("is_primary_key"):
-                        flags.append("PK")
-                    if col.get("is_foreign_key"):
-                        flags.append(f"FK→{col.get('foreign_key_ref', '?')}")
-                    if not col.get("is_nullable", True):
-                        flags.append("NOT NULL")
-
-                    if flags:
-                        col_line += f" [{', '.join(flags)}]"
-
-                    if col.get("description"):
-                        col_line += f" -- {col['description']}"
-
-                    lines.append(col_line)
-
-                # Foreign key relationships
-                if table.get("foreign_keys"):
-                    lines.append("  Relationships:")
-                    for fk in table["foreign_keys"]:
-                        lines.append(
-                            f"    → {fk['from_column']} references "
-                            f"{fk.get('to_table', '?')}.{fk.get('to_column', '?')}"
-                        )
+        return "\n".join(lines)
+
+    @staticmethod
+    def _render_database(db: Dict) -> str:
+        """Render one database's tables for the prompt."""
+        lines = []
+        lines.append(f"\n{'─' * 60}")
+        lines.append(f"DATABASE: {db['name']}")
+        lines.append(f"{'─' * 60}")
+
+        for table in db["tables"]:
+            # Use db_name.table_name format (SQLite compatible)
+            table_name = table.get("name", table.get("full_name", ""))
+            qualified_name = f"{db['name']}.{table_name}"
+
+            # Table header
+            lines.append(f"\n■ {qualified_name}")
+            if table.get("description"):
+                lines.append(f"  Description: {table['description']}")
+            if table.get("row_count_estimate", 0) > 0:
+                lines.append(f"  Rows: ~{table['row_count_estimate']:,}")
+
+            # Primary keys
+            if table.get("primary_keys"):
+                lines.append(f"  Primary Key: {', '.join(table['primary_keys'])}")
+
+            # Columns
+            lines.append("  Columns:")
+            for col in table["columns"]:
+                col_line = f"    • {col['name']}: {col['data_type']}"
+
+                flags = []
+                if col.get("is_primary_key"):
+                    flags.append("PK")
+                if col.get("is_foreign_key"):
+                    flags.append(f"FK→{col.get('foreign_key_ref', '?')}")
+                if not col.get("is_nullable", True):
+                    flags.append("NOT NULL")
+
+                if flags:
+                    col_line += f" [{', '.join(flags)}]"
+
+                if col.get("description"):
+                    col_line += f" -- {col['description']}"
+
+                lines.append(col_line)
+
+            # Foreign key relationships
+            if table.get("foreign_keys"):
+                lines.append("  Relationships:")
+                for fk in table["foreign_keys"]:
+                    lines.append(
+                        f"    → {fk['from_column']} references "
+                        f"{fk.get('to_table', '?')}.{fk.get('to_column', '?')}"
+                    )
 
         return "\n".join(lines)
 
@@ -390,7 +492,13 @@ class SchemaLoader:
             return self._schema_text
 
         # all_dbs may be empty (all databases hidden) — that's valid
-        return self._generate_prompt_schema(all_dbs)
+        key = frozenset(all_dbs)
+        cached = self._visible_schema_text
+        if cached and cached[0] == key and cached[1] == self.schema_version:
+            return cached[2]
+        text = self._generate_prompt_schema(all_dbs)
+        self._visible_schema_text = (key, self.schema_version, text)
+        return text
 
     def get_schema_data(self) -> Dict:
         """Get raw schema data."""
@@ -527,12 +635,78 @@ class SchemaLoader:
 
         return "\n".join(lines)
 
+    def get_database_version(self, db_name: str) -> int:
+        """Version of one database's schema (0 if unknown); changes whenever it is reloaded."""
+        return self._db_versions.get(db_name, 0)
+
+    def _database_in_registry(self, db_name: str) -> bool:
+        try:
+            from backend.db.registry import get_database_registry
+            return db_name in get_database_registry().get_all_databases()
+        except Exception:
+            return True  # Registry unavailable — trust schema_metadata
+
+    def _schema_changed(self, db_name: str):
+        """Bump versions and rebuild the prompt text from the cached fragments."""
+        self._update_totals()
+        self._db_versions[db_name] = self._db_versions.get(db_name, 0) + 1
+        self._fragments.pop(db_name, None)
+        self.schema_version += 1
+        self._schema_text = self._generate_prompt_schema()
+        self._write_snapshot()
+
+    def reload_database(self, db_name: str):
+        """Reload one database's schema (after an upload, delete or description edit).
+
+        Only that database is re-read from the JSON snapshot / schema_metadata and
+        re-rendered; every other database keeps its cached prompt fragment.
+        """
+        start = time.time()
+        if db_name in self._json_databases:
+            db = copy.deepcopy(self._json_databases[db_name])
+        elif db_name != "app" and self._database_in_registry(db_name):
+            try:
+                tables = self._load_metadata_tables({db_name}).get(db_name)
+            except Exception as e:
+                print(f"Warning: Could not load schema for {db_name}: {e}")
+                return
+            db = {"name": db_name, "tables": tables} if tables else None
+        else:
+            db = None
+
+        if db is None:
+            self.remove_database(db_name)
+            return
+
+        databases = self._schema_data["databases"]
+        index = next((i for i, existing in enumerate(databases) if existing["name"] == db_name), None)
+        if index is None:
+            databases.append(db)
+        else:
+            databases[index] = db
+        self._apply_column_descriptions(only_db=db_name)
+        self._schema_changed(db_name)
+
+        elapsed = int((time.time() - start) * 1000)
+        print(f"Schema reloaded for {db_name}: {len(db['tables'])} tables "
+              f"(v{self._db_versions[db_name]}, {elapsed}ms)")
+
+    def remove_database(self, db_name: str):
+        """Drop one database from the schema (e.g. after it was deleted)."""
+        databases = self._schema_data["databases"]
+        remaining = [db for db in databases if db["name"] != db_name]
+        if len(remaining) == len(databases):
+            return
+        self._schema_data["databases"] = remaining
+        self._schema_changed(db_name)
+        print(f"Schema removed for {db_name}")
+
     def reload(self):
         """Reload schema from file and uploaded databases."""
         self._schema_data = None
         self._schema_text = None
         self._schema_path = self._find_schema_file()
-        self._load_schema()
+        self._load_schema(use_snapshot=False)
 
 
 # Singleton accessor
@@ -552,3 +726,9 @@ def reload_schema():
     global _schema_loader
     if _schema_loader:
         _schema_loader.reload()
+
+
+def reload_database_schema(db_name: str):
+    """Reload (or drop, if it no longer exists) a single database's schema."""
+    if _schema_loader:
+        _schema_loader.reload_database(db_name)
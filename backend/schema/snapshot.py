@@ -0,0 +1,141 @@
+"""Versioned binary snapshots of the parsed schema, for fast startup.
+
+Building the schema model means parsing full_schema.json, querying
+schema_metadata for uploads and column descriptions, parsing column strings
+and rendering prompt text. The result is pickled to SCHEMA_SNAPSHOT_DIR
+whenever it changes and loaded at the next boot instead.
+
+File layout: MAGIC | sha256 hex digest of the body | body (pickle). A snapshot
+is only used if the digest matches, its format is SNAPSHOT_FORMAT and its
+source fingerprint (JSON file stat, registry databases and a hash of the
+schema_metadata rows) matches the current sources; otherwise the caller rebuilds.
+Snapshots are only ever read from the app's own data directory.
+"""
+import os
+import time
+import pickle
+import hashlib
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Any, Optional
+
+from backend.config import settings
+
+logger = logging.getLogger("chatbot.schema.snapshot")
+
+
+# Bump when the pickled structures change shape
+SNAPSHOT_FORMAT = 1
+_MAGIC = b"SCHSNAP\x01"
+_DIGEST_LEN = 64
+
+
+def _snapshot_path(name: str) -> Path:
+    return Path(settings.SCHEMA_SNAPSHOT_DIR) / f"{name}.snapshot"
+
+
+def source_fingerprint(json_path: Optional[str] = None) -> Optional[str]:
+    """Fingerprint of everything the schema model is built from, or None if unavailable."""
+    parts = [f"format={SNAPSHOT_FORMAT}"]
+    if json_path:
+        try:
+            stat = os.stat(json_path)
+            parts.append(f"json={json_path}:{stat.st_size}:{stat.st_mtime_ns}")
+        except OSError:
+            parts.append("json=missing")
+
+    try:
+        from backend.db.registry import get_database_registry
+        parts.append("registry=" + ",".join(sorted(get_database_registry().get_all_databases())))
+    except Exception:
+        parts.append("registry=unavailable")
+
+    # Hash the content itself: an edit that keeps every length the same must still invalidate
+    metadata = hashlib.sha256()
+    try:
+        conn = sqlite3.connect(settings.app_db_path)
+        try:
+            rows = conn.execute("""
+                SELECT db_name, table_name, row_count, last_crawled_at, column_details,
+                       llm_description, detected_foreign_keys, column_descriptions
+                FROM schema_metadata
+                ORDER BY db_name, table_name
+            """)
+            for row in rows:
+                metadata.update(repr(row).encode("utf-8"))
+                metadata.update(b"\n")
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.info(f"[snapshot] Cannot fingerprint schema_metadata ({e}), snapshots disabled")
+        return None
+    parts.append("metadata=" + metadata.hexdigest())
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def write_snapshot(name: str, fingerprint: Optional[str], payload: Any) -> bool:
+    """Atomically write a snapshot; failures are logged, never raised."""
+    if not fingerprint or not getattr(settings, "SCHEMA_SNAPSHOT_ENABLED", True):
+        return False
+    step_start = time.time()
+    path = _snapshot_path(name)
+    try:
+        body = pickle.dumps({
+            "format": SNAPSHOT_FORMAT,
+            "fingerprint": fingerprint,
+            "created_at": time.time(),
+            "payload": payload,
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+        digest = hashlib.sha256(body).hexdigest().encode("ascii")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp_path, "wb") as f:
+            f.write(_MAGIC + digest + body)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"[snapshot] Could not write {name} snapshot: {e}")
+        return False
+    step_ms = int((time.time() - step_start) * 1000)
+    logger.info(f"[snapshot] Wrote {name} snapshot ({len(body) // 1024} KB) in {step_ms}ms")
+    return True
+
+
+def read_snapshot(name: str, fingerprint: Optional[str]) -> Optional[Any]:
+    """Payload of a valid, current snapshot, or None (missing, corrupt, stale or other format)."""
+    if not fingerprint or not getattr(settings, "SCHEMA_SNAPSHOT_ENABLED", True):
+        return None
+    path = _snapshot_path(name)
+    if not path.exists():
+        return None
+    step_start = time.time()
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        logger.warning(f"[snapshot] Could not read {name} snapshot: {e}")
+        return None
+
+    header_len = len(_MAGIC) + _DIGEST_LEN
+    if len(data) < header_len or not data.startswith(_MAGIC):
+        logger.warning(f"[snapshot] {name} snapshot has an unknown header, rebuilding")
+        return None
+    digest, body = data[len(_MAGIC):header_len], data[header_len:]
+    if hashlib.sha256(body).hexdigest().encode("ascii") != digest:
+        logger.warning(f"[snapshot] {name} snapshot checksum mismatch, rebuilding")
+        return None
+    try:
+        snapshot = pickle.loads(body)
+    except Exception as e:
+        logger.warning(f"[snapshot] {name} snapshot could not be unpickled ({e}), rebuilding")
+        return None
+    if snapshot.get("format") != SNAPSHOT_FORMAT:
+        logger.info(f"[snapshot] {name} snapshot format {snapshot.get('format')} != {SNAPSHOT_FORMAT}, rebuilding")
+        return None
+    if snapshot.get("fingerprint") != fingerprint:
+        logger.info(f"[snapshot] {name} snapshot is stale, rebuilding")
+        return None
+
+    step_ms = int((time.time() - step_start) * 1000)
+    logger.info(f"[snapshot] Loaded {name} snapshot in {step_ms}ms")
+    return snapshot["payload"]
@@ -134,7 +134,6 @@ class SchemaCrawler:
             tables = self.crawl_all(generate_descriptions=True)
 
         store = get_schema_store()
-        store.clear()  # Clear existing
 
         texts = []
         metadata = []
@@ -154,7 +153,7 @@ class SchemaCrawler:
                 "row_count": table['row_count']
             })
 
-        store.add(texts, metadata)
+        store.sync(texts, metadata)  # Re-embeds only new/changed tables, drops removed ones
         print(f"Indexed {len(tables)} table schemas")
 
 
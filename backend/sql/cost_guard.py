@@ -0,0 +1,195 @@
+"""Pre-execution cost guard - inspects EXPLAIN QUERY PLAN before running generated SQL.
+
+The plan tells us which tables SQLite will fully scan and how loops are nested;
+row counts from the schema (schema_metadata for uploaded databases) turn that
+into a rough cost estimate. Depending on SQL_COST_POLICY an expensive query is
+allowed, capped with a LIMIT, handed back to the LLM for a cheaper rewrite, or
+rejected.
+"""
+import re
+import sqlite3
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from backend.config import settings
+
+logger = logging.getLogger("chatbot.sql.cost_guard")
+
+
+POLICIES = ("off", "limit", "rewrite", "reject")
+
+# db.table [AS] alias - filtered against known tables, so column refs are ignored
+_TABLE_REF_RE = re.compile(r'\b(\w+)\.(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_ALIAS_STOPWORDS = {
+    "where", "join", "inner", "left", "right", "full", "cross", "outer", "on", "using",
+    "group", "order", "limit", "union", "having", "natural", "except", "intersect", "window",
+}
+_TRAILING_LIMIT_RE = re.compile(r'\bLIMIT\s+\d+(?:\s*(?:,|OFFSET)\s*\d+)?\s*;?\s*$', re.IGNORECASE)
+_AGGREGATE_RE = re.compile(r'^\s*SELECT\s+(?:DISTINCT\s+)?(?:COUNT|SUM|AVG|MIN|MAX|TOTAL)\s*\(', re.IGNORECASE)
+_GROUP_BY_RE = re.compile(r'\bGROUP\s+BY\b', re.IGNORECASE)
+
+
+@dataclass
+class CostIssue:
+    """A single problem spotted in the query plan."""
+    kind: str  # full_scan | cartesian_join | missing_limit
+    detail: str
+    rows: int = 0
+
+
+@dataclass
+class CostReport:
+    """Result of analysing one statement."""
+    estimated_rows: int = 0
+    issues: List[CostIssue] = field(default_factory=list)
+    has_limit: bool = False
+    is_aggregate: bool = False
+    plan: List[str] = field(default_factory=list)
+
+    @property
+    def is_expensive(self) -> bool:
+        return bool(self.issues)
+
+    def describe(self) -> str:
+        return "; ".join(f"{i.kind}: {i.detail}" for i in self.issues) or "no issues"
+
+
+class CostGuard:
+    """Estimates query cost from EXPLAIN QUERY PLAN and decides what to do about it."""
+
+    def __init__(self, schema_loader, policy: Optional[str] = None):
+        self.schema_loader = schema_loader
+        policy = (policy or getattr(settings, "SQL_COST_POLICY", "limit")).lower()
+        if policy not in POLICIES:
+            logger.warning(f"[cost_guard] Unknown SQL_COST_POLICY '{policy}', falling back to 'limit'")
+            policy = "limit"
+        self.policy = policy
+        self.max_scan_rows = getattr(settings, "SQL_COST_MAX_SCAN_ROWS", 500000)
+        self.max_estimated_rows = getattr(settings, "SQL_COST_MAX_ESTIMATED_ROWS", 5000000)
+        self.auto_limit = getattr(settings, "SQL_COST_AUTO_LIMIT", 5000)
+        self._row_counts: Optional[Dict[str, int]] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.policy != "off"
+
+    def refresh(self):
+        """Drop cached row counts (call after schema changes)."""
+        self._row_counts = None
+
+    def _get_row_counts(self) -> Dict[str, int]:
+        """Map "db.table" (lowercased) to its estimated row count."""
+        if self._row_counts is not None:
+            return self._row_counts
+
+        counts: Dict[str, int] = {}
+        for db in self.schema_loader.get_schema_data().get("databases", []):
+            for table in db.get("tables", []):
+                name = table.get("name", table.get("full_name", ""))
+                counts[f"{db['name']}.{name}".lower()] = table.get("row_count_estimate", 0) or 0
+
+        # schema_metadata holds the freshest counts for uploaded tables
+        try:
+            conn = sqlite3.connect(settings.app_db_path)
+            try:
+                rows = conn.execute("SELECT db_name, table_name, row_count FROM schema_metadata").fetchall()
+            finally:
+                conn.close()
+            for db_name, table_name, row_count in rows:
+                if row_count:
+                    counts[f"{db_name}.{table_name}".lower()] = row_count
+        except sqlite3.Error as e:
+            logger.warning(f"[cost_guard] Could not read schema_metadata row counts: {e}")
+
+        self._row_counts = counts
+        return counts
+
+    @staticmethod
+    def _resolve_aliases(sql: str, row_counts: Dict[str, int]) -> Dict[str, str]:
+        """Map every name a table can appear under in the plan to its "db.table" key."""
+        aliases = {}
+        for db_name, table_name, alias in _TABLE_REF_RE.findall(sql):
+            qualified = f"{db_name}.{table_name}".lower()
+            if qualified not in row_counts:
+                continue
+            aliases[qualified] = qualified
+            aliases.setdefault(table_name.lower(), qualified)
+            if alias and alias.lower() not in _ALIAS_STOPWORDS:
+                aliases[alias.lower()] = qualified
+        return aliases
+
+    def analyze(self, conn: sqlite3.Connection, sql: str) -> CostReport:
+        """Run EXPLAIN QUERY PLAN on sql and estimate its cost."""
+        statement = sql.strip().rstrip(";")
+        report = CostReport(
+            has_limit=bool(_TRAILING_LIMIT_RE.search(statement)),
+            is_aggregate=bool(_AGGREGATE_RE.search(statement)) and not _GROUP_BY_RE.search(statement),
+        )
+
+        plan_rows = conn.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()
+        row_counts = self._get_row_counts()
+        aliases = self._resolve_aliases(statement, row_counts)
+
+        # Group full scans by parent node - sibling loops are nested, so they multiply
+        scans_by_parent: Dict[int, List[Tuple[str, int]]] = {}
+        for node_id, parent_id, _, detail in plan_rows:
+            report.plan.append(detail)
+            if not detail.startswith("SCAN "):
+                continue
+            name = detail[5:].split(" ")[0].lower()
+            table = aliases.get(name, name)
+            if table not in row_counts:
+                continue  # subquery, CTE or unknown table
+            rows = row_counts[table]
+            scans_by_parent.setdefault(parent_id, []).append((table, rows))
+            if rows > self.max_scan_rows:
+                report.issues.append(CostIssue("full_scan", f"{table} (~{rows:,} rows)", rows))
+
+        estimated = 0
+        for scans in scans_by_parent.values():
+            product = 1
+            for _, rows in scans:
+                product *= max(rows, 1)
+            estimated += product
+            if len(scans) > 1 and product > self.max_estimated_rows:
+                tables = " x ".join(t for t, _ in scans)
+                report.issues.append(CostIssue("cartesian_join", f"{tables} (~{product:,} row combinations)", product))
+        report.estimated_rows = estimated
+
+        if report.issues and not report.has_limit and not report.is_aggregate:
+            report.issues.append(CostIssue("missing_limit", "unbounded result over a large scan", estimated))
+
+        return report
+
+    def decide(self, report: CostReport) -> str:
+        """Pick an action for the report: allow, limit, rewrite or reject."""
+        if not self.enabled or not report.is_expensive:
+            return "allow"
+        has_cartesian = any(i.kind == "cartesian_join" for i in report.issues)
+        if report.has_limit and not has_cartesian:
+            return "allow"  # Large scan, but the result is already bounded
+        if self.policy == "limit":
+            # A LIMIT only bounds row-returning queries
+            return "allow" if report.has_limit or report.is_aggregate else "limit"
+        return self.policy
+
+    def add_limit(self, sql: str) -> str:
+        """Append the configured LIMIT to a statement that has none."""
+        statement = sql.strip().rstrip(";").rstrip()
+        if _TRAILING_LIMIT_RE.search(statement):
+            return statement + ";"
+        return f"{statement}\nLIMIT {self.auto_limit};"
+
+
+# Singleton
+_cost_guard: Optional[CostGuard] = None
+
+
+def get_cost_guard() -> CostGuard:
+    """Get or create cost guard singleton."""
+    global _cost_guard
+    if _cost_guard is None:
+        from backend.schema.loader import get_schema_loader
+        _cost_guard = CostGuard(get_schema_loader())
+    return _cost_guard
@@ -0,0 +1,198 @@
+"""Few-shot example store - picks the past (question, SQL) pairs most similar to a new question.
+
+Examples come from successful data answers in app.db `messages` (the user
+question paired with the assistant's executed SQL), minus anything rated
+thumbs_down; thumbs_up answers rank higher. A few static seeds cover a fresh
+install. Retrieval is lexical (BM25) and capped by FEW_SHOT_TOP_K and
+FEW_SHOT_TOKEN_BUDGET, so each prompt only carries examples that are relevant.
+"""
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+
+from backend.config import settings
+from backend.cache.bm25 import BM25Index
+from backend.llm.tokens import count_tokens
+
+logger = logging.getLogger("chatbot.sql.few_shot_store")
+
+
+# Used when the query log has nothing relevant yet
+SEED_EXAMPLES = [
+    ("Show all employees", "SELECT * FROM hr_payroll.employees LIMIT 100;"),
+    ("How many flights were scheduled last month?",
+     "SELECT COUNT(*) as flight_count FROM flight_operations.flights "
+     "WHERE scheduled_date >= date('now', 'start of month', '-1 month') "
+     "AND scheduled_date < date('now', 'start of month');"),
+    ("List crew members with their assignment details",
+     "SELECT cm.first_name, cm.last_name, ca.assignment_type FROM crew_management.crew_members cm "
+     "JOIN crew_management.crew_assignments ca ON cm.crew_id = ca.crew_id LIMIT 100;"),
+]
+
+# Follow-ups like "show those in a table" only make sense with their conversation
+_DEICTIC_RE = re.compile(r'\b(those|these|them|that one|same|above|previous|it)\b', re.IGNORECASE)
+_TABLE_REF_RE = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)\.(\w+)', re.IGNORECASE)
+# Bonus multiplier for answers users rated thumbs_up
+THUMBS_UP_BOOST = 1.5
+
+
+@dataclass
+class FewShotExample:
+    """One (question, SQL) pair."""
+    question: str
+    sql: str
+    source: str = "log"  # log | seed
+    rating: Optional[str] = None
+    tables: Set[str] = field(default_factory=set)
+
+    def render(self, number: int) -> str:
+        response = {"intent": "data", "response": {"sql": self.sql}}
+        return f'Example {number}:\nQ: "{self.question}"\nResponse: {json.dumps(response)}'
+
+
+def _referenced_tables(sql: str) -> Set[str]:
+    return {f"{db}.{table}".lower() for db, table in _TABLE_REF_RE.findall(sql)}
+
+
+class FewShotStore:
+    """Loads examples from the query log and retrieves the best ones per question."""
+
+    def __init__(self, schema_loader):
+        self.schema_loader = schema_loader
+        self.top_k = getattr(settings, "FEW_SHOT_TOP_K", 3)
+        self.token_budget = getattr(settings, "FEW_SHOT_TOKEN_BUDGET", 800)
+        self.refresh_seconds = getattr(settings, "FEW_SHOT_REFRESH_SECONDS", 600)
+        self._examples: List[FewShotExample] = []
+        self._index: Optional[BM25Index] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Force a reload from app.db on the next lookup."""
+        self._loaded_at = 0.0
+
+    def _load_log_examples(self) -> List[FewShotExample]:
+        """Successful (question, SQL) pairs from app.db messages, with feedback ratings."""
+        try:
+            conn = sqlite3.connect(settings.app_db_path)
+            conn.row_factory = sqlite3.Row
+            try:
+                rows = conn.execute("""
+                    SELECT a.message_id, a.sql_generated,
+                           (SELECT u.content FROM messages u
+                             WHERE u.conversation_id = a.conversation_id AND u.role = 'user'
+                               AND u.message_id < a.message_id
+                             ORDER BY u.message_id DESC LIMIT 1) AS question,
+                           (SELECT SUM(f.rating = 'thumbs_up') - SUM(f.rating = 'thumbs_down')
+                              FROM feedback f WHERE f.message_id = a.message_id) AS score
+                    FROM messages a
+                    WHERE a.role = 'assistant' AND a.sql_generated IS NOT NULL
+                      AND a.sql_result IS NOT NULL AND UPPER(COALESCE(a.intent, '')) = 'DATA'
+                    ORDER BY a.message_id DESC
+                    LIMIT 2000
+                """).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"[few_shot] Could not read query log: {e}")
+            return []
+
+        from backend.pii.masker import contains_any_pii
+
+        examples, seen = [], set()
+        for row in rows:
+            question, sql, score = (row["question"] or "").strip(), row["sql_generated"].strip(), row["score"]
+            if score is not None and score < 0:
+                continue  # Rated wrong more often than right
+            if len(question.split()) < 3 or _DEICTIC_RE.search(question):
+                continue
+            key = " ".join(question.lower().split())
+            if key in seen:
+                continue  # Newest answer wins
+            if contains_any_pii(question):
+                continue  # Never put another user's PII into a prompt
+            seen.add(key)
+            examples.append(FewShotExample(
+                question=question, sql=sql, source="log",
+                rating="thumbs_up" if score and score > 0 else None,
+                tables=_referenced_tables(sql),
+            ))
+        return examples
+
+    def _ensure_loaded(self):
+        if self._index is not None and time.time() - self._loaded_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if self._index is not None and time.time() - self._loaded_at < self.refresh_seconds:
+                return
+            step_start = time.time()
+            examples = self._load_log_examples()
+            examples += [FewShotExample(question=q, sql=sql, source="seed", tables=_referenced_tables(sql))
+                         for q, sql in SEED_EXAMPLES]
+            index = BM25Index()
+            for i, example in enumerate(examples):
+                index.add(i, example.question)
+            self._examples, self._index = examples, index
+            self._loaded_at = time.time()
+            step_ms = int((time.time() - step_start) * 1000)
+            logger.info(f"[few_shot] Loaded {len(examples)} examples ({len(SEED_EXAMPLES)} seeds) in {step_ms}ms")
+
+    def _visible_tables(self) -> Set[str]:
+        return {t.lower() for t in self.schema_loader.get_table_names(visible_only=True)}
+
+    def select(self, question: str) -> List[FewShotExample]:
+        """Most similar examples for question that fit the top-k and token budget."""
+        if self.top_k <= 0:
+            return []
+        self._ensure_loaded()
+        examples, index = self._examples, self._index
+
+        visible = self._visible_tables()
+        ranked = []
+        for i, score in index.search(question, k=self.top_k * 5):
+            example = examples[i]
+            if not example.tables or not example.tables <= visible:
+                continue  # Refers to a table that is gone or hidden
+            if example.rating == "thumbs_up":
+                score *= THUMBS_UP_BOOST
+            ranked.append((score, example))
+        ranked.sort(key=lambda item: item[0], reverse=True)
+
+        selected, used = [], 0
+        for _, example in ranked:
+            cost = count_tokens(example.render(len(selected) + 1))
+            if used + cost > self.token_budget:
+                continue
+            selected.append(example)
+            used += cost
+            if len(selected) >= self.top_k:
+                break
+        logger.info(f"[few_shot] Selected {len(selected)} examples (~{used} tokens) | "
+                    f"sources={[e.source for e in selected]}")
+        return selected
+
+    def render(self, question: str) -> str:
+        """Prompt block with the selected examples, or "" if none are relevant."""
+        selected = self.select(question)
+        if not selected:
+            return ""
+        blocks = [example.render(i + 1) for i, example in enumerate(selected)]
+        return "SIMILAR QUESTIONS ANSWERED BEFORE:\n\n" + "\n\n".join(blocks) + "\n\n"
+
+
+# Singleton
+_few_shot_store: Optional[FewShotStore] = None
+
+
+def get_few_shot_store() -> FewShotStore:
+    """Get or create few-shot store singleton."""
+    global _few_shot_store
+    if _few_shot_store is None:
+        from backend.schema.loader import get_schema_loader
+        _few_shot_store = FewShotStore(get_schema_loader())
+    return _few_shot_store
@@ -0,0 +1,363 @@
+"""Local follow-up refinement - edits the previous turn's SQL instead of regenerating it.
+
+Follow-ups such as "only the captains", "sort by hire date", "top 10" or "for
+last month" are recognised with patterns, applied to the previous SQL's AST
+(sqlglot) as a WHERE predicate, ORDER BY, LIMIT or date window, and returned
+for validation/execution. Every clause of the follow-up has to be recognised
+and resolved to exactly one column; otherwise None is returned and the caller
+falls back to full LLM generation.
+"""
+import re
+import logging
+from dataclasses import dataclass
+from typing import Callable, Collection, List, Optional, Set, Tuple
+
+from backend.config import settings
+
+logger = logging.getLogger("chatbot.sql.followup_editor")
+
+try:
+    import sqlglot
+    from sqlglot import exp
+    SQLGLOT_AVAILABLE = True
+except ImportError:
+    SQLGLOT_AVAILABLE = False
+
+
+# Leading words that carry no meaning for the edit ("now", "can you", "show me", ...)
+_LEAD_RE = re.compile(r'^(?:(?:now|then|and|also|ok|okay|please|can you|could you|show me|give me|show|list)\s+)+')
+_CLAUSE_SPLIT_RE = re.compile(r'\s*(?:,|;|\band then\b|\bthen\b|\band\b)\s*')
+
+_LIMIT_RE = re.compile(
+    r'(?:(?:only|just)\s+)?(?:the\s+)?(?:top|first|limit(?:\s+(?:it|them))?(?:\s+to)?|only|just)\s+(\d{1,5})'
+    r'(?:\s+(?:rows|results|records|ones|of them))?')
+_ORDER_RE = re.compile(
+    r'(?:sort|sorted|order|ordered|rank|ranked)\s+(?:them\s+|it\s+|(?:the\s+)?results\s+)?by\s+(?:the\s+)?(.+?)'
+    r'(?:\s+(asc|ascending|desc|descending|(?:highest|largest|latest|newest|most recent|lowest|smallest|earliest|oldest)'
+    r'(?:\s+first)?))?')
+_DIRECTION_RE = re.compile(
+    r'(?:in\s+)?(asc|ascending|desc|descending|(?:highest|largest|latest|newest|most recent|lowest|smallest|earliest|oldest)'
+    r'(?:\s+first)?)(?:\s+order)?')
+_DATE_RE = re.compile(
+    r'(?:(?:for|in|from|during|over|within)\s+)?(?:the\s+)?(?:(last|past|previous|this|current)\s+'
+    r'(?:(\d{1,3})\s+)?(days?|weeks?|months?|years?)|(today|yesterday))')
+_FILTER_RES = [
+    re.compile(r'(?:only|just)\s+(?:the\s+)?(.+?)'),
+    re.compile(r'(?:the\s+)?(.+?)\s+only'),
+    re.compile(r'(?:what|how)\s+about\s+(?:the\s+)?(.+?)'),
+]
+_DESC_WORDS = ("desc", "descending", "highest", "largest", "latest", "newest", "most recent")
+# Trailing words that refer to the result rows themselves ("active ones" -> "active"); nouns naming the
+# FROM table's entity ("active crew members" on crew_members) are dropped too, any other word must match
+_ROW_NOUNS = {"ones", "rows", "records", "results", "entries"}
+_DATE_NAME_RE = re.compile(r'(date|_at|_on|time|timestamp|day)$', re.IGNORECASE)
+
+
+@dataclass
+class FollowupEdit:
+    """An edited query and a human-readable description of what changed."""
+    sql: str
+    description: str
+
+
+def _singular(word: str) -> str:
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def _norm(name: str) -> str:
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
+
+class FollowupEditor:
+    """Applies recognised refinement intents to the previous SQL."""
+
+    # Upper bound on value lookups for one "only X" clause
+    MAX_VALUE_PROBES = 40
+
+    def __init__(self, schema_loader, connection_factory: Optional[Callable] = None):
+        self.schema_loader = schema_loader
+        self.connection_factory = connection_factory
+        self.enabled = SQLGLOT_AVAILABLE and getattr(settings, "SQL_FOLLOWUP_EDITS", True)
+
+    def apply(self, followup: str, previous_sql: str) -> Optional[FollowupEdit]:
+        """Edit previous_sql according to followup, or None if it isn't confidently recognised."""
+        if not self.enabled or not previous_sql or not followup:
+            return None
+        text = re.sub(r'[?.!]+$', '', " ".join(followup.lower().split()))
+        if not text or len(text.split()) > 12:
+            return None
+
+        try:
+            tree = sqlglot.parse_one(previous_sql, read="sqlite")
+        except Exception as e:
+            logger.debug(f"[followup] Could not parse previous SQL: {e}")
+            return None
+        if not isinstance(tree, exp.Select):
+            return None  # UNION / CTE-only statements are left to the LLM
+
+        tables = self._tables(tree)
+        if not tables:
+            return None
+
+        descriptions = []
+        for clause in _CLAUSE_SPLIT_RE.split(text):
+            clause = _LEAD_RE.sub('', clause).strip()
+            if not clause:
+                continue
+            result = (self._apply_limit(tree, clause) or self._apply_order(tree, clause, tables)
+                      or self._apply_direction(tree, clause) or self._apply_date(tree, clause, tables)
+                      or self._apply_filter(tree, clause, tables))
+            if result is None:
+                logger.info(f"[followup] Clause not recognised, using LLM: \"{clause}\"")
+                return None
+            tree, description = result
+            if description.startswith("sorted") and descriptions and descriptions[-1].startswith("sorted"):
+                descriptions.pop()  # "sort by hire date, newest first" is one sort
+            descriptions.append(description)
+
+        if not descriptions:
+            return None
+        sql = tree.sql(dialect="sqlite") + ";"
+        description = "Refined the previous query: " + ", ".join(descriptions)
+        logger.info(f"[followup] {description} | sql=\"{sql[:150]}\"")
+        return FollowupEdit(sql=sql, description=description)
+
+    # --- schema helpers -------------------------------------------------
+
+    def _tables(self, tree) -> List[Tuple[str, str, str, List[dict]]]:
+        """(db, table, qualifier, columns) for every table in the FROM/JOIN clauses."""
+        tables = []
+        for table in tree.find_all(exp.Table):
+            if not table.db:
+                continue
+            info = self.schema_loader.get_table_info(table.db, table.name)
+            if info is None:
+                continue
+            tables.append((table.db, table.name, table.alias or table.name, info.get("columns", [])))
+        return tables
+
+    @staticmethod
+    def _where_conditions(tree) -> list:
+        where = tree.args.get("where")
+        if where is None:
+            return []
+        return list(where.this.flatten()) if isinstance(where.this, exp.And) else [where.this]
+
+    def _replace_conditions(self, tree, column: str, condition):
+        """Drop WHERE conjuncts on column and add condition. None if a conjunct mixes columns."""
+        keep = []
+        for cond in self._where_conditions(tree):
+            names = {c.name.lower() for c in cond.find_all(exp.Column)}
+            if column.lower() in names:
+                if len(names) > 1:
+                    return None
+                continue
+            keep.append(cond)
+        tree = tree.copy()
+        tree.set("where", None)
+        for cond in keep + [condition]:
+            tree = tree.where(cond, copy=False)
+        return tree
+
+    # --- clause handlers ------------------------------------------------
+
+    @staticmethod
+    def _apply_limit(tree, clause: str):
+        match = _LIMIT_RE.fullmatch(clause)
+        if not match:
+            return None
+        n = int(match.group(1))
+        if n <= 0:
+            return None
+        return tree.limit(n), f"limited to {n} rows"
+
+    def _apply_order(self, tree, clause: str, tables):
+        match = _ORDER_RE.fullmatch(clause)
+        if not match:
+            return None
+        phrase, direction = match.group(1), (match.group(2) or "")
+        descending = direction.startswith(_DESC_WORDS)
+        target = _norm(phrase)
+
+        # Output aliases first - they work for grouped queries too
+        order_expr = None
+        for projection in tree.expressions:
+            if _norm(projection.alias_or_name) == target:
+                order_expr = exp.column(projection.alias_or_name)
+                break
+        if order_expr is None:
+            if tree.args.get("group"):
+                return None  # Ordering a grouped query by a non-output column isn't safe
+            matches = [(qualifier, col["name"]) for _, _, qualifier, columns in tables
+                       for col in columns if _norm(col["name"]) == target]
+            if len(matches) != 1:
+                return None
+            qualifier, name = matches[0]
+            order_expr = exp.column(name, table=qualifier)
+
+        ordered = exp.Ordered(this=order_expr, desc=descending, nulls_first=not descending)  # SQLite default
+        tree = tree.copy()
+        tree.set("order", exp.Order(expressions=[ordered]))
+        return tree, f"sorted by {order_expr.sql()} {'descending' if descending else 'ascending'}"
+
+    @staticmethod
+    def _apply_direction(tree, clause: str):
+        """"newest first" / "descending" on its own flips the existing ORDER BY."""
+        match = _DIRECTION_RE.fullmatch(clause)
+        order = tree.args.get("order")
+        if not match or order is None or len(order.expressions) != 1:
+            return None
+        descending = match.group(1).startswith(_DESC_WORDS)
+        tree = tree.copy()
+        ordered = tree.args["order"].expressions[0]
+        ordered.set("desc", descending)
+        ordered.set("nulls_first", not descending)
+        return tree, f"sorted by {ordered.this.sql(dialect='sqlite')} {'descending' if descending else 'ascending'}"
+
+    def _apply_date(self, tree, clause: str, tables):
+        match = _DATE_RE.fullmatch(clause)
+        if not match:
+            return None
+        candidates = [(qualifier, col["name"]) for _, _, qualifier, columns in tables for col in columns
+                      if "DATE" in (col.get("data_type") or "").upper() or "TIME" in (col.get("data_type") or "").upper()
+                      or _DATE_NAME_RE.search(col["name"])]
+        used = {c.name.lower() for cond in self._where_conditions(tree) for c in cond.find_all(exp.Column)}
+        in_where = [c for c in candidates if c[1].lower() in used]
+        chosen = in_where if in_where else candidates
+        if len(chosen) != 1:
+            return None
+        qualifier, name = chosen[0]
+        col = f"{qualifier}.{name}"
+
+        relation, count, unit, day = match.groups()
+        if day == "today":
+            condition, label = f"date({col}) = date('now')", "today"
+        elif day == "yesterday":
+            condition, label = f"date({col}) = date('now', '-1 day')", "yesterday"
+        else:
+            unit = unit.rstrip("s")
+            if count:
+                n = int(count)
+                days = {"day": n, "week": 7 * n}.get(unit)
+                modifier = f"'-{days} days'" if days else f"'-{n} {unit}s'"
+                condition, label = f"{col} >= date('now', {modifier})", f"last {n} {unit}s"
+            elif unit == "day":
+                condition, label = f"date({col}) = date('now', '-1 day')", "yesterday"
+            elif unit == "week":
+                if relation in ("this", "current"):
+                    condition, label = f"{col} >= date('now', '-6 days', 'weekday 1')", "this week"
+                else:
+                    condition, label = f"{col} >= date('now', '-7 days')", "last week"
+            elif relation in ("this", "current"):
+                condition, label = f"{col} >= date('now', 'start of {unit}')", f"this {unit}"
+            else:
+                condition = (f"{col} >= date('now', 'start of {unit}', '-1 {unit}') "
+                             f"AND {col} < date('now', 'start of {unit}')")
+                label = f"last {unit}"
+
+        edited = self._replace_conditions(tree, name, sqlglot.condition(condition, dialect="sqlite"))
+        if edited is None:
+            return None
+        return edited, f"{name} in {label}"
+
+    def _apply_filter(self, tree, clause: str, tables):
+        phrase = None
+        for pattern in _FILTER_RES:
+            match = pattern.fullmatch(clause)
+            if match:
+                phrase = match.group(1).strip()
+                break
+        if not phrase or re.search(r'\d', phrase) or len(phrase.split()) > 4:
+            return None
+
+        found = self._find_value(phrase, tables, self._entity_words(tree))
+        if found is None:
+            return None
+        qualifier, name, value = found
+        condition = exp.EQ(this=exp.column(name, table=qualifier), expression=exp.Literal.string(value))
+        edited = self._replace_conditions(tree, name, condition)
+        if edited is None:
+            return None
+        return edited, f"{name} = '{value}'"
+
+    @staticmethod
+    def _entity_words(tree) -> Set[str]:
+        """Words naming the FROM table's rows: crew_members -> crew, member, members."""
+        source = tree.args.get("from_") or tree.args.get("from")  # Key renamed in newer sqlglot
+        table = source.this if source is not None else None
+        if not isinstance(table, exp.Table):
+            return set()
+        words = set()
+        for word in re.split(r'[_\s]+', table.name.lower()):
+            if word:
+                words.update((word, _singular(word)))
+        return words
+
+    @staticmethod
+    def _value_candidates(phrase: str, entity_words: Collection[str] = ()) -> List[str]:
+        """Values phrase may stand for: itself, and without trailing row/entity nouns (each also singular)."""
+        words = phrase.split()
+        variants = [words]
+        stripped = list(words)
+        while len(stripped) > 1 and (stripped[-1] in _ROW_NOUNS or stripped[-1] in entity_words):
+            stripped = stripped[:-1]
+        if stripped != words:
+            variants.append(stripped)
+        candidates = []
+        for variant in variants:
+            text = " ".join(variant)
+            singular = " ".join(variant[:-1] + [_singular(variant[-1])])
+            for candidate in (text, singular):
+                if candidate not in candidates:
+                    candidates.append(candidate)
+        return candidates
+
+    def _find_value(self, phrase: str, tables,
+                    entity_words: Collection[str] = ()) -> Optional[Tuple[str, str, str]]:
+        """(qualifier, column, stored value) of the single text column holding phrase, else None."""
+        if self.connection_factory is None:
+            from backend.db.session import pooled_multi_db_connection
+            self.connection_factory = pooled_multi_db_connection
+
+        candidates = self._value_candidates(phrase, entity_words)
+        placeholders = ", ".join("?" for _ in candidates)
+        hits = []
+        probes = 0
+        with self.connection_factory() as conn:
+            for db, table, qualifier, columns in tables:
+                for col in columns:
+                    data_type = (col.get("data_type") or "TEXT").upper()
+                    if not any(t in data_type for t in ("TEXT", "CHAR", "CLOB")):
+                        continue
+                    probes += 1
+                    if probes > self.MAX_VALUE_PROBES:
+                        return None
+                    name = col["name"]
+                    row = conn.execute(
+                        f'SELECT "{name}" FROM {db}."{table}" '
+                        f'WHERE "{name}" COLLATE NOCASE IN ({placeholders}) LIMIT 1',
+                        candidates
+                    ).fetchone()
+                    if row is not None:
+                        hits.append((qualifier, name, row[0]))
+                        if len(hits) > 1:
+                            logger.info(f"[followup] \"{phrase}\" is ambiguous ({hits[0][1]}, {name}), using LLM")
+                            return None
+        return hits[0] if hits else None
+
+
+# Singleton
+_followup_editor: Optional[FollowupEditor] = None
+
+
+def get_followup_editor() -> FollowupEditor:
+    """Get or create follow-up editor singleton."""
+    global _followup_editor
+    if _followup_editor is None:
+        from backend.schema.loader import get_schema_loader
+        _followup_editor = FollowupEditor(get_schema_loader())
+    return _followup_editor
@@ -0,0 +1,181 @@
+"""Hybrid schema retrieval - lexical (BM25) and dense (FAISS) rankings fused with RRF.
+
+Both retrievers run concurrently and only ever see tables from the databases
+the caller may use, so filtering never eats into the ranked lists. The two
+rankings are combined with reciprocal rank fusion:
+
+    score(table) = sum over retrievers of 1 / (SCHEMA_RRF_K + rank)
+
+which needs no score calibration between BM25 and cosine similarity. If the
+dense stage fails or exceeds SCHEMA_DENSE_TIMEOUT_SECONDS the lexical ranking
+is used alone and the failure is logged.
+
+`benchmark()` measures recall@k and latency of each mode against a labelled
+question -> tables set (see scripts/benchmark_schema_retrieval.py).
+"""
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Collection, Dict, List, Optional, Sequence, Tuple
+
+from backend.config import settings
+from backend.cache.vector_store import get_schema_store
+from backend.sql.schema_cache import get_default_schemas, get_schema, search_schemas
+
+logger = logging.getLogger("chatbot.sql.hybrid_retriever")
+
+
+SOURCE_LEXICAL = "lexical"
+SOURCE_DENSE = "dense"
+# Candidates taken from each retriever before fusion
+CANDIDATE_DEPTH = 20
+
+# Shared by all requests - dense retrieval is one embedding call plus a search
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="schema-dense")
+
+
+def _table_key(schema: Dict) -> str:
+    return f"{schema.get('db_name', '')}.{schema.get('table_name', '')}"
+
+
+class HybridSchemaRetriever:
+    """Runs both retrievers, fuses their rankings and returns scored schemas."""
+
+    def __init__(self):
+        self.rrf_k = getattr(settings, "SCHEMA_RRF_K", 60)
+        self.dense_timeout = getattr(settings, "SCHEMA_DENSE_TIMEOUT_SECONDS", 5)
+
+    # ----- retrievers -----
+
+    def _lexical(self, query: str, depth: int, db_names: Optional[Collection[str]]) -> List[Dict]:
+        return [schema for schema, _ in search_schemas(query, k=depth, db_names=db_names)]
+
+    def _dense(self, query: str, depth: int, db_names: Optional[Collection[str]]) -> List[Dict]:
+        schemas = []
+        for meta, score in get_schema_store().search(query, top_k=depth, partitions=db_names):
+            # Prefer the cached entry so both retrievers return the same shape
+            schema = get_schema(meta.get("db_name", ""), meta.get("table_name", "")) or {
+                "db_name": meta.get("db_name", ""),
+                "table_name": meta.get("table_name", ""),
+                "description": meta.get("description", ""),
+                "columns": meta.get("columns", []),
+                "ddl": meta.get("ddl", ""),
+            }
+            schemas.append(schema)
+        return schemas
+
+    def _rankings(self, query: str, depth: int, db_names: Optional[Collection[str]],
+                  sources: Sequence[str]) -> Dict[str, List[Dict]]:
+        """Ranked lists per source; the dense one runs in the pool while lexical runs here."""
+        rankings: Dict[str, List[Dict]] = {}
+        dense_future = None
+        if SOURCE_DENSE in sources:
+            dense_future = _executor.submit(self._dense, query, depth, db_names)
+        if SOURCE_LEXICAL in sources:
+            rankings[SOURCE_LEXICAL] = self._lexical(query, depth, db_names)
+        if dense_future is not None:
+            try:
+                rankings[SOURCE_DENSE] = dense_future.result(timeout=self.dense_timeout)
+            except FutureTimeoutError:
+                logger.warning(f"[hybrid] Dense retrieval exceeded {self.dense_timeout}s, using lexical results only")
+            except Exception as e:
+                logger.warning(f"[hybrid] Dense retrieval failed ({type(e).__name__}: {e}), using lexical results only")
+        return rankings
+
+    # ----- fusion -----
+
+    def fuse(self, rankings: Dict[str, List[Dict]]) -> List[Dict]:
+        """Reciprocal rank fusion of the per-source rankings, best first.
+
+        Each result is a copy of the schema with `relevance_score` (the fused
+        score) and `retrieval_ranks` ({source: 1-based rank}).
+        """
+        scores: Dict[str, float] = {}
+        ranks: Dict[str, Dict[str, int]] = {}
+        schemas: Dict[str, Dict] = {}
+        for source, ranked in rankings.items():
+            for rank, schema in enumerate(ranked, start=1):
+                key = _table_key(schema)
+                if source in ranks.setdefault(key, {}):
+                    continue
+                ranks[key][source] = rank
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank)
+                schemas.setdefault(key, schema)
+
+        # Ties (e.g. lexical #1 vs dense #1) go to the table found by more retrievers, then lexical rank
+        order = sorted(scores, key=lambda key: (-scores[key], -len(ranks[key]),
+                                                ranks[key].get(SOURCE_LEXICAL, CANDIDATE_DEPTH + 1)))
+        return [dict(schemas[key], relevance_score=round(scores[key], 6), retrieval_ranks=ranks[key])
+                for key in order]
+
+    def retrieve(self, query: str, top_k: int, db_names: Optional[Collection[str]] = None,
+                 sources: Sequence[str] = (SOURCE_LEXICAL, SOURCE_DENSE)) -> List[Dict]:
+        """Top-k fused schemas for query from the databases in db_names (None = all)."""
+        step_start = time.time()
+        depth = max(top_k, CANDIDATE_DEPTH)
+        rankings = self._rankings(query, depth, db_names, sources)
+        results = self.fuse(rankings)[:top_k]
+
+        if not results:
+            # Nothing matched at all - fall back to the most common tables
+            results = [dict(schema, relevance_score=0.0, retrieval_ranks={})
+                       for schema in get_default_schemas(db_names)[:top_k]]
+
+        step_ms = int((time.time() - step_start) * 1000)
+        counts = {source: len(ranked) for source, ranked in rankings.items()}
+        logger.info(f"[hybrid] {len(results)} schemas in {step_ms}ms | candidates={counts} | "
+                    f"top={[_table_key(s) for s in results[:5]]}")
+        return results
+
+    # ----- evaluation -----
+
+    def benchmark(self, cases: List[Dict], k: int = 8,
+                  db_names: Optional[Collection[str]] = None) -> Dict[str, Dict]:
+        """recall@k and latency per mode (lexical, dense, hybrid) over labelled cases.
+
+        Each case is {"question": str, "tables": ["db.table", ...]}. recall@k is
+        the share of a case's labelled tables found in the top k, averaged.
+        """
+        modes = {
+            SOURCE_LEXICAL: (SOURCE_LEXICAL,),
+            SOURCE_DENSE: (SOURCE_DENSE,),
+            "hybrid": (SOURCE_LEXICAL, SOURCE_DENSE),
+        }
+        report: Dict[str, Dict] = {}
+        for mode, sources in modes.items():
+            recalls: List[float] = []
+            latencies: List[float] = []
+            misses: List[Tuple[str, List[str]]] = []
+            for case in cases:
+                expected = {t.lower() for t in case["tables"]}
+                if not expected:
+                    continue
+                step_start = time.perf_counter()
+                rankings = self._rankings(case["question"], max(k, CANDIDATE_DEPTH), db_names, sources)
+                found = {_table_key(s).lower() for s in self.fuse(rankings)[:k]}
+                latencies.append((time.perf_counter() - step_start) * 1000)
+                recalls.append(len(expected & found) / len(expected))
+                if expected - found:
+                    misses.append((case["question"], sorted(expected - found)))
+
+            latencies.sort()
+            report[mode] = {
+                "cases": len(recalls),
+                f"recall@{k}": round(sum(recalls) / len(recalls), 4) if recalls else 0.0,
+                "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2) if latencies else 0.0,
+                "misses": misses,
+            }
+        return report
+
+
+# Singleton
+_hybrid_retriever: Optional[HybridSchemaRetriever] = None
+
+
+def get_hybrid_retriever() -> HybridSchemaRetriever:
+    """Get or create hybrid schema retriever singleton."""
+    global _hybrid_retriever
+    if _hybrid_retriever is None:
+        _hybrid_retriever = HybridSchemaRetriever()
+    return _hybrid_retriever
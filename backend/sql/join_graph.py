@@ -0,0 +1,284 @@
+"""Schema join graph - finds the bridging tables needed to join a set of retrieved tables.
+
+Nodes are "db.table"; edges are join conditions from:
+
+- declared foreign keys: `SchemaLoader.get_relationships()` and REFERENCES
+  clauses in the schema_metadata DDL
+- detected foreign keys: `schema_metadata.detected_foreign_keys` (uploads)
+- shared join keys across databases (SCHEMA_JOIN_KEYS, e.g. employee_id):
+  every table holding the key links to the table(s) where it is unique
+
+For a set of retrieved tables, `connect()` approximates the minimal Steiner
+tree (Takahashi-Matsuyama: grow the tree from one table, each time
+adding the shortest path to the nearest unconnected table) and returns the
+bridging tables plus the join conditions along the tree. Results are cached
+per (tables, visible databases) until the schema changes.
+"""
+import re
+import json
+import heapq
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Collection, Dict, FrozenSet, List, Optional, Tuple
+
+from backend.config import settings
+from backend.sql.schema_cache import get_schema_map
+
+logger = logging.getLogger("chatbot.sql.join_graph")
+
+
+# Edge weights by source - declared keys are preferred over guessed ones
+WEIGHT_DECLARED = 1.0
+WEIGHT_DETECTED = 1.2
+WEIGHT_SHARED_KEY = 1.5
+# Cached join plans
+MAX_CACHED_PLANS = 1024
+
+_REFERENCES_RE = re.compile(r'(?:^|[,(])\s*"?(\w+)"?\s+[^,]*?\bREFERENCES\s+"?(\w+)"?\s*\(\s*"?(\w+)"?\s*\)',
+                            re.IGNORECASE | re.MULTILINE)
+_TABLE_FK_RE = re.compile(r'FOREIGN\s+KEY\s*\(\s*"?(\w+)"?\s*\)\s*REFERENCES\s+"?(\w+)"?\s*\(\s*"?(\w+)"?\s*\)',
+                          re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class JoinEdge:
+    """One join condition: from_table.from_column = to_table.to_column."""
+    from_table: str
+    from_column: str
+    to_table: str
+    to_column: str
+
+    def render(self) -> str:
+        return f"{self.from_table}.{self.from_column} = {self.to_table}.{self.to_column}"
+
+
+@dataclass
+class JoinPlan:
+    """Tables connecting the requested ones, and how to join them."""
+    bridges: List[str] = field(default_factory=list)      # Added tables, in path order
+    joins: List[JoinEdge] = field(default_factory=list)   # Edges of the connecting tree
+    unreachable: List[str] = field(default_factory=list)  # Requested tables joined to none of the others
+
+
+class JoinGraph:
+    """Weighted undirected graph of join conditions between tables."""
+
+    def __init__(self):
+        self.edges: Dict[str, Dict[str, Tuple[float, JoinEdge]]] = {}
+
+    def add(self, edge: JoinEdge, weight: float):
+        """Add an edge, keeping the cheapest one per table pair."""
+        if edge.from_table == edge.to_table:
+            return
+        for a, b in ((edge.from_table, edge.to_table), (edge.to_table, edge.from_table)):
+            current = self.edges.setdefault(a, {}).get(b)
+            if current is None or weight < current[0]:
+                self.edges[a][b] = (weight, edge)
+
+    def __len__(self) -> int:
+        return sum(len(neighbours) for neighbours in self.edges.values()) // 2
+
+    def _nearest(self, tree: Dict[str, None], targets: Collection[str], allowed_dbs: Optional[Collection[str]],
+                 max_hops: int) -> Optional[List[str]]:
+        """Shortest path (as nodes, tree node first) from the tree to the closest target."""
+        dist = {node: 0.0 for node in tree}
+        previous: Dict[str, str] = {}
+        hops = {node: 0 for node in tree}
+        heap = [(0.0, node) for node in tree]
+        heapq.heapify(heap)
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > dist.get(node, float("inf")):
+                continue
+            if node in targets:
+                path = [node]
+                while path[-1] in previous:
+                    path.append(previous[path[-1]])
+                return path[::-1]
+            if hops[node] >= max_hops:
+                continue  # Would need too many bridging tables
+            for neighbour, (weight, _) in self.edges.get(node, {}).items():
+                if allowed_dbs is not None and neighbour.split(".", 1)[0] not in allowed_dbs:
+                    continue
+                nd = d + weight
+                if nd < dist.get(neighbour, float("inf")):
+                    dist[neighbour] = nd
+                    previous[neighbour] = node
+                    hops[neighbour] = hops[node] + 1
+                    heapq.heappush(heap, (nd, neighbour))
+        return None
+
+    def steiner(self, tables: List[str], allowed_dbs: Optional[Collection[str]] = None,
+                max_bridges: int = 3) -> JoinPlan:
+        """Approximate minimal tree connecting tables within allowed_dbs.
+
+        The tree grows from the first table, so results are deterministic for
+        a given order; JoinPlanner passes tables sorted.
+        """
+        plan = JoinPlan()
+        terminals = [t for t in dict.fromkeys(tables) if t in self.edges]
+        plan.unreachable = [t for t in dict.fromkeys(tables) if t not in self.edges]
+        if len(terminals) < 2:
+            return plan
+
+        tree: Dict[str, None] = {terminals[0]: None}  # Ordered set (may hold several components)
+        remaining = set(terminals[1:])
+        joined = set()
+        while remaining:
+            # A path adds (len - 2) intermediate tables; don't go past the bridge budget
+            path = self._nearest(tree, remaining, allowed_dbs, max_bridges - len(plan.bridges) + 1)
+            if path is None:
+                # Nothing left is reachable from the tree - start a new component
+                seed = min(remaining, key=terminals.index)
+                remaining.discard(seed)
+                tree[seed] = None
+                continue
+            for a, b in zip(path, path[1:]):
+                plan.joins.append(self.edges[a][b][1])
+                if b not in tree and b not in remaining:
+                    plan.bridges.append(b)
+                tree[b] = None
+            joined.update(path)
+            remaining -= set(path)
+        plan.unreachable += [t for t in terminals if t not in joined]
+        return plan
+
+
+def _declared_ddl_edges(db_name: str, table_name: str, ddl: str) -> List[JoinEdge]:
+    """Foreign keys declared in a CREATE TABLE statement (same database)."""
+    source = f"{db_name}.{table_name}"
+    edges = []
+    for regex in (_REFERENCES_RE, _TABLE_FK_RE):
+        for column, to_table, to_column in regex.findall(ddl or ""):
+            if column.upper() in ("FOREIGN", "CONSTRAINT"):
+                continue
+            edges.append(JoinEdge(source, column, f"{db_name}.{to_table}", to_column))
+    return edges
+
+
+def _is_unique(column: str, schema: Dict) -> bool:
+    """Whether column is declared PRIMARY KEY or UNIQUE in the table's DDL.
+
+    Covers the column-level form and single-column table constraints
+    (`PRIMARY KEY (employee_id)`, `CONSTRAINT uq UNIQUE ("employee_id")`);
+    a composite key does not make any one of its columns unique.
+    """
+    ddl = schema.get("ddl") or ""
+    name = re.escape(column)
+    column_level = rf'(?:^|[,(])\s*"?{name}"?\s+[^,\n]*\b(UNIQUE|PRIMARY\s+KEY)\b'
+    table_level = rf'\b(?:UNIQUE|PRIMARY\s+KEY)\s*\(\s*"?{name}"?\s*\)'
+    return any(re.search(pattern, ddl, re.IGNORECASE | re.MULTILINE) for pattern in (column_level, table_level))
+
+
+def build_join_graph(schemas: Dict[str, Dict]) -> JoinGraph:
+    """Build the graph from every known source of join conditions."""
+    graph = JoinGraph()
+
+    # Declared keys in the extracted schema (and upload FKs merged into it)
+    try:
+        from backend.schema.loader import get_schema_loader
+        for rel in get_schema_loader().get_relationships():
+            db = rel["from_db"]
+            graph.add(JoinEdge(f"{db}.{rel['from_table'].split('.')[-1]}", rel["from_column"],
+                               f"{db}.{rel['to_table'].split('.')[-1]}", rel["to_column"]), WEIGHT_DECLARED)
+    except Exception as e:
+        logger.info(f"[join_graph] Schema loader relationships unavailable: {e}")
+
+    # Declared keys in the schema_metadata DDL
+    for schema in schemas.values():
+        for edge in _declared_ddl_edges(schema["db_name"], schema["table_name"], schema.get("ddl") or ""):
+            graph.add(edge, WEIGHT_DECLARED)
+
+    # Keys detected from shared column names at upload time
+    try:
+        conn = sqlite3.connect(settings.app_db_path)
+        try:
+            rows = conn.execute("""
+                SELECT db_name, table_name, detected_foreign_keys FROM schema_metadata
+                WHERE detected_foreign_keys IS NOT NULL AND detected_foreign_keys != ''
+            """).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning(f"[join_graph] Could not read detected foreign keys: {e}")
+        rows = []
+    for db_name, table_name, fk_json in rows:
+        try:
+            for fk in json.loads(fk_json):
+                graph.add(JoinEdge(f"{db_name}.{table_name}", fk["from_column"],
+                                   f"{db_name}.{fk['to_table']}", fk["to_column"]), WEIGHT_DETECTED)
+        except (json.JSONDecodeError, KeyError, TypeError):
+            continue
+
+    # Shared keys across databases: link each holder to the table(s) where the key is unique
+    join_keys = [k.strip() for k in getattr(settings, "SCHEMA_JOIN_KEYS", "employee_id").split(",") if k.strip()]
+    for key in join_keys:
+        holders = [name for name, schema in schemas.items()
+                   if schema.get("db_name") != "app" and any(c.get("name") == key for c in schema.get("columns", []))]
+        masters = [name for name in holders if _is_unique(key, schemas[name])]
+        for holder in holders:
+            for master in masters:
+                graph.add(JoinEdge(holder, key, master, key), WEIGHT_SHARED_KEY)
+    return graph
+
+
+class JoinPlanner:
+    """Keeps the join graph current with the schema and caches plans per table set."""
+
+    def __init__(self):
+        self.max_bridges = getattr(settings, "SCHEMA_JOIN_MAX_BRIDGE_TABLES", 3)
+        self._graph_state: Optional[Tuple[Dict[str, Dict], int, JoinGraph]] = None
+        self._plans: "OrderedDict[Tuple[FrozenSet[str], Optional[FrozenSet[str]]], JoinPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _graph(self) -> JoinGraph:
+        """Graph for the current schema, rebuilt (and plans dropped) whenever it changes."""
+        schemas = get_schema_map()
+        try:
+            from backend.schema.loader import get_schema_loader
+            loader_version = get_schema_loader().schema_version
+        except Exception:
+            loader_version = -1
+        state = self._graph_state
+        if state is not None and state[0] is schemas and state[1] == loader_version:
+            return state[2]
+        with self._lock:
+            state = self._graph_state
+            if state is not None and state[0] is schemas and state[1] == loader_version:
+                return state[2]
+            graph = build_join_graph(schemas)
+            self._graph_state = (schemas, loader_version, graph)
+            self._plans.clear()
+            logger.info(f"[join_graph] Built join graph: {len(graph.edges)} tables, {len(graph)} join edges")
+            return graph
+
+    def connect(self, tables: List[str], db_names: Optional[Collection[str]] = None) -> JoinPlan:
+        """Bridging tables and joins connecting tables ("db.table")."""
+        graph = self._graph()
+        key = (frozenset(tables), frozenset(db_names) if db_names is not None else None)
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key)
+            return plan
+
+        plan = graph.steiner(sorted(key[0]), db_names, self.max_bridges)
+        with self._lock:
+            self._plans[key] = plan
+            while len(self._plans) > MAX_CACHED_PLANS:
+                self._plans.popitem(last=False)
+        return plan
+
+
+# Singleton
+_join_planner: Optional[JoinPlanner] = None
+
+
+def get_join_planner() -> JoinPlanner:
+    """Get or create join planner singleton."""
+    global _join_planner
+    if _join_planner is None:
+        _join_planner = JoinPlanner()
+    return _join_planner
@@ -7,18 +7,39 @@ and does self-correction if the first attempt fails.
 import re
 import json
 import time
+import sqlite3
 import logging
-from typing import Dict, List, Optional, Tuple, Any
+from contextvars import ContextVar, copy_context
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from enum import Enum
 
 from backend.config import settings
+from backend.core.deadline import Deadline, DeadlineExceeded
 from backend.llm.client import get_llm_client
-from backend.llm.prompts import SQL_CORRECTION_PROMPT, SQL_RESULT_SUMMARY_PROMPT, SQL_RESULT_STATS_SUMMARY_PROMPT
+from backend.llm.json_stream import StreamingJsonFieldParser
+from backend.llm.tokens import count_tokens
+from backend.llm.prompts import (
+    SQL_CORRECTION_PROMPT, SQL_COST_REWRITE_PROMPT,
+    SQL_RESULT_SUMMARY_PROMPT, SQL_RESULT_STATS_SUMMARY_PROMPT,
+)
 from backend.schema.loader import get_schema_loader
-from backend.db.session import get_multi_db_connection
+from backend.db.session import pooled_multi_db_connection
+from backend.sql.sql_validator import ValidationResult, validate_select
+from backend.sql.cost_guard import CostReport, get_cost_guard
+from backend.sql.sql_repair import get_sql_repairer
+from backend.sql.summary_jobs import get_summary_job_manager
+from backend.sql.template_summary import get_template_summarizer
+from backend.sql.few_shot_store import get_few_shot_store
+from backend.sql.followup_editor import get_followup_editor
+from backend.sql.result_packer import FORMAT_NOTE as RESULT_FORMAT_NOTE, PackedRows, pack_rows
 
 logger = logging.getLogger("chatbot.sql.pipeline_v2")
 
+# System prompt built once per batch and shared by its worker threads (see run_batch).
+# Work handed to other threads must run in copy_context() to keep seeing it.
+_shared_system_prompt: ContextVar[Optional[str]] = ContextVar("shared_system_prompt", default=None)
+
 
 class QueryIntent(Enum):
     META = "meta"           # Questions about database structure
@@ -27,29 +48,18 @@ class QueryIntent(Enum):
     GENERAL = "general"     # Greetings, chitchat
 
 
-# Few-shot examples for SQL generation - customize these for your schema
+# Static examples that teach the non-SQL response shapes. Data examples are picked
+# per question from the query log by the few-shot store (see few_shot_store.py).
 FEW_SHOT_EXAMPLES = """
-EXAMPLE QUERIES AND RESPONSES:
-
-Example 1 - Simple query:
-Q: "Show all employees"
-Response: {{"intent": "data", "response": {{"sql": "SELECT * FROM hr_payroll.employees LIMIT 100;", "explanation": "Retrieves all employee records"}}}}
-
-Example 2 - Aggregation:
-Q: "How many flights were scheduled last month?"
-Response: {{"intent": "data", "response": {{"sql": "SELECT COUNT(*) as flight_count FROM flight_operations.flights WHERE scheduled_date >= date('now', 'start of month', '-1 month') AND scheduled_date < date('now', 'start of month');", "explanation": "Counts flights from the previous calendar month"}}}}
+EXAMPLE RESPONSES:
 
-Example 3 - JOIN query:
-Q: "List crew members with their assignment details"
-Response: {{"intent": "data", "response": {{"sql": "SELECT cm.first_name, cm.last_name, ca.assignment_type FROM crew_management.crew_members cm JOIN crew_management.crew_assignments ca ON cm.crew_id = ca.crew_id LIMIT 100;", "explanation": "Joins crew members with assignments"}}}}
-
-Example 4 - Meta question:
+Meta question:
 Q: "What databases are available?"
-Response: {{"intent": "meta", "response": {{"answer": "The available databases are listed dynamically from the registry. Use the meta handler to get the current list."}}}}
+Response: {"intent": "meta", "response": {"answer": "The available databases are listed dynamically from the registry. Use the meta handler to get the current list."}}
 
-Example 5 - Ambiguous question:
+Ambiguous question:
 Q: "Show me John's data"
-Response: {{"intent": "ambiguous", "response": {{"clarification": "There may be multiple people named John. Could you provide a last name or employee ID? Also, what specific information are you looking for (contact info, salary, assignments)?"}}}}
+Response: {"intent": "ambiguous", "response": {"clarification": "There may be multiple people named John. Could you provide a last name or employee ID? Also, what specific information are you looking for (contact info, salary, assignments)?"}}
 """
 
 
@@ -109,7 +119,16 @@ You MUST respond with valid JSON only. No markdown, no explanations outside JSON
 """
 
 
-USER_PROMPT_TEMPLATE = """Question: {question}
+# Extra guidance per parallel correction candidate, so the candidates explore different fixes
+CANDIDATE_HINTS = [
+    "",
+    "Double-check every table and column name against the schema and use the exact spelling.",
+    "Consider a different table or join path than the failed query used.",
+    "Prefer the simplest query that answers the question, using as few tables as possible.",
+]
+
+
+USER_PROMPT_TEMPLATE = """{examples}Question: {question}
 
 {context}
 
@@ -127,20 +146,83 @@ Respond with JSON in this exact format:
 Only include the relevant fields for the intent type. Respond with valid JSON only."""
 
 
+class SummaryTokenFilter:
+    """Forwards streamed summary text word by word, holding back SUGGESTION: lines.
+
+    Text is only released up to the last whitespace, so PII tokens like
+    [EMAIL_1] always arrive whole and can be unmasked per chunk.
+    """
+
+    PREFIX = "SUGGESTION:"
+
+    def __init__(self, emit: Callable[[str], None]):
+        self.emit = emit
+        self._line = ""
+        self._sent = 0  # chars of the current line already emitted
+
+    def _is_suggestion(self, line: str) -> Optional[bool]:
+        """True/False once decidable, None while the line could still become a suggestion."""
+        stripped = line.lstrip()
+        if stripped.startswith(self.PREFIX):
+            return True
+        if self.PREFIX.startswith(stripped):
+            return None
+        return False
+
+    def feed(self, chunk: str):
+        self._line += chunk
+        while "\n" in self._line:
+            line, self._line = self._line.split("\n", 1)
+            if self._is_suggestion(line) is not True:
+                self.emit(line[self._sent:] + "\n")
+            self._sent = 0
+
+        if self._is_suggestion(self._line) is False:
+            cut = max(self._line.rfind(" "), self._line.rfind("\t")) + 1
+            if cut > self._sent:
+                self.emit(self._line[self._sent:cut])
+                self._sent = cut
+
+    def flush(self):
+        if self._is_suggestion(self._line) is False:
+            remainder = self._line[self._sent:]
+            if remainder:
+                self.emit(remainder)
+        self._line = ""
+        self._sent = 0
+
+
 class SQLPipelineV2:
     """Improved Text-to-SQL pipeline with full schema approach."""
 
+    # Upper bound on deterministic repairs per question (they don't count as LLM retries)
+    MAX_LOCAL_REPAIRS = 5
+
     def __init__(self):
         self.llm = get_llm_client()
         self.schema_loader = get_schema_loader()
         self.max_retries = getattr(settings, 'SQL_MAX_RETRIES', 2)
         self.query_timeout = getattr(settings, 'SQL_TIMEOUT_SECONDS', 30)
+        self.cost_guard = get_cost_guard()
+        self.repairer = get_sql_repairer()
+        self.template_summarizer = get_template_summarizer()
+        self.few_shot_store = get_few_shot_store()
+        self.followup_editor = get_followup_editor()
+        self.parallel_candidates = getattr(settings, 'SQL_PARALLEL_CANDIDATES', 0)
+        self.streaming_generation = getattr(settings, 'SQL_STREAMING_GENERATION', False)
+        self.min_correction_seconds = getattr(settings, 'DEADLINE_MIN_CORRECTION_SECONDS', 15)
+        self.min_summary_seconds = getattr(settings, 'DEADLINE_MIN_SUMMARY_SECONDS', 8)
+        self._speculation_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="sql-speculative")
 
     def _get_system_prompt(self) -> str:
         """Build system prompt with current visible schema.
 
-        Regenerated on each call so visibility changes take effect immediately.
+        Regenerated on each call so visibility changes take effect immediately,
+        except inside run_batch, where all questions share the prompt built at the start.
         """
+        shared = _shared_system_prompt.get()
+        if shared is not None:
+            return shared
         return SYSTEM_PROMPT.format(
             schema=self.schema_loader.get_schema_text(),
             examples=FEW_SHOT_EXAMPLES
@@ -282,22 +364,26 @@ class SQLPipelineV2:
             "results": None
         }
 
-    def _validate_sql(self, sql: str) -> Tuple[bool, str]:
-        """Validate SQL for safety."""
-        sql_upper = sql.upper().strip()
+    def _validate_sql(self, sql: str) -> ValidationResult:
+        """Validate SQL by preparing it with EXPLAIN against the attached databases.
 
-        # Must be SELECT
-        if not sql_upper.startswith('SELECT'):
-            return False, "Only SELECT statements are allowed"
-
-        # Check for forbidden operations
-        forbidden = ['DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'CREATE',
-                     'TRUNCATE', 'GRANT', 'REVOKE', 'EXEC', 'EXECUTE']
-        for word in forbidden:
-            if re.search(rf'\b{word}\b', sql_upper):
-                return False, f"Forbidden operation: {word}"
+        Confirms it is a single read-only statement (authorizer callback) and
+        surfaces unknown table/column errors without running the query.
+        """
+        sql = self._clean_sql_for_sqlite(sql)
+        step_start = time.time()
+        try:
+            with pooled_multi_db_connection(visible_only=True) as conn:
+                result = validate_select(conn, sql)
+        except sqlite3.Error as e:
+            result = ValidationResult(False, str(e))
 
-        return True, "Valid"
+        step_ms = int((time.time() - step_start) * 1000)
+        if result.is_valid:
+            logger.info(f"[validate_sql] OK {step_ms}ms")
+        else:
+            logger.info(f"[validate_sql] REJECTED {step_ms}ms | safety={result.is_safety_violation} | error={result.message}")
+        return result
 
     def _clean_sql(self, sql: str) -> str:
         """Clean SQL from LLM response."""
@@ -339,25 +425,39 @@ class SQLPipelineV2:
 
         raise ValueError(f"Could not parse LLM response: {response[:200]}")
 
-    def _generate_sql(self, question: str, context: str = "") -> Dict:
-        """Generate SQL using LLM with full schema."""
+    def _build_generation_messages(self, question: str, context: str = "") -> List[Dict]:
+        """Build the system + user messages for SQL generation.
+
+        Similar past examples go in the user message so the system prompt stays
+        identical across questions.
+        """
+        try:
+            examples = self.few_shot_store.render(question)
+        except Exception as e:
+            logger.warning(f"[few_shot] Example retrieval failed, continuing without: {e}")
+            examples = ""
         user_prompt = USER_PROMPT_TEMPLATE.format(
+            examples=examples,
             question=question,
             context=f"Conversation context: {context}" if context else ""
         )
+        return [
+            {"role": "system", "content": self._get_system_prompt()},
+            {"role": "user", "content": user_prompt}
+        ]
 
-        system_prompt = self._get_system_prompt()
-        logger.info(f"[generate_sql] Sending schema ({len(system_prompt)} chars) + question to LLM")
+    def _generate_sql(self, question: str, context: str = "", deadline: Optional[Deadline] = None) -> Dict:
+        """Generate SQL using LLM with full schema."""
+        messages = self._build_generation_messages(question, context)
+        logger.info(f"[generate_sql] Sending schema ({len(messages[0]['content'])} chars) + question to LLM")
         step_start = time.time()
         try:
             response = self.llm.chat_completion(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=messages,
                 temperature=0.0,
                 max_tokens=2000,
-                json_mode=True
+                json_mode=True,
+                deadline=deadline
             )
         except Exception as e:
             step_ms = int((time.time() - step_start) * 1000)
@@ -371,6 +471,56 @@ class SQLPipelineV2:
         logger.info(f"[generate_sql] Parsed intent={parsed.get('intent')} | has_sql={bool(parsed.get('response', {}).get('sql'))}")
         return parsed
 
+    def _generate_sql_streaming(self, question: str, context: str = "",
+                                deadline: Optional[Deadline] = None) -> Tuple[Dict, Optional[Tuple[str, Future]]]:
+        """Generate SQL from a streamed LLM response, starting execution early.
+
+        As soon as the "sql" field of the JSON response is complete it is validated
+        and executed in the background while the explanation is still streaming.
+
+        Returns (parsed_response, speculation) where speculation is (sql, future of
+        _validate_and_execute) or None if no SQL was seen.
+        """
+        messages = self._build_generation_messages(question, context)
+        logger.info(f"[generate_sql] Streaming schema ({len(messages[0]['content'])} chars) + question to LLM")
+        parser = StreamingJsonFieldParser(["intent", "sql"])
+        chunks = []
+        speculation = None
+        step_start = time.time()
+        try:
+            for chunk in self.llm.chat_completion_stream(
+                messages=messages,
+                temperature=0.0,
+                max_tokens=2000,
+                json_mode=True,
+                deadline=deadline
+            ):
+                chunks.append(chunk)
+                if speculation is not None:
+                    continue
+                sql = parser.feed(chunk).get("sql", "")
+                if sql.strip() and parser.values.get("intent", "data") == "data":
+                    sql = self._clean_sql(sql)
+                    future = self._speculation_executor.submit(copy_context().run, self._validate_and_execute,
+                                                               question, sql, deadline)
+                    speculation = (sql, future)
+                    step_ms = int((time.time() - step_start) * 1000)
+                    logger.info(f"[generate_sql] SQL complete after {step_ms}ms, executing while the rest streams")
+        except Exception as e:
+            step_ms = int((time.time() - step_start) * 1000)
+            logger.error(f"[generate_sql] LLM stream FAILED after {step_ms}ms: {type(e).__name__}: {e}", exc_info=True)
+            if speculation is not None:
+                speculation[1].cancel()
+            raise
+
+        response = "".join(chunks)
+        step_ms = int((time.time() - step_start) * 1000)
+        logger.info(f"[generate_sql] LLM stream finished in {step_ms}ms | response_preview=\"{response[:200]}\"")
+
+        parsed = self._parse_llm_response(response)
+        logger.info(f"[generate_sql] Parsed intent={parsed.get('intent')} | has_sql={bool(parsed.get('response', {}).get('sql'))}")
+        return parsed, speculation
+
     def _clean_sql_for_sqlite(self, sql: str) -> str:
         """Remove schema qualifiers (e.g. .public.) from SQL for SQLite compatibility."""
         # Replace db_name.public.table_name with db_name.table_name
@@ -379,22 +529,31 @@ class SQLPipelineV2:
         sql = re.sub(r'(\w+)\.dbo\.(\w+)', r'\1.\2', sql)
         return sql
 
-    def _execute_sql(self, sql: str) -> Tuple[bool, Any, str]:
-        """Execute SQL query using SQLite multi-db connection."""
-        conn = None
+    def _execute_sql(self, sql: str, deadline: Optional[Deadline] = None) -> Tuple[bool, Any, str]:
+        """Execute SQL query using a pooled SQLite multi-db connection.
+
+        With a deadline the query is interrupted once the request budget runs out.
+        """
         step_start = time.time()
         logger.info(f"[execute_sql] Executing: {sql[:200]}")
         try:
             # Clean SQL for SQLite compatibility
             sql = self._clean_sql_for_sqlite(sql)
 
-            conn = get_multi_db_connection(visible_only=True)
-            # Set busy timeout to avoid hanging on locked databases
-            conn.execute(f"PRAGMA busy_timeout = {self.query_timeout * 1000}")
+            with pooled_multi_db_connection(visible_only=True) as conn:
+                # Set busy timeout to avoid hanging on locked databases
+                timeout = deadline.timeout(self.query_timeout, "execute_sql") if deadline else self.query_timeout
+                conn.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
 
-            cursor = conn.execute(sql)
-            rows = cursor.fetchall()
-            columns = [desc[0] for desc in cursor.description] if cursor.description else []
+                if deadline is not None and deadline.remaining() is not None:
+                    # Non-zero return aborts the statement with "interrupted"
+                    conn.set_progress_handler(lambda: 1 if deadline.expired else 0, 10000)
+                try:
+                    cursor = conn.execute(sql)
+                    rows = cursor.fetchall()
+                    columns = [desc[0] for desc in cursor.description] if cursor.description else []
+                finally:
+                    conn.set_progress_handler(None, 0)
 
             results = {
                 "columns": columns,
@@ -408,12 +567,179 @@ class SQLPipelineV2:
             step_ms = int((time.time() - step_start) * 1000)
             logger.error(f"[execute_sql] FAILED {step_ms}ms | error={e}")
             return False, None, str(e)
+
+    def _analyze_cost(self, sql: str) -> Optional[CostReport]:
+        """Run EXPLAIN QUERY PLAN through the cost guard. Returns None if the plan can't be read."""
+        try:
+            with pooled_multi_db_connection(visible_only=True) as conn:
+                return self.cost_guard.analyze(conn, self._clean_sql_for_sqlite(sql))
+        except Exception as e:
+            logger.warning(f"[cost_guard] Plan analysis failed, allowing query: {e}")
+            return None
+
+    def _check_cost(self, question: str, sql: str, deadline: Optional[Deadline] = None) -> Tuple[str, Optional[str]]:
+        """Apply the cost guard to validated SQL before it is executed.
+
+        Returns (sql_to_execute, rejection_message). Depending on SQL_COST_POLICY the
+        SQL may come back with a LIMIT appended or rewritten by the LLM.
+        """
+        if not self.cost_guard.enabled:
+            return sql, None
+
+        step_start = time.time()
+        report = self._analyze_cost(sql)
+        if report is None:
+            return sql, None
+
+        action = self.cost_guard.decide(report)
+        step_ms = int((time.time() - step_start) * 1000)
+        logger.info(f"[cost_guard] action={action} est_rows={report.estimated_rows:,} {step_ms}ms | {report.describe()}")
+
+        if action == "allow":
+            return sql, None
+        if action == "reject":
+            return sql, f"Query too expensive to run ({report.describe()}). Please narrow down your question."
+
+        if action == "rewrite" and deadline is not None and not deadline.allows(self.min_correction_seconds):
+            logger.info(f"[cost_guard] Skipping LLM rewrite, request budget nearly spent ({deadline})")
+        elif action == "rewrite":
+            try:
+                rewritten = self._rewrite_for_cost(question, sql, report, deadline)
+            except Exception as e:
+                logger.warning(f"[cost_guard] Rewrite LLM call failed: {e}")
+                rewritten = None
+
+            if rewritten and self._validate_sql(rewritten).is_valid:
+                new_report = self._analyze_cost(rewritten)
+                if new_report is not None and self.cost_guard.decide(new_report) == "allow":
+                    logger.info(f"[cost_guard] Rewrite accepted | est_rows={new_report.estimated_rows:,}")
+                    return rewritten, None
+                logger.info("[cost_guard] Rewrite still expensive, capping original query instead")
+
+        # "limit", or a rewrite that didn't help - cap the rows if that bounds the work
+        if report.has_limit or report.is_aggregate:
+            return sql, None
+        limited = self.cost_guard.add_limit(sql)
+        logger.info(f"[cost_guard] Applied LIMIT {self.cost_guard.auto_limit}")
+        return limited, None
+
+    def _rewrite_for_cost(self, question: str, sql: str, report: CostReport,
+                          deadline: Optional[Deadline] = None) -> str:
+        """Ask the LLM for a cheaper version of a valid but expensive query."""
+        rewrite_prompt = SQL_COST_REWRITE_PROMPT.format(
+            query=question,
+            sql=sql,
+            issues="\n".join(f"- {issue.kind}: {issue.detail}" for issue in report.issues),
+            schemas=self.schema_loader.get_schema_text()
+        )
+
+        step_start = time.time()
+        response = self.llm.chat_completion(
+            messages=[
+                {"role": "system", "content": self._get_system_prompt()},
+                {"role": "user", "content": rewrite_prompt}
+            ],
+            temperature=0.0,
+            max_tokens=1000,
+            deadline=deadline
+        )
+        step_ms = int((time.time() - step_start) * 1000)
+        rewritten = self._clean_sql(response)
+        logger.info(f"[cost_guard] LLM rewrite in {step_ms}ms | new_sql=\"{rewritten[:150]}\"")
+        return rewritten
+
+    def _validate_and_execute(self, question: str, sql: str,
+                              deadline: Optional[Deadline] = None) -> Tuple[str, bool, Any, str, Optional[str]]:
+        """Validate, cost-check and execute one SQL statement.
+
+        Returns (sql, success, results, error, fatal_error). sql may differ from the
+        input if the cost guard capped or rewrote it; fatal_error is set when the
+        SQL must not be retried (safety violation or rejected as too expensive).
+        """
+        validation = self._validate_sql(sql)
+        if validation.is_safety_violation:
+            return sql, False, None, validation.message, f"Invalid SQL: {validation.message}"
+        if not validation.is_valid:
+            return sql, False, None, validation.message, None
+
+        sql, cost_error = self._check_cost(question, sql, deadline)
+        if cost_error:
+            return sql, False, None, cost_error, cost_error
+
+        success, results, error = self._execute_sql(sql, deadline)
+        return sql, success, results, error, None
+
+    def _try_candidate(self, question: str, sql: str,
+                       deadline: Optional[Deadline] = None) -> Tuple[str, bool, Any, str]:
+        """Run one parallel candidate, with a single local repair if it fails."""
+        sql = self._clean_sql(sql)
+        sql, success, results, error, fatal_error = self._validate_and_execute(question, sql, deadline)
+        if not success and not fatal_error:
+            repaired = self.repairer.repair(sql, error)
+            if repaired:
+                sql, success, results, error, fatal_error = self._validate_and_execute(question, repaired, deadline)
+        return sql, success, results, error
+
+    def _race_candidates(self, question: str, failed_sql: str, error: str,
+                         deadline: Optional[Deadline] = None) -> Tuple[Optional[Tuple[str, Dict]], str]:
+        """Generate diverse corrections concurrently and keep the first that works.
+
+        Each candidate is corrected, validated and executed in its own thread (pooled
+        connections). The first successful non-empty result wins; an empty success is
+        kept as a fallback until every candidate has finished.
+
+        Returns ((sql, results) or None, last_error).
+        """
+        n = self.parallel_candidates
+        step_start = time.time()
+        logger.info(f"[pipeline] Racing {n} correction candidates")
+
+        def run_candidate(index: int) -> Tuple[str, bool, Any, str]:
+            hint = CANDIDATE_HINTS[index % len(CANDIDATE_HINTS)]
+            temperature = min(0.2 * index, 0.8)
+            candidate = self._correct_sql(question, failed_sql, error, temperature=temperature, hint=hint,
+                                          deadline=deadline)
+            return self._try_candidate(question, candidate, deadline)
+
+        executor = ThreadPoolExecutor(max_workers=n, thread_name_prefix="sql-candidate")
+        # A context per candidate (one context cannot be entered by two threads at once)
+        futures = [executor.submit(copy_context().run, run_candidate, i) for i in range(n)]
+        empty_winner = None
+        last_error = error
+        try:
+            for future in as_completed(futures):
+                try:
+                    sql, success, results, candidate_error = future.result()
+                except Exception as e:
+                    logger.warning(f"[pipeline] Candidate failed: {type(e).__name__}: {e}")
+                    last_error = str(e)
+                    continue
+                if not success:
+                    last_error = candidate_error
+                    continue
+                if results["row_count"] > 0:
+                    step_ms = int((time.time() - step_start) * 1000)
+                    logger.info(f"[pipeline] Candidate won in {step_ms}ms | {results['row_count']} rows")
+                    return (sql, results), ""
+                if empty_winner is None:
+                    empty_winner = (sql, results)
         finally:
-            if conn:
-                conn.close()
+            # Don't wait for slower candidates once we have an answer
+            executor.shutdown(wait=False, cancel_futures=True)
 
-    def _correct_sql(self, question: str, failed_sql: str, error: str) -> str:
-        """Attempt to correct failed SQL using detailed correction prompt."""
+        step_ms = int((time.time() - step_start) * 1000)
+        if empty_winner:
+            logger.info(f"[pipeline] Only empty candidate results after {step_ms}ms")
+            return empty_winner, ""
+        logger.warning(f"[pipeline] All {n} candidates failed after {step_ms}ms | last_error={last_error}")
+        return None, last_error
+
+    def _correct_sql(self, question: str, failed_sql: str, error: str,
+                     temperature: float = 0.0, hint: str = "", deadline: Optional[Deadline] = None) -> str:
+        """Attempt to correct failed SQL using detailed correction prompt.
+
+        temperature and hint are used to diversify parallel candidates.
+        """
         logger.info(f"[correct_sql] Correcting failed SQL | error={error[:150]}")
         correction_prompt = SQL_CORRECTION_PROMPT.format(
             query=question,
@@ -421,6 +747,8 @@ class SQLPipelineV2:
             error_message=error,
             schemas=self.schema_loader.get_schema_text()
         )
+        if hint:
+            correction_prompt += f"\n\nAdditional guidance: {hint}"
 
         step_start = time.time()
         try:
@@ -429,8 +757,9 @@ class SQLPipelineV2:
                     {"role": "system", "content": self._get_system_prompt()},
                     {"role": "user", "content": correction_prompt}
                 ],
-                temperature=0.0,
-                max_tokens=1000
+                temperature=temperature,
+                max_tokens=1000,
+                deadline=deadline
             )
         except Exception as e:
             step_ms = int((time.time() - step_start) * 1000)
@@ -459,69 +788,57 @@ class SQLPipelineV2:
         clean_summary = "\n".join(summary_lines).rstrip()
         return clean_summary, suggestions[:3]
 
-    # Threshold: if results exceed this, use stats-based summarization
-    LARGE_RESULT_THRESHOLD = 50
-
-    def _summarize_results(self, question: str, sql: str, results: Dict) -> tuple:
+    def _summarize_results(self, question: str, sql: str, results: Dict,
+                           on_token: Optional[Callable[[str], None]] = None,
+                           deadline: Optional[Deadline] = None) -> tuple:
         """Generate natural language summary of results. Returns (summary, suggestions).
 
-        For small results (<50 rows): sends actual rows to LLM (accurate for small sets).
-        For large results (>=50 rows): computes stats from ALL rows server-side,
-        sends only stats to LLM (accurate for large sets, no data leakage).
+        Rows are packed compactly up to SUMMARY_ROWS_TOKEN_BUDGET. If every row fits,
+        the LLM sees the actual rows; otherwise statistics are computed from ALL rows
+        server-side and only those (plus a small sample) are sent.
         """
         row_count = results["row_count"]
         all_rows = results["rows"]
 
-        if row_count >= self.LARGE_RESULT_THRESHOLD:
-            return self._summarize_with_stats(question, sql, all_rows, row_count)
-        else:
-            return self._summarize_with_rows(question, sql, all_rows, row_count)
-
-    def _summarize_with_rows(self, question: str, sql: str, rows: List, row_count: int) -> tuple:
-        """Summarize small result sets by sending actual rows to LLM."""
-        max_rows = 25
-        rows_for_summary = rows[:max_rows]
-        truncated_rows = []
-        for row in rows_for_summary:
-            truncated_row = {}
-            for k, v in row.items():
-                sv = str(v) if v is not None else ""
-                truncated_row[k] = sv[:200] if len(sv) > 200 else v
-            truncated_rows.append(truncated_row)
-
-        logger.info(f"[summarize] Small result set ({row_count} rows) — sending {len(truncated_rows)} rows to LLM")
+        packed = pack_rows(all_rows, results.get("columns"))
+        if packed.complete:
+            return self._summarize_with_rows(question, sql, packed, row_count, on_token, deadline)
+        return self._summarize_with_stats(question, sql, all_rows, row_count, on_token, deadline)
+
+    def _summarize_with_rows(self, question: str, sql: str, packed: PackedRows, row_count: int,
+                             on_token: Optional[Callable[[str], None]] = None,
+                             deadline: Optional[Deadline] = None) -> tuple:
+        """Summarize result sets that fit the token budget by sending the packed rows to the LLM."""
+        logger.info(f"[summarize] Result set fits budget ({row_count} rows, ~{packed.tokens} tokens) — sending rows to LLM")
 
         summary_prompt = SQL_RESULT_SUMMARY_PROMPT.format(
             query=question,
             sql=sql,
-            results=json.dumps(truncated_rows, default=str),
+            format_note=RESULT_FORMAT_NOTE,
+            results=packed.text,
             row_count=row_count
         )
 
-        return self._call_llm_for_summary(summary_prompt, "rows")
+        return self._call_llm_for_summary(summary_prompt, "rows", on_token, deadline)
 
-    def _summarize_with_stats(self, question: str, sql: str, rows: List, row_count: int) -> tuple:
+    def _summarize_with_stats(self, question: str, sql: str, rows: List, row_count: int,
+                              on_token: Optional[Callable[[str], None]] = None,
+                              deadline: Optional[Deadline] = None) -> tuple:
         """Summarize large result sets using pre-computed statistics from ALL rows.
 
         No raw data rows are sent to the LLM — only aggregated statistics.
         """
-        logger.info(f"[summarize] Large result set ({row_count} rows) — computing stats from ALL rows")
+        logger.info(f"[summarize] Result set over budget ({row_count} rows) — computing stats from ALL rows")
 
         column_stats, value_distributions = self._compute_result_stats(rows)
 
-        # Include a small sample (5 rows) only for context on data format
-        sample_rows = rows[:5]
-        truncated_sample = []
-        for row in sample_rows:
-            truncated_row = {}
-            for k, v in row.items():
-                sv = str(v) if v is not None else ""
-                truncated_row[k] = sv[:100] if len(sv) > 100 else v
-            truncated_sample.append(truncated_row)
-
+        # Include a small sample only for context on data format
+        sample = pack_rows(rows, token_budget=getattr(settings, 'SUMMARY_SAMPLE_TOKEN_BUDGET', 400),
+                           max_rows=5, max_value_chars=100)
         sample_note = (
-            f"Sample rows (5 of {row_count}, for format reference only — use the statistics above for your analysis):\n"
-            f"{json.dumps(truncated_sample, default=str)}"
+            f"Sample rows ({sample.rows_included} of {row_count}, {RESULT_FORMAT_NOTE}; "
+            f"for format reference only — use the statistics above for your analysis):\n"
+            f"{sample.text}"
         )
 
         summary_prompt = SQL_RESULT_STATS_SUMMARY_PROMPT.format(
@@ -533,7 +850,7 @@ class SQLPipelineV2:
             sample_note=sample_note
         )
 
-        return self._call_llm_for_summary(summary_prompt, "stats")
+        return self._call_llm_for_summary(summary_prompt, "stats", on_token, deadline)
 
     def _compute_result_stats(self, rows: List[Dict]) -> Tuple[str, str]:
         """Compute comprehensive statistics from ALL result rows.
@@ -620,17 +937,36 @@ class SQLPipelineV2:
 
         return column_stats_text, distributions_text
 
-    def _call_llm_for_summary(self, prompt: str, mode: str) -> tuple:
-        """Call LLM with a summarization prompt. Returns (summary, suggestions)."""
-        logger.info(f"[summarize] Prompt length: {len(prompt)} chars (mode={mode})")
+    def _complete_summary(self, prompt: str, temperature: float, max_tokens: int,
+                          on_token: Optional[Callable[[str], None]] = None,
+                          deadline: Optional[Deadline] = None) -> str:
+        """Run a summary completion, streaming the visible text to on_token if given."""
+        messages = [{"role": "user", "content": prompt}]
+        if not on_token:
+            return self.llm.chat_completion(messages=messages, temperature=temperature, max_tokens=max_tokens,
+                                            deadline=deadline)
+
+        token_filter = SummaryTokenFilter(on_token)
+        chunks = []
+        for chunk in self.llm.chat_completion_stream(messages=messages, temperature=temperature, max_tokens=max_tokens,
+                                                     deadline=deadline):
+            chunks.append(chunk)
+            token_filter.feed(chunk)
+        token_filter.flush()
+        return "".join(chunks)
+
+    def _call_llm_for_summary(self, prompt: str, mode: str,
+                              on_token: Optional[Callable[[str], None]] = None,
+                              deadline: Optional[Deadline] = None) -> tuple:
+        """Call LLM with a summarization prompt. Returns (summary, suggestions).
+
+        If on_token is given the summary text is streamed to it as it is generated.
+        """
+        logger.info(f"[summarize] Prompt length: {len(prompt)} chars, ~{count_tokens(prompt)} tokens (mode={mode})")
 
         step_start = time.time()
         try:
-            response = self.llm.chat_completion(
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=2000
-            )
+            response = self._complete_summary(prompt, 0.3, 2000, on_token, deadline)
         except Exception as e:
             step_ms = int((time.time() - step_start) * 1000)
             logger.error(f"[summarize] LLM summarization FAILED after {step_ms}ms: {type(e).__name__}: {e}", exc_info=True)
@@ -641,7 +977,9 @@ class SQLPipelineV2:
         logger.info(f"[summarize] OK {step_ms}ms (mode={mode}) | summary_chars={len(summary)} | suggestions={len(suggestions)}")
         return summary, suggestions
 
-    def _summarize_no_results(self, question: str, sql: str) -> tuple:
+    def _summarize_no_results(self, question: str, sql: str,
+                              on_token: Optional[Callable[[str], None]] = None,
+                              deadline: Optional[Deadline] = None) -> tuple:
         """Generate a natural language explanation when a query returns zero rows.
         Returns (summary, suggestions)."""
         no_results_prompt = (
@@ -661,16 +999,97 @@ class SQLPipelineV2:
 
         logger.info(f"[summarize_no_results] Generating natural response for zero-row result")
         step_start = time.time()
-        response = self.llm.chat_completion(
-            messages=[{"role": "user", "content": no_results_prompt}],
-            temperature=0.4,
-            max_tokens=1000
-        )
+        response = self._complete_summary(no_results_prompt, 0.4, 1000, on_token, deadline)
         step_ms = int((time.time() - step_start) * 1000)
         summary, suggestions = self._parse_suggestions(response)
         logger.info(f"[summarize_no_results] OK {step_ms}ms | summary_chars={len(summary)} | suggestions={len(suggestions)}")
         return summary, suggestions
 
+    def _mask_results_for_llm(self, results: Dict, sql: str) -> Optional[Dict]:
+        """Mask sensitive columns before LLM summarization (user still sees real data).
+
+        Returns None if masking fails, in which case no rows may go to the LLM.
+        """
+        try:
+            import copy
+            from backend.pii.column_masker import mask_query_results
+            masked_results = mask_query_results(copy.deepcopy(results), sql)
+        except Exception as e:
+            logger.error(f"[pipeline] Column masking failed: {e}", exc_info=True)
+            return None
+
+        # Log masked vs original for PII audit
+        masked_cols = [c for c in masked_results.get("columns", [])
+                       if masked_results["rows"] and masked_results["rows"][0].get(c) == "[MASKED]"]
+        if masked_cols:
+            sample = masked_results["rows"][0] if masked_results["rows"] else {}
+            logger.info(f"[PII column_mask] Columns masked for LLM: {masked_cols}")
+            logger.info(f"[PII column_mask] Sample row sent to LLM: {sample}")
+        return masked_results
+
+    def _summarize_success(self, question: str, sql: str, results: Dict, masked_results: Optional[Dict],
+                           on_token: Optional[Callable[[str], None]] = None,
+                           deadline: Optional[Deadline] = None) -> Tuple[str, List[str]]:
+        """Summarize an executed query (including zero-row results). Returns (summary, suggestions).
+
+        Never raises - falls back to a plain sentence if the LLM call fails (or the
+        request deadline leaves no time for it), so it can run inline or as a
+        background summary job.
+        """
+        suggestions = []
+        llm_budget = deadline is None or deadline.allows(self.min_summary_seconds)
+        if results["row_count"] == 0:
+            no_results_fallback = (f"I couldn't find any data matching your question. "
+                                   f"The specific criteria you mentioned may not have corresponding entries in the database. "
+                                   f"Try adjusting your search terms or ask me what data is available.")
+            if not llm_budget:
+                logger.info(f"[pipeline] Zero rows returned, skipping LLM explanation - budget nearly spent ({deadline})")
+                return no_results_fallback, suggestions
+            # No data found — use LLM to generate a natural, context-aware response
+            logger.info("[pipeline] Zero rows returned, generating natural language response")
+            try:
+                summary, suggestions = self._summarize_no_results(question, sql, on_token, deadline)
+                if not summary or not summary.strip():
+                    summary = (f"I looked through the database for your query but couldn't find any matching results. "
+                               f"This could mean the data doesn't exist yet, or the search criteria might need adjusting. "
+                               f"Could you try rephrasing or broadening your search?")
+            except Exception as e:
+                logger.warning(f"[pipeline] No-results summarization failed: {e}")
+                summary = no_results_fallback
+            return summary, suggestions
+
+        if masked_results is None:
+            return f"Query returned {results['row_count']} rows.", suggestions
+
+        # Scalar / tiny results are phrased locally - no LLM round trip
+        try:
+            templated = self.template_summarizer.summarize(question, sql, masked_results)
+        except Exception as e:
+            logger.warning(f"[pipeline] Template summary failed, using LLM: {e}")
+            templated = None
+        if templated:
+            summary, suggestions = templated
+            if on_token:
+                on_token(summary)
+            return summary, suggestions
+
+        if not llm_budget:
+            logger.info(f"[pipeline] Skipping LLM summary - request budget nearly spent ({deadline})")
+            return f"Query returned {results['row_count']} row(s).", suggestions
+
+        step_start = time.time()
+        try:
+            summary, suggestions = self._summarize_results(question, sql, masked_results, on_token, deadline)
+            # Guard against empty LLM summary
+            if not summary or not summary.strip():
+                summary = f"Query returned {results['row_count']} row(s)."
+                logger.warning("[pipeline] LLM returned empty summary, using fallback")
+        except Exception as e:
+            step_ms = int((time.time() - step_start) * 1000)
+            logger.error(f"[pipeline] Summarization failed after {step_ms}ms: {e}", exc_info=True)
+            summary = f"Query returned {results['row_count']} rows."
+        return summary, suggestions
+
     def refresh_schema(self, reload_loader: bool = True):
         """Refresh the schema loader data (e.g. after upload).
 
@@ -680,11 +1099,41 @@ class SQLPipelineV2:
         """
         if reload_loader:
             self.schema_loader.reload()
+        self.cost_guard.refresh()
+        self.few_shot_store.refresh()
+
+    @staticmethod
+    def _emit(on_event: Optional[Callable[[str, Dict], None]], event: str, data: Dict):
+        """Send a progress event to the caller; a failing listener never breaks the pipeline."""
+        if on_event is None:
+            return
+        try:
+            on_event(event, data)
+        except Exception as e:
+            logger.warning(f"[pipeline] Event listener failed for '{event}': {e}")
+
+    def run(self, question: str, context: str = "",
+            on_event: Optional[Callable[[str, Dict], None]] = None,
+            defer_summary: bool = False, deadline: Optional[Deadline] = None,
+            previous_sql: Optional[str] = None) -> Dict:
+        """Run the full SQL pipeline.
+
+        on_event, if given, receives progress events as they happen:
+        "sql" ({"sql"}) once SQL is generated, "rows" ({"sql", "results"}) once it
+        executed, and "summary_token" ({"text"}) while the summary is generated.
+
+        With defer_summary the result is returned as soon as the rows are ready;
+        summarization runs as a background job whose id is in "summary_job_id".
+
+        deadline bounds the whole request: every LLM call and query gets at most the
+        remaining budget, and corrections / LLM summaries are skipped when it is
+        nearly spent. Without one, only the per-call timeouts apply.
 
-    def run(self, question: str, context: str = "") -> Dict:
-        """Run the full SQL pipeline."""
+        previous_sql is the SQL behind the conversation's last answer. Follow-ups that
+        only filter, sort, limit or re-window it are applied to it without an LLM call.
+        """
         start_time = time.time()
-        logger.info(f"[pipeline] START question=\"{question[:120]}\" context_len={len(context)}")
+        logger.info(f"[pipeline] START question=\"{question[:120]}\" context_len={len(context)} {deadline or ''}")
 
         # Step 1: Check for meta-questions (no LLM needed)
         if self._detect_meta_question(question):
@@ -694,15 +1143,27 @@ class SQLPipelineV2:
             logger.info(f"[pipeline] DONE meta | {result['processing_time_ms']}ms")
             return result
 
-        # Step 2: Generate SQL using LLM
+        # Step 2: Simple refinements of the previous answer are applied to its SQL locally
+        if previous_sql:
+            refined = self._refine_previous(question, previous_sql, start_time, on_event, defer_summary, deadline)
+            if refined is not None:
+                return refined
+
+        # Step 3: Generate SQL using LLM
+        speculation = None
         try:
-            llm_response = self._generate_sql(question, context)
+            if self.streaming_generation:
+                llm_response, speculation = self._generate_sql_streaming(question, context, deadline)
+            else:
+                llm_response = self._generate_sql(question, context, deadline)
         except Exception as e:
             elapsed = int((time.time() - start_time) * 1000)
             logger.error(f"[pipeline] FAILED at generate_sql step after {elapsed}ms: {type(e).__name__}: {e}", exc_info=True)
+            timed_out = isinstance(e, DeadlineExceeded) or (deadline is not None and deadline.expired)
             return {
                 "success": False,
-                "error": f"Failed to understand question: {str(e)}",
+                "error": ("The request took too long to process. Please try again or simplify your question."
+                          if timed_out else f"Failed to understand question: {str(e)}"),
                 "intent": "error",
                 "sql": None,
                 "results": None,
@@ -755,105 +1216,100 @@ class SQLPipelineV2:
 
         sql = self._clean_sql(sql)
         logger.info(f"[pipeline] Generated SQL: {sql[:200]}")
+        self._emit(on_event, "sql", {"sql": sql})
 
-        # Validate SQL
-        is_valid, validation_msg = self._validate_sql(sql)
-        if not is_valid:
-            elapsed = int((time.time() - start_time) * 1000)
-            logger.warning(f"[pipeline] SQL validation failed: {validation_msg} | {elapsed}ms")
-            return {
-                "success": False,
-                "error": f"Invalid SQL: {validation_msg}",
-                "intent": "data",
-                "sql": sql,
-                "results": None,
-                "processing_time_ms": elapsed
-            }
-
-        # Execute with retry loop
+        # Validate and execute with self-correction loop. Validation prepares the
+        # statement with EXPLAIN, so schema errors trigger a correction without
+        # paying for a full execution first. Mechanical errors are repaired locally;
+        # only SQL_MAX_RETRIES LLM corrections are spent.
         last_error = ""
-        for attempt in range(self.max_retries + 1):
-            logger.info(f"[pipeline] Execute attempt {attempt + 1}/{self.max_retries + 1}")
-            success, results, error = self._execute_sql(sql)
-
-            if success:
-                logger.info(f"[pipeline] SQL executed OK | {results['row_count']} rows")
-                suggestions = []
-                masked_results = None
-
-                if results["row_count"] == 0:
-                    # No data found — use LLM to generate a natural, context-aware response
-                    logger.info("[pipeline] Zero rows returned, generating natural language response")
-                    try:
-                        summary, suggestions = self._summarize_no_results(question, sql)
-                        if not summary or not summary.strip():
-                            summary = (f"I looked through the database for your query but couldn't find any matching results. "
-                                       f"This could mean the data doesn't exist yet, or the search criteria might need adjusting. "
-                                       f"Could you try rephrasing or broadening your search?")
-                    except Exception as e:
-                        logger.warning(f"[pipeline] No-results summarization failed: {e}")
-                        summary = (f"I couldn't find any data matching your question. "
-                                   f"The specific criteria you mentioned may not have corresponding entries in the database. "
-                                   f"Try adjusting your search terms or ask me what data is available.")
-                else:
+        attempts = 0
+        llm_corrections = 0
+        local_repairs = 0
+        seen_sql = {sql}
+        llm_fix_from: Optional[Tuple[str, str]] = None  # (error, failed_sql) behind the last LLM correction
+        raced = False
+        prepared: Optional[Tuple[str, Dict]] = None  # (sql, results) already executed by a candidate race
+        while True:
+            attempts += 1
+            if prepared:
+                (sql, results), prepared = prepared, None
+                success, error = True, ""
+            else:
+                outcome = None
+                if speculation is not None and speculation[0] == sql:
+                    # Already validated/executed while the LLM was still streaming
                     try:
-                        # Mask sensitive columns before LLM summarization (user still sees real data)
-                        import copy
-                        from backend.pii.column_masker import mask_query_results
-                        masked_results = mask_query_results(copy.deepcopy(results), sql)
-
-                        # Log masked vs original for PII audit
-                        masked_cols = [c for c in masked_results.get("columns", [])
-                                       if masked_results["rows"] and masked_results["rows"][0].get(c) == "[MASKED]"]
-                        if masked_cols:
-                            sample = masked_results["rows"][0] if masked_results["rows"] else {}
-                            logger.info(f"[PII column_mask] Columns masked for LLM: {masked_cols}")
-                            logger.info(f"[PII column_mask] Sample row sent to LLM: {sample}")
-
-                        summary, suggestions = self._summarize_results(question, sql, masked_results)
-                        # Guard against empty LLM summary
-                        if not summary or not summary.strip():
-                            summary = f"Query returned {results['row_count']} row(s)."
-                            logger.warning("[pipeline] LLM returned empty summary, using fallback")
+                        outcome = speculation[1].result()
+                        logger.info("[pipeline] Using speculative execution result")
                     except Exception as e:
-                        elapsed = int((time.time() - start_time) * 1000)
-                        logger.error(f"[pipeline] Summarization failed after {elapsed}ms: {e}", exc_info=True)
-                        summary = f"Query returned {results['row_count']} rows."
+                        logger.warning(f"[pipeline] Speculative execution failed, re-running: {e}")
+                speculation = None
+                if outcome is None:
+                    outcome = self._validate_and_execute(question, sql, deadline)
+                sql, success, results, error, fatal_error = outcome
+                if fatal_error:
+                    elapsed = int((time.time() - start_time) * 1000)
+                    logger.warning(f"[pipeline] SQL refused: {fatal_error} | {elapsed}ms")
+                    return {
+                        "success": False,
+                        "error": fatal_error,
+                        "intent": "data",
+                        "sql": sql,
+                        "results": None,
+                        "processing_time_ms": elapsed
+                    }
 
-                elapsed = int((time.time() - start_time) * 1000)
-                logger.info(f"[pipeline] DONE data success | attempts={attempt + 1} | {elapsed}ms")
-                return {
-                    "success": True,
-                    "intent": "data",
-                    "sql": sql,
-                    "results": results,
-                    "masked_results": masked_results if results["row_count"] > 0 else None,
-                    "summary": summary,
-                    "suggestions": suggestions,
-                    "explanation": response_data.get("explanation", ""),
-                    "attempts": attempt + 1,
-                    "processing_time_ms": elapsed
-                }
+            if success:
+                if llm_fix_from:
+                    self.repairer.learn(llm_fix_from[0], llm_fix_from[1], sql)
+                return self._data_success(question, sql, results, response_data.get("explanation", ""),
+                                          attempts, start_time, on_event, defer_summary, deadline)
 
-            # Attempt correction
+            # Attempt local repair first - no LLM round trip for mechanical errors
             last_error = error
-            if attempt < self.max_retries:
-                logger.info(f"[pipeline] SQL failed, attempting correction (attempt {attempt + 1})")
-                try:
-                    sql = self._correct_sql(question, sql, error)
-                except Exception as e:
-                    logger.error(f"[pipeline] SQL correction LLM call failed: {e}", exc_info=True)
-                    break
-                is_valid, validation_msg = self._validate_sql(sql)
-                if not is_valid:
-                    logger.warning(f"[pipeline] Corrected SQL still invalid: {validation_msg}")
-                    last_error = validation_msg
+            repaired = self.repairer.repair(sql, error)
+            if repaired and repaired not in seen_sql and local_repairs < self.MAX_LOCAL_REPAIRS:
+                local_repairs += 1
+                logger.info(f"[pipeline] SQL failed, applied local repair | new_sql=\"{repaired[:150]}\"")
+                seen_sql.add(repaired)
+                sql = repaired
+                continue
+
+            # LLM corrections are optional work - don't start one the budget can't cover
+            if deadline is not None and not deadline.allows(self.min_correction_seconds):
+                logger.warning(f"[pipeline] Skipping LLM correction - request budget nearly spent ({deadline})")
+                break
+
+            # Parallel mode: race diverse corrections instead of retrying serially
+            if self.parallel_candidates > 1 and not raced:
+                raced = True
+                llm_fix_from = (error, sql)
+                winner, race_error = self._race_candidates(question, sql, error, deadline)
+                if winner:
+                    prepared = winner
+                    continue
+                last_error = race_error or last_error
+                break
+
+            # Fall back to LLM correction
+            if llm_corrections >= self.max_retries:
+                break
+            llm_corrections += 1
+            logger.info(f"[pipeline] SQL failed, attempting LLM correction ({llm_corrections}/{self.max_retries})")
+            llm_fix_from = (error, sql)
+            try:
+                sql = self._correct_sql(question, sql, error, deadline=deadline)
+            except Exception as e:
+                logger.error(f"[pipeline] SQL correction LLM call failed: {e}", exc_info=True)
+                break
+            seen_sql.add(sql)
 
         elapsed = int((time.time() - start_time) * 1000)
-        logger.error(f"[pipeline] FAILED after {self.max_retries + 1} attempts | last_error={last_error} | {elapsed}ms")
+        logger.error(f"[pipeline] FAILED after {attempts} attempts | last_error={last_error} | {elapsed}ms")
         return {
             "success": False,
-            "error": f"Query failed after {self.max_retries + 1} attempts. Last error: {last_error}",
+            "error": f"Query failed after {attempts} attempts. Last error: {last_error}",
             "summary": ("I wasn't able to find an answer for that. "
                         "Could you try rephrasing your question or providing more details?"),
             "intent": "data",
@@ -862,6 +1318,128 @@ class SQLPipelineV2:
             "processing_time_ms": elapsed
         }
 
+    def _data_success(self, question: str, sql: str, results: Dict, explanation: str, attempts: int,
+                      start_time: float, on_event: Optional[Callable[[str, Dict], None]],
+                      defer_summary: bool, deadline: Optional[Deadline]) -> Dict:
+        """Mask, summarize (or defer the summary) and build the result for executed SQL."""
+        logger.info(f"[pipeline] SQL executed OK | {results['row_count']} rows")
+        self._emit(on_event, "rows", {"sql": sql, "results": results})
+        on_token = (lambda text: self._emit(on_event, "summary_token", {"text": text})) if on_event else None
+        masked_results = self._mask_results_for_llm(results, sql) if results["row_count"] > 0 else None
+        summary_job_id = None
+        if defer_summary:
+            summary, suggestions = None, []
+            summary_job_id = get_summary_job_manager().submit(
+                self._summarize_success, question, sql, results, masked_results
+            )
+        else:
+            summary, suggestions = self._summarize_success(question, sql, results, masked_results,
+                                                           on_token, deadline)
+
+        elapsed = int((time.time() - start_time) * 1000)
+        logger.info(f"[pipeline] DONE data success | attempts={attempts} | {elapsed}ms")
+        return {
+            "success": True,
+            "intent": "data",
+            "sql": sql,
+            "results": results,
+            "masked_results": masked_results,
+            "summary": summary,
+            "suggestions": suggestions,
+            "summary_job_id": summary_job_id,
+            "explanation": explanation,
+            "attempts": attempts,
+            "processing_time_ms": elapsed
+        }
+
+    def _refine_previous(self, question: str, previous_sql: str, start_time: float,
+                         on_event: Optional[Callable[[str, Dict], None]], defer_summary: bool,
+                         deadline: Optional[Deadline]) -> Optional[Dict]:
+        """Answer a follow-up by editing previous_sql; None means use normal generation."""
+        step_start = time.time()
+        try:
+            edit = self.followup_editor.apply(question, previous_sql)
+        except Exception as e:
+            logger.warning(f"[pipeline] Follow-up edit failed, using LLM: {e}")
+            return None
+        if edit is None:
+            return None
+
+        sql = self._clean_sql(edit.sql)
+        sql, success, results, error, fatal_error = self._validate_and_execute(question, sql, deadline)
+        step_ms = int((time.time() - step_start) * 1000)
+        if not success:
+            logger.info(f"[pipeline] Refined SQL failed ({fatal_error or error}), using LLM | {step_ms}ms")
+            return None
+        # Only now - a failed edit falls back to the LLM, which sends its own "sql" event
+        self._emit(on_event, "sql", {"sql": sql})
+        logger.info(f"[pipeline] Follow-up answered by local SQL edit (no LLM) | {step_ms}ms")
+        result = self._data_success(question, sql, results, edit.description, 1,
+                                    start_time, on_event, defer_summary, deadline)
+        result["refined_locally"] = True
+        return result
+
+    @staticmethod
+    def _batch_key(question: str) -> str:
+        """Normalize a question for batch de-duplication."""
+        return " ".join(question.split()).casefold()
+
+    def run_batch(self, questions: List[str], context: str = "", max_concurrency: Optional[int] = None,
+                  deadline_seconds: Optional[float] = None) -> Iterator[Tuple[int, Dict]]:
+        """Run many questions with bounded parallelism, yielding (index, result) as each finishes.
+
+        Identical questions (ignoring case and whitespace) run once and their result is
+        yielded for every index. The schema system prompt is built once and shared by
+        all questions. max_concurrency is capped at BATCH_MAX_CONCURRENCY; each question
+        gets its own deadline of deadline_seconds (default CHAT_REQUEST_TIMEOUT_SECONDS)
+        from when it starts.
+        """
+        limit = getattr(settings, 'BATCH_MAX_CONCURRENCY', 4)
+        workers = max(1, min(max_concurrency or limit, limit))
+        if deadline_seconds is None:
+            deadline_seconds = getattr(settings, 'CHAT_REQUEST_TIMEOUT_SECONDS', 90)
+
+        groups: Dict[str, List[int]] = {}
+        for index, question in enumerate(questions):
+            groups.setdefault(self._batch_key(question), []).append(index)
+
+        step_start = time.time()
+        system_prompt = self._get_system_prompt()
+        logger.info(f"[batch] START {len(questions)} questions ({len(groups)} unique) | concurrency={workers}")
+
+        def run_one(question: str) -> Dict:
+            token = _shared_system_prompt.set(system_prompt)
+            question_start = time.time()
+            try:
+                return self.run(question, context, deadline=Deadline.after(deadline_seconds))
+            except Exception as e:
+                logger.error(f"[batch] Question failed: {type(e).__name__}: {e}", exc_info=True)
+                return {
+                    "success": False,
+                    "error": str(e),
+                    "intent": "error",
+                    "sql": None,
+                    "results": None,
+                    "processing_time_ms": int((time.time() - question_start) * 1000)
+                }
+            finally:
+                _shared_system_prompt.reset(token)
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sql-batch")
+        futures = {executor.submit(run_one, questions[indexes[0]]): indexes for indexes in groups.values()}
+        completed = 0
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                for index in futures[future]:
+                    completed += 1
+                    yield index, dict(result)
+        finally:
+            # Caller stopped early (e.g. client disconnected) - drop questions not yet started
+            executor.shutdown(wait=False, cancel_futures=True)
+            step_ms = int((time.time() - step_start) * 1000)
+            logger.info(f"[batch] DONE {completed}/{len(questions)} results | {step_ms}ms")
+
 
 # Singleton
 _pipeline: Optional[SQLPipelineV2] = None
@@ -0,0 +1,109 @@
+"""Compact, token-budgeted encoding of result rows for LLM summary prompts.
+
+Rows are written as a tab-separated header plus one line per row instead of
+JSON objects, so column names are not repeated on every row. Long values that
+occur more than once are written once in a "Repeated values" legend and
+referenced as ~1, ~2, ... in the rows. Rows are added until the token budget is
+reached; the caller can tell from `complete` whether every row made it in.
+"""
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from backend.config import settings
+from backend.llm.tokens import count_tokens
+
+logger = logging.getLogger("chatbot.sql.result_packer")
+
+
+# Values at least this long are candidates for the repeated-values legend
+DEDUPE_MIN_CHARS = 24
+# Rows scanned when looking for repeated values (bounds the cost on huge results)
+DEDUPE_SCAN_ROWS = 2000
+
+FORMAT_NOTE = (
+    "tab-separated, first line is the column header; "
+    "~N stands for the value listed as ~N under 'Repeated values'"
+)
+
+
+@dataclass
+class PackedRows:
+    """Rows encoded for a prompt."""
+    text: str
+    rows_included: int
+    total_rows: int
+    tokens: int
+
+    @property
+    def complete(self) -> bool:
+        return self.rows_included >= self.total_rows
+
+
+def _clean_value(value, max_chars: int) -> str:
+    if value is None:
+        return ""
+    text = str(value).replace("\t", " ").replace("\r", " ").replace("\n", " ")
+    if len(text) > max_chars:
+        text = text[:max_chars] + "..."
+    return text
+
+
+def pack_rows(rows: List[Dict], columns: Optional[List[str]] = None, token_budget: Optional[int] = None,
+              max_rows: Optional[int] = None, max_value_chars: Optional[int] = None) -> PackedRows:
+    """Encode as many rows as fit in token_budget (header and legend included)."""
+    token_budget = token_budget if token_budget is not None else getattr(settings, "SUMMARY_ROWS_TOKEN_BUDGET", 4000)
+    max_value_chars = max_value_chars if max_value_chars is not None else getattr(settings, "SUMMARY_MAX_VALUE_CHARS", 200)
+    if columns is None:
+        columns = list(rows[0].keys()) if rows else []
+    candidates = rows if max_rows is None else rows[:max_rows]
+
+    header = "\t".join(columns)
+    used = count_tokens(header)
+
+    # Long values seen more than once get a ~N reference
+    occurrences = Counter(
+        value
+        for row in candidates[:DEDUPE_SCAN_ROWS]
+        for value in (_clean_value(row.get(col), max_value_chars) for col in columns)
+        if len(value) >= DEDUPE_MIN_CHARS
+    )
+    repeated = {value for value, count in occurrences.items() if count > 1}
+    refs: Dict[str, str] = {}
+    legend: List[str] = []
+    if repeated:
+        used += count_tokens("\nRepeated values:")
+
+    lines = []
+    for row in candidates:
+        cells = []
+        new_refs: Dict[str, str] = {}
+        for col in columns:
+            value = _clean_value(row.get(col), max_value_chars)
+            if value in repeated:
+                ref = refs.get(value) or new_refs.get(value)
+                if ref is None:
+                    ref = new_refs[value] = f"~{len(refs) + len(new_refs) + 1}"
+                value = ref
+            cells.append(value)
+
+        line = "\t".join(cells)
+        new_legend = [f"{ref} = {value}" for value, ref in new_refs.items()]
+        cost = count_tokens(line) + sum(count_tokens(entry) for entry in new_legend)
+        if used + cost > token_budget and lines:
+            break
+        used += cost
+        lines.append(line)
+        refs.update(new_refs)
+        legend.extend(new_legend)
+
+    parts = [header] + lines
+    if legend:
+        parts += ["", "Repeated values:"] + legend
+    text = "\n".join(parts)
+
+    packed = PackedRows(text=text, rows_included=len(lines), total_rows=len(rows), tokens=used)
+    logger.debug(f"[result_packer] Packed {packed.rows_included}/{packed.total_rows} rows, "
+                 f"~{packed.tokens} tokens, {len(legend)} repeated values")
+    return packed
@@ -1,9 +1,15 @@
-"""In-memory schema cache - eliminates embedding API calls for schema retrieval."""
+"""In-memory schema cache - eliminates embedding API calls for schema retrieval.
+
+Keyword retrieval uses an inverted BM25 index over every table, built once per
+loaded cache (a schema change replaces the cache and so rebuilds the index).
+"""
 import sqlite3
 import re
 import logging
-from typing import Dict, List, Optional
+from typing import Collection, Dict, List, Optional, Tuple
 from backend.config import settings
+from backend.cache.bm25 import BM25Index
+from backend.schema.snapshot import read_snapshot, source_fingerprint, write_snapshot
 
 logger = logging.getLogger("chatbot.sql.schema_cache")
 
@@ -129,45 +135,67 @@ KEYWORD_TABLE_MAP = {
 
 # Full schema cache loaded from database
 _schema_cache: Optional[Dict[str, Dict]] = None
-
-
-def _load_schema_cache() -> Dict[str, Dict]:
-    """Load all schema metadata from app.db into memory."""
+# Binary snapshot of the parsed cache (see backend.schema.snapshot)
+SNAPSHOT_NAME = "schema_cache"
+# (cache dict it was built from, BM25 index over its tables)
+_keyword_index: Optional[Tuple[Dict[str, Dict], BM25Index]] = None
+# How many times each field is repeated in a table's indexed text
+FIELD_WEIGHTS = {"table": 3, "keywords": 2, "columns": 2, "description": 1, "column_descriptions": 1}
+
+
+_CACHE_QUERY = """
+    SELECT db_name, table_name, column_details, row_count, ddl_statement, llm_description, column_descriptions
+    FROM schema_metadata
+"""
+
+
+def _cache_entry(row: sqlite3.Row) -> Dict:
+    """Cache entry for one schema_metadata row."""
+    # Parse column descriptions if available
+    col_descriptions = {}
+    if row['column_descriptions']:
+        try:
+            import json
+            col_descriptions = json.loads(row['column_descriptions'])
+        except (json.JSONDecodeError, TypeError):
+            pass
+    return {
+        "db_name": row['db_name'],
+        "table_name": row['table_name'],
+        "description": row['llm_description'],
+        "columns": _parse_columns(row['column_details'], row['ddl_statement']),
+        "column_descriptions": col_descriptions,
+        "ddl": row['ddl_statement'],
+        "row_count": row['row_count']
+    }
+
+
+def _load_schema_cache(use_snapshot: bool = True) -> Dict[str, Dict]:
+    """Load all schema metadata from app.db into memory (from the snapshot if current)."""
     global _schema_cache
     if _schema_cache is not None:
         return _schema_cache
 
+    fingerprint = source_fingerprint()
+    if use_snapshot:
+        cached = read_snapshot(SNAPSHOT_NAME, fingerprint)
+        if cached is not None:
+            _schema_cache = cached
+            logger.info(f"Schema cache loaded from snapshot: {len(_schema_cache)} tables")
+            return _schema_cache
+
     _schema_cache = {}
     try:
         conn = sqlite3.connect(settings.app_db_path)
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
-        cursor.execute("""
-            SELECT db_name, table_name, column_details, row_count, ddl_statement, llm_description, column_descriptions
-            FROM schema_metadata
-        """)
+        cursor.execute(_CACHE_QUERY)
 
         for row in cursor.fetchall():
-            full_name = f"{row['db_name']}.{row['table_name']}"
-            # Parse column descriptions if available
-            col_descriptions = {}
-            if row['column_descriptions']:
-                try:
-                    import json
-                    col_descriptions = json.loads(row['column_descriptions'])
-                except (json.JSONDecodeError, TypeError):
-                    pass
-            _schema_cache[full_name] = {
-                "db_name": row['db_name'],
-                "table_name": row['table_name'],
-                "description": row['llm_description'],
-                "columns": _parse_columns(row['column_details'], row['ddl_statement']),
-                "column_descriptions": col_descriptions,
-                "ddl": row['ddl_statement'],
-                "row_count": row['row_count']
-            }
+            _schema_cache[f"{row['db_name']}.{row['table_name']}"] = _cache_entry(row)
         conn.close()
+        write_snapshot(SNAPSHOT_NAME, fingerprint, _schema_cache)
         logger.info(f"Schema cache loaded: {len(_schema_cache)} tables from {settings.app_db_path}")
         if _schema_cache:
             db_names = set(v["db_name"] for v in _schema_cache.values())
@@ -185,7 +213,30 @@ def reload_cache():
     """Clear and reload the schema cache."""
     global _schema_cache
     _schema_cache = None
-    _load_schema_cache()
+    _load_schema_cache(use_snapshot=False)
+
+
+def reload_database(db_name: str):
+    """Re-read one database's tables into the cache (none left if it was deleted)."""
+    global _schema_cache
+    if _schema_cache is None:
+        return  # Loaded in full on first use anyway
+    try:
+        conn = sqlite3.connect(settings.app_db_path)
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(_CACHE_QUERY + " WHERE db_name = ?", (db_name,)).fetchall()
+        conn.close()
+    except Exception as e:
+        logger.error(f"Error reloading schema cache for {db_name}: {e}")
+        return
+
+    # Swap in a new dict so concurrent readers never see it change mid-iteration
+    cache = {k: v for k, v in _schema_cache.items() if v["db_name"] != db_name}
+    for row in rows:
+        cache[f"{row['db_name']}.{row['table_name']}"] = _cache_entry(row)
+    _schema_cache = cache
+    write_snapshot(SNAPSHOT_NAME, source_fingerprint(), cache)
+    logger.info(f"Schema cache reloaded for {db_name}: {len(rows)} tables")
 
 
 def _parse_columns(column_details: str, ddl: str) -> List[Dict]:
@@ -208,103 +259,116 @@ def _parse_columns(column_details: str, ddl: str) -> List[Dict]:
     return columns
 
 
-def _match_uploaded_schemas(query_lower: str, cache: Dict[str, Dict]) -> set:
-    """Match query keywords against uploaded/dynamic database schemas.
-
-    Scans table names, column names, and descriptions of databases that are
-    NOT in the hardcoded KEYWORD_TABLE_MAP.  This ensures uploaded databases
-    are discoverable without manual keyword mapping.
-    """
-    hardcoded_dbs = {"crew_management", "flight_operations", "hr_payroll", "compliance_training"}
-    matched = set()
-
-    query_words = set(re.findall(r'[a-z0-9]+', query_lower))
-
+def _table_keywords() -> Dict[str, List[str]]:
+    """Invert KEYWORD_TABLE_MAP: "db.table" -> curated keywords for it."""
+    keywords: Dict[str, List[str]] = {}
+    for keyword, tables in KEYWORD_TABLE_MAP.items():
+        for table in tables:
+            keywords.setdefault(table, []).append(keyword)
+    return keywords
+
+
+def _table_document(schema: Dict, keywords: List[str]) -> str:
+    """Text indexed for one table, each field repeated by its weight."""
+    fields = {
+        "table": schema.get("table_name", ""),
+        "keywords": " ".join(keywords),
+        "columns": " ".join(col.get("name", "") for col in schema.get("columns", [])),
+        "description": schema.get("description") or "",
+        "column_descriptions": " ".join(str(v) for v in (schema.get("column_descriptions") or {}).values()),
+    }
+    return " ".join(" ".join([text] * FIELD_WEIGHTS[field]) for field, text in fields.items() if text)
+
+
+def _get_keyword_index(cache: Dict[str, Dict]) -> BM25Index:
+    """BM25 index over cache, rebuilt whenever the cache is replaced (i.e. the schema changed)."""
+    global _keyword_index
+    state = _keyword_index
+    if state is not None and state[0] is cache:
+        return state[1]
+
+    index = BM25Index()
+    keywords = _table_keywords()
     for full_name, schema in cache.items():
-        db_name = schema.get("db_name", "")
-        if db_name in hardcoded_dbs or db_name == "app":
+        if schema.get("db_name") == "app":
             continue
-
-        table_name = schema.get("table_name", "").lower()
-        description = (schema.get("description") or "").lower()
-
-        # Match against table name (split underscores)
-        table_words = set(table_name.replace("_", " ").split())
-        if query_words & table_words:
-            matched.add(full_name)
+        index.add(full_name, _table_document(schema, keywords.get(full_name, [])))
+    _keyword_index = (cache, index)
+    logger.info(f"Schema keyword index built: {len(index)} tables")
+    return index
+
+
+def _default_tables(cache: Dict[str, Dict]) -> List[str]:
+    """Tables returned when nothing in the query matches the index."""
+    tables = [
+        "crew_management.crew_members",
+        "crew_management.crew_assignments",
+        "flight_operations.flights"
+    ]
+    # Also include uploaded tables with employee_id columns
+    for full_name in sorted(cache):
+        schema = cache[full_name]
+        if schema.get("db_name") in {"crew_management", "flight_operations",
+                                      "hr_payroll", "compliance_training", "app"}:
             continue
+        col_names = [c.get("name", "").lower() for c in schema.get("columns", [])]
+        if "employee_id" in col_names or "emp_id" in col_names or "id" in col_names:
+            tables.append(full_name)
+    return tables
 
-        # Match against column names
-        for col in schema.get("columns", []):
-            col_name = col.get("name", "").lower()
-            col_words = set(col_name.replace("_", " ").split())
-            if query_words & col_words:
-                matched.add(full_name)
-                break
-
-        # Match against LLM-generated description
-        if any(w in description for w in query_words if len(w) > 2):
-            matched.add(full_name)
-            continue
 
-        # Match against column descriptions
-        col_descriptions = schema.get("column_descriptions", {})
-        if col_descriptions:
-            all_desc_text = " ".join(str(v).lower() for v in col_descriptions.values())
-            if any(w in all_desc_text for w in query_words if len(w) > 2):
-                matched.add(full_name)
+def search_schemas(query: str, k: int = 10,
+                   db_names: Optional[Collection[str]] = None) -> List[Tuple[Dict, float]]:
+    """BM25-ranked (schema, score) pairs, restricted to db_names (None = all) before ranking."""
+    cache = _load_schema_cache()
+    if not cache:
+        return []
+    allow = None
+    if db_names is not None:
+        allow = lambda name: cache[name]["db_name"] in db_names
+    ranked = _get_keyword_index(cache).search(query, k=k, allow=allow)
+    return [(cache[name], score) for name, score in ranked if name in cache]
 
-    return matched
+
+def get_default_schemas(db_names: Optional[Collection[str]] = None) -> List[Dict]:
+    """Fallback tables for queries that match nothing, restricted to db_names (None = all)."""
+    cache = _load_schema_cache()
+    schemas = [cache[name] for name in _default_tables(cache) if name in cache]
+    if db_names is not None:
+        schemas = [s for s in schemas if s["db_name"] in db_names]
+    return schemas
 
 
 def get_schemas_by_keywords(query: str, max_tables: int = 6) -> List[Dict]:
     """Get relevant schemas using keyword matching - NO API CALLS.
 
-    Uses the hardcoded KEYWORD_TABLE_MAP for the 4 internal databases,
-    then dynamically matches uploaded database schemas by table/column
-    names and descriptions.
+    Tables are ranked by BM25 over their names, KEYWORD_TABLE_MAP keywords,
+    column names and (column) descriptions, so internal and uploaded
+    databases are matched the same way and the best matches come first.
     """
     cache = _load_schema_cache()
     if not cache:
         return []
 
-    query_lower = query.lower()
-    matched_tables = set()
-
-    # Stage 1: Hardcoded keyword matching (fast, for internal DBs)
-    for keyword, tables in KEYWORD_TABLE_MAP.items():
-        if keyword in query_lower:
-            matched_tables.update(tables)
-
-    # Stage 2: Dynamic matching for uploaded databases
-    uploaded_matches = _match_uploaded_schemas(query_lower, cache)
-    matched_tables.update(uploaded_matches)
+    ranked = _get_keyword_index(cache).search(query, k=max_tables)
+    table_names = [name for name, _ in ranked]
 
     # If no keyword matches at all, return most common internal tables
     # PLUS any uploaded tables that have employee-like columns
-    if not matched_tables:
-        matched_tables = {
-            "crew_management.crew_members",
-            "crew_management.crew_assignments",
-            "flight_operations.flights"
-        }
-        # Also include uploaded tables with employee_id columns
-        for full_name, schema in cache.items():
-            if schema.get("db_name") in {"crew_management", "flight_operations",
-                                          "hr_payroll", "compliance_training", "app"}:
-                continue
-            col_names = [c.get("name", "").lower() for c in schema.get("columns", [])]
-            if "employee_id" in col_names or "emp_id" in col_names or "id" in col_names:
-                matched_tables.add(full_name)
-
-    # Build result list
-    results = []
-    for table_name in matched_tables:
-        if table_name in cache:
-            results.append(cache[table_name])
-
-    # Limit results
-    return results[:max_tables]
+    if not table_names:
+        table_names = _default_tables(cache)
+
+    return [cache[name] for name in table_names if name in cache][:max_tables]
+
+
+def get_schema(db_name: str, table_name: str) -> Optional[Dict]:
+    """Cached schema for one table, or None if unknown."""
+    return _load_schema_cache().get(f"{db_name}.{table_name}")
+
+
+def get_schema_map() -> Dict[str, Dict]:
+    """The whole cache, "db.table" -> schema. Read-only; replaced (not mutated) on schema changes."""
+    return _load_schema_cache()
 
 
 def get_all_schemas() -> List[Dict]:
@@ -1,6 +1,5 @@
-"""V1 text-to-SQL pipeline - uses keyword + FAISS schema retrieval, then generates and executes SQL."""
+"""V1 text-to-SQL pipeline - uses hybrid keyword + FAISS schema retrieval, then generates and executes SQL."""
 import re
-import json
 import sqlite3
 import time
 import logging
@@ -8,9 +7,11 @@ from typing import Dict, List, Optional, Tuple, Any, Set
 from backend.config import settings
 from backend.llm.client import get_llm_client
 from backend.llm.prompts import SQL_GENERATION_PROMPT, SQL_GENERATION_WITH_CONTEXT_PROMPT, SQL_CORRECTION_PROMPT, SQL_RESULT_SUMMARY_PROMPT, SQL_RESULT_STATS_SUMMARY_PROMPT
-from backend.cache.vector_store import get_schema_store
-from backend.sql.schema_cache import get_schemas_by_keywords
+from backend.sql.schema_cache import get_schema
+from backend.sql.hybrid_retriever import get_hybrid_retriever
+from backend.sql.join_graph import get_join_planner
 from backend.db.session import get_multi_db_connection
+from backend.sql.result_packer import FORMAT_NOTE as RESULT_FORMAT_NOTE, PackedRows, pack_rows
 
 logger = logging.getLogger("chatbot.sql.pipeline_v1")
 
@@ -37,14 +38,14 @@ class SQLPipeline:
         self.max_retries = settings.SQL_MAX_RETRIES
 
     def retrieve_schemas(self, query: str, top_k: int = None) -> List[Dict]:
-        """Retrieve relevant schemas using keyword matching first, then vector search.
-
-        Uses a two-stage approach:
-        1. Fast keyword matching (no API calls) - reliable for known terms
-        2. FAISS vector search - catches semantic matches keywords might miss
-
-        Results are merged and deduplicated, with keyword matches prioritized.
-        Only returns schemas from visible databases.
+        """Retrieve relevant schemas with hybrid keyword + vector retrieval.
+
+        Keyword (BM25) and FAISS rankings are computed concurrently over the
+        visible databases only and fused with reciprocal rank fusion (see
+        backend.sql.hybrid_retriever). Each schema carries its fused
+        `relevance_score`. Tables needed to join the retrieved ones are then
+        added from the FK join graph (backend.sql.join_graph), with the join
+        conditions in `join_keys`.
         """
         top_k = top_k or settings.SCHEMA_TOP_K
 
@@ -52,74 +53,35 @@ class SQLPipeline:
         all_dbs = _get_visible_db_names()
         logger.info(f"[retrieve_schemas] query=\"{query[:80]}\" top_k={top_k} registry_dbs={all_dbs if all_dbs is not None else 'UNAVAILABLE'}")
 
-        # --- Stage 1: Keyword-based retrieval (fast, no API calls) ---
-        keyword_schemas = get_schemas_by_keywords(query, max_tables=top_k + 4)
-        logger.info(f"[retrieve_schemas] Keyword match returned {len(keyword_schemas)} schemas: "
-                     f"{[s.get('db_name') + '.' + s.get('table_name') for s in keyword_schemas[:5]]}")
-
-        # Filter by registered databases (None = registry unavailable, skip filter)
-        if all_dbs is not None:
-            before_count = len(keyword_schemas)
-            keyword_schemas = [s for s in keyword_schemas if s.get("db_name") in all_dbs]
-            if before_count != len(keyword_schemas):
-                logger.warning(f"[retrieve_schemas] Registry filter removed {before_count - len(keyword_schemas)} schemas "
-                               f"(registry has: {all_dbs})")
-
-        # Track which tables we already have (by db_name.table_name)
-        seen_tables = set()
-        schemas = []
-        for s in keyword_schemas:
-            table_key = f"{s['db_name']}.{s['table_name']}"
-            if table_key not in seen_tables:
-                seen_tables.add(table_key)
-                schemas.append(s)
-
-        # --- Stage 2: Vector search to fill remaining slots ---
-        remaining_slots = max(top_k - len(schemas), 2)  # Always try to add at least 2 more
-        try:
-            store = get_schema_store()
-            search_k = remaining_slots * 3  # Over-fetch to account for duplicates/filtering
-            results = store.search(query, top_k=search_k)
-
-            for meta, score in results:
-                db_name = meta.get("db_name", "")
-                table_name = meta.get("table_name", "")
-                table_key = f"{db_name}.{table_name}"
-
-                # Skip duplicates and invisible databases
-                if table_key in seen_tables:
-                    continue
-                if all_dbs is not None and db_name not in all_dbs:
-                    continue
-
-                seen_tables.add(table_key)
-                schemas.append({
-                    "db_name": db_name,
-                    "table_name": table_name,
-                    "description": meta.get("description", ""),
-                    "columns": meta.get("columns", []),
-                    "ddl": meta.get("ddl", ""),
-                    "relevance_score": score
-                })
-
-                if len(schemas) >= top_k + 4:  # Allow extra for cross-DB queries
-                    break
-        except Exception:
-            pass  # Keyword results are sufficient if vector search fails
-
-        # --- Cross-database detection: expand limit if query spans multiple DBs ---
-        db_names_found = set(s["db_name"] for s in schemas)
-        if len(db_names_found) > 1:
-            # Cross-database query detected - always include crew_members as join anchor
-            crew_members_key = "crew_management.crew_members"
-            if crew_members_key not in seen_tables:
-                anchor = get_schemas_by_keywords("crew member", max_tables=1)
-                if anchor:
-                    schemas.insert(0, anchor[0])
-            # Allow more schemas for cross-DB queries
-            return schemas[:top_k + 4]
-
-        return schemas[:top_k + 2]
+        # None = registry unavailable, search everything
+        candidates = get_hybrid_retriever().retrieve(query, top_k=top_k + 4, db_names=all_dbs)
+        schemas = candidates[:top_k + 2]
+
+        # --- Join expansion: add the tables that connect the retrieved ones ---
+        plan = get_join_planner().connect([f"{s['db_name']}.{s['table_name']}" for s in schemas], all_dbs)
+        for full_name in plan.bridges:
+            bridge = get_schema(*full_name.split(".", 1))
+            if bridge:
+                schemas.append(dict(bridge, relevance_score=0.0, retrieval_ranks={}, join_bridge=True))
+        if plan.joins:
+            # Join conditions along the connecting tree, shown with each table in the prompt
+            join_keys: Dict[str, List[str]] = {}
+            for edge in plan.joins:
+                join_keys.setdefault(edge.from_table, []).append(edge.render())
+            for i, schema in enumerate(schemas):
+                keys = join_keys.get(f"{schema['db_name']}.{schema['table_name']}")
+                if keys:
+                    schemas[i] = dict(schema, join_keys=keys)
+            logger.info(f"[retrieve_schemas] Join expansion: bridges={plan.bridges} "
+                        f"joins={[edge.render() for edge in plan.joins]}")
+
+        # --- Cross-database query: allow more schemas ---
+        if len(set(s["db_name"] for s in schemas)) > 1:
+            included = {(s["db_name"], s["table_name"]) for s in schemas}
+            schemas += [s for s in candidates[top_k + 2:] if (s["db_name"], s["table_name"]) not in included]
+            return schemas[:top_k + 4 + len(plan.bridges)]
+
+        return schemas
 
     def format_schemas_for_prompt(self, schemas: List[Dict]) -> str:
         """Format schemas for the SQL generation prompt."""
@@ -130,6 +92,7 @@ class SQLPipeline:
                 for c in schema['columns']
             ])
             full_table = f"{schema['db_name']}.{schema['table_name']}"
+            joins = "".join(f"\n    {join}" for join in schema.get("join_keys", []))
             formatted.append(f"""
 Database: {schema['db_name']}
 Table: {schema['table_name']}
@@ -137,7 +100,7 @@ Full reference: {full_table}
 Description: {schema['description']}
 Columns:
 {col_str}
-""")
+""" + (f"Joins:{joins}\n" if joins else ""))
         return "\n---\n".join(formatted)
 
     def generate_sql(self, query: str, schemas: List[Dict], context: str = "") -> str:
@@ -287,44 +250,32 @@ Columns:
         clean_summary = "\n".join(summary_lines).rstrip()
         return clean_summary, suggestions[:3]
 
-    # Threshold: if results exceed this, use stats-based summarization
-    LARGE_RESULT_THRESHOLD = 50
-
     def summarize_results(self, query: str, sql: str, results: Dict) -> tuple:
         """Generate a natural language summary with follow-up suggestions. Returns (summary, suggestions).
 
-        For small results (<50 rows): sends actual rows to LLM.
-        For large results (>=50 rows): computes stats from ALL rows server-side,
-        sends only stats to LLM for accurate summarization.
+        If all rows fit SUMMARY_ROWS_TOKEN_BUDGET once packed, sends the rows to the LLM.
+        Otherwise computes stats from ALL rows server-side and sends only stats.
         """
         row_count = results["row_count"]
         all_rows = results["rows"]
 
-        if row_count >= self.LARGE_RESULT_THRESHOLD:
-            return self._summarize_with_stats(query, sql, all_rows, row_count)
+        packed = pack_rows(all_rows, results.get("columns"))
+        if packed.complete:
+            return self._summarize_with_rows(query, sql, packed, row_count)
         else:
-            return self._summarize_with_rows(query, sql, all_rows, row_count)
-
-    def _summarize_with_rows(self, query: str, sql: str, rows: list, row_count: int) -> tuple:
-        """Summarize small result sets by sending actual rows to LLM."""
-        max_rows = 25
-        rows_for_summary = rows[:max_rows]
-        truncated_rows = []
-        for row in rows_for_summary:
-            truncated_row = {}
-            for k, v in row.items():
-                sv = str(v) if v is not None else ""
-                truncated_row[k] = sv[:200] if len(sv) > 200 else v
-            truncated_rows.append(truncated_row)
+            return self._summarize_with_stats(query, sql, all_rows, row_count)
 
+    def _summarize_with_rows(self, query: str, sql: str, packed: PackedRows, row_count: int) -> tuple:
+        """Summarize result sets that fit the token budget by sending the packed rows to the LLM."""
         prompt = SQL_RESULT_SUMMARY_PROMPT.format(
             query=query,
             sql=sql,
-            results=json.dumps(truncated_rows, default=str),
+            format_note=RESULT_FORMAT_NOTE,
+            results=packed.text,
             row_count=row_count
         )
 
-        logger.info(f"[summarize] Small result ({row_count} rows), sending {len(truncated_rows)} rows to LLM")
+        logger.info(f"[summarize] Result fits budget ({row_count} rows, ~{packed.tokens} tokens), sending rows to LLM")
         response = self.llm_client.chat_completion(
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
@@ -336,7 +287,7 @@ Columns:
         """Summarize large result sets using pre-computed statistics from ALL rows."""
         from collections import Counter
 
-        logger.info(f"[summarize] Large result ({row_count} rows), computing stats from ALL rows")
+        logger.info(f"[summarize] Result over budget ({row_count} rows), computing stats from ALL rows")
 
         columns = list(rows[0].keys()) if rows else []
         stats_lines = []
@@ -399,14 +350,8 @@ Columns:
                 distribution_lines.append(f"  {col}: all values = \"{list(distinct_vals)[0]}\"")
 
         # Small sample for format reference only
-        sample_rows = rows[:5]
-        truncated_sample = []
-        for row in sample_rows:
-            truncated_row = {}
-            for k, v in row.items():
-                sv = str(v) if v is not None else ""
-                truncated_row[k] = sv[:100] if len(sv) > 100 else v
-            truncated_sample.append(truncated_row)
+        sample = pack_rows(rows, token_budget=getattr(settings, 'SUMMARY_SAMPLE_TOKEN_BUDGET', 400),
+                           max_rows=5, max_value_chars=100)
 
         prompt = SQL_RESULT_STATS_SUMMARY_PROMPT.format(
             query=query,
@@ -414,7 +359,7 @@ Columns:
             row_count=row_count,
             column_stats="\n".join(stats_lines) if stats_lines else "No column stats available",
             value_distributions="\n".join(distribution_lines) if distribution_lines else "No categorical distributions",
-            sample_note=f"Sample rows (5 of {row_count}, for format reference only):\n{json.dumps(truncated_sample, default=str)}"
+            sample_note=f"Sample rows ({sample.rows_included} of {row_count}, {RESULT_FORMAT_NOTE}; for format reference only):\n{sample.text}"
         )
 
         logger.info(f"[summarize] Stats prompt length: {len(prompt)} chars")
@@ -450,18 +395,22 @@ Columns:
         )
         return self._parse_suggestions(response)
 
-    def run(self, query: str, context: str = "") -> Dict:
+    def run(self, query: str, context: str = "", schemas: Optional[List[Dict]] = None) -> Dict:
         """Run the full SQL pipeline.
 
         Args:
             query: The user's natural language question.
             context: Optional conversation context (recent turns) for follow-up handling.
+            schemas: Schemas already retrieved for query (e.g. speculatively, while the
+                intent was being classified); retrieved here if None.
         """
         start_time = time.time()
-        logger.info(f"[pipeline] START query=\"{query[:120]}\" context_len={len(context)}")
+        logger.info(f"[pipeline] START query=\"{query[:120]}\" context_len={len(context)} "
+                    f"prefetched_schemas={schemas is not None}")
 
         # Step 1: Retrieve relevant schemas
-        schemas = self.retrieve_schemas(query)
+        if schemas is None:
+            schemas = self.retrieve_schemas(query)
         if not schemas:
             logger.warning("[pipeline] No schemas found for query")
             return {
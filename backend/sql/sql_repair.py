@@ -0,0 +1,317 @@
+"""Deterministic SQL repair - fixes mechanical errors locally before asking the LLM.
+
+Most correction round trips are for typos and dialect slips: a misspelled
+column, a missing database prefix, Postgres/MSSQL functions (ILIKE, NOW(),
+TOP n, GETDATE()) or public./dbo. qualifiers. These are repaired here using
+the schema from SchemaLoader (fuzzy identifier matching) and a learned table
+of error signature -> fix built from past LLM corrections.
+"""
+import re
+import sqlite3
+import difflib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from backend.config import settings
+
+logger = logging.getLogger("chatbot.sql.repair")
+
+# Minimum similarity for a fuzzy identifier match
+FUZZY_CUTOFF = 0.75
+
+# (pattern, replacement) applied outside string literals
+_DIALECT_RULES: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r'\b(\w+)\.(?:public|dbo)\.(\w+)', re.IGNORECASE), r'\1.\2'),
+    (re.compile(r'\bNOT\s+ILIKE\b', re.IGNORECASE), 'NOT LIKE'),
+    (re.compile(r'\bILIKE\b', re.IGNORECASE), 'LIKE'),
+    (re.compile(r'\b(?:NOW|GETDATE|SYSDATETIME)\s*\(\s*\)', re.IGNORECASE), "datetime('now')"),
+    (re.compile(r'\bCURRENT_DATE\s*\(\s*\)', re.IGNORECASE), "date('now')"),
+    (re.compile(r'\bISNULL\s*\(', re.IGNORECASE), 'IFNULL('),
+    (re.compile(r'\bLEN\s*\(', re.IGNORECASE), 'LENGTH('),
+    (re.compile(r'::\s*(?:text|varchar|integer|int|numeric|date|timestamp|float|double precision)\b',
+                re.IGNORECASE), ''),
+]
+# Postgres / MSSQL default schemas the LLM sometimes puts in place of the database
+_SCHEMA_QUALIFIERS = ("public", "dbo")
+_TOP_N_RE = re.compile(r'^(\s*SELECT\s+(?:DISTINCT\s+)?)TOP\s*\(?\s*(\d+)\s*\)?\s+', re.IGNORECASE)
+_TRAILING_LIMIT_RE = re.compile(r'\bLIMIT\s+\d+', re.IGNORECASE)
+
+_NO_SUCH_COLUMN_RE = re.compile(r'no such column:\s*(?:(\w+)\.)?(\w+)', re.IGNORECASE)
+_NO_SUCH_TABLE_RE = re.compile(r'no such table:\s*(?:(\w+)\.)?(\w+)', re.IGNORECASE)
+_QUALIFIED_REF_RE = re.compile(r'\b(\w+)\.(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_IDENT_RE = re.compile(r"'(?:[^']|'')*'|\"[^\"]*\"|\w+|[^\w\s]")
+
+
+def _ensure_repair_rules_table():
+    """Create the sql_repair_rules table if it doesn't exist."""
+    conn = sqlite3.connect(settings.app_db_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sql_repair_rules (
+            error_kind  TEXT NOT NULL,
+            bad_token   TEXT NOT NULL,
+            good_token  TEXT NOT NULL,
+            hits        INTEGER NOT NULL DEFAULT 0,
+            updated_at  TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (error_kind, bad_token)
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+
+def _map_outside_literals(sql: str, fn) -> str:
+    """Apply fn to the parts of sql that are not inside single-quoted literals."""
+    parts = re.split(r"('(?:[^']|'')*')", sql)
+    return "".join(part if i % 2 else fn(part) for i, part in enumerate(parts))
+
+
+def _replace_identifier(sql: str, bad: str, good: str, qualifier: Optional[str] = None) -> str:
+    """Replace a whole-word identifier (optionally only when qualified) outside literals."""
+    if qualifier:
+        pattern = re.compile(rf'\b{re.escape(qualifier)}\.{re.escape(bad)}\b', re.IGNORECASE)
+        replacement = f"{qualifier}.{good}"
+    else:
+        pattern = re.compile(rf'(?<![\w.]){re.escape(bad)}\b', re.IGNORECASE)
+        replacement = good
+    return _map_outside_literals(sql, lambda part: pattern.sub(replacement, part))
+
+
+def _error_signature(error: str) -> Optional[Tuple[str, str]]:
+    """Reduce an error message to (kind, bad_token), or None if it isn't an identifier error."""
+    match = _NO_SUCH_COLUMN_RE.search(error)
+    if match:
+        return "column", match.group(2).lower()
+    match = _NO_SUCH_TABLE_RE.search(error)
+    if match:
+        return "table", match.group(2).lower()
+    return None
+
+
+class SQLRepairer:
+    """Rule-based repair of generated SQL using the schema and learned fixes."""
+
+    def __init__(self, schema_loader):
+        self.schema_loader = schema_loader
+        self._learned: Optional[Dict[Tuple[str, str], str]] = None
+
+    # ----- schema lookups -----
+
+    def _tables(self) -> Dict[str, List[str]]:
+        """Map "db.table" (lowercased) to its column names."""
+        tables = {}
+        for db in self.schema_loader.get_schema_data().get("databases", []):
+            for table in db.get("tables", []):
+                name = table.get("name", table.get("full_name", ""))
+                tables[f"{db['name']}.{name}".lower()] = [c["name"] for c in table.get("columns", [])]
+        return tables
+
+    def _referenced_tables(self, sql: str, tables: Dict[str, List[str]]) -> Dict[str, str]:
+        """Map alias / table name / "db.table" used in sql to the known "db.table" key."""
+        refs = {}
+        for db_name, table_name, alias in _QUALIFIED_REF_RE.findall(sql):
+            key = f"{db_name}.{table_name}".lower()
+            if key not in tables:
+                continue
+            refs[key] = key
+            refs.setdefault(table_name.lower(), key)
+            if alias:
+                refs.setdefault(alias.lower(), key)
+        return refs
+
+    # ----- learned fixes -----
+
+    def _get_learned(self) -> Dict[Tuple[str, str], str]:
+        if self._learned is None:
+            self._learned = {}
+            try:
+                _ensure_repair_rules_table()
+                conn = sqlite3.connect(settings.app_db_path)
+                rows = conn.execute("SELECT error_kind, bad_token, good_token FROM sql_repair_rules").fetchall()
+                conn.close()
+                self._learned = {(kind, bad): good for kind, bad, good in rows}
+            except sqlite3.Error as e:
+                logger.warning(f"[sql_repair] Could not load learned rules: {e}")
+        return self._learned
+
+    def _learned_fix_applies(self, kind: str, qualifier: Optional[str], good: str, sql: str,
+                             tables: Dict[str, List[str]]) -> bool:
+        """Whether a learned replacement exists where this query would use it.
+
+        Rules are keyed only by the bad token, so a fix learned on one table must
+        not be applied to another that lacks the replacement.
+        """
+        good_lower = good.lower()
+        if kind == "table":
+            scope = [key for key in tables if not qualifier or key.startswith(f"{qualifier.lower()}.")]
+            return any(key.split(".", 1)[1] == good_lower for key in scope)
+
+        refs = self._referenced_tables(sql, tables)
+        if qualifier and qualifier.lower() in refs:
+            keys = {refs[qualifier.lower()]}
+        else:
+            keys = set(refs.values())
+        return any(good_lower == col.lower() for key in keys for col in tables[key])
+
+    def _record_hit(self, kind: str, bad: str):
+        try:
+            conn = sqlite3.connect(settings.app_db_path)
+            conn.execute("UPDATE sql_repair_rules SET hits = hits + 1 WHERE error_kind = ? AND bad_token = ?",
+                         (kind, bad))
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"[sql_repair] Could not record rule hit: {e}")
+
+    def learn(self, error: str, failed_sql: str, corrected_sql: str):
+        """Remember an LLM correction that swapped exactly the identifier named in the error."""
+        signature = _error_signature(error)
+        if not signature:
+            return
+        kind, bad = signature
+
+        failed_tokens = _IDENT_RE.findall(failed_sql)
+        corrected_tokens = _IDENT_RE.findall(corrected_sql)
+        ops = [op for op in difflib.SequenceMatcher(None, failed_tokens, corrected_tokens, autojunk=False).get_opcodes()
+               if op[0] != "equal"]
+        if len(ops) != 1:
+            return
+        tag, i1, i2, j1, j2 = ops[0]
+        if tag != "replace" or i2 - i1 != 1 or j2 - j1 != 1:
+            return
+        if failed_tokens[i1].lower() != bad or not corrected_tokens[j1].isidentifier():
+            return
+        good = corrected_tokens[j1]
+
+        try:
+            _ensure_repair_rules_table()
+            conn = sqlite3.connect(settings.app_db_path)
+            conn.execute("""
+                INSERT INTO sql_repair_rules (error_kind, bad_token, good_token)
+                VALUES (?, ?, ?)
+                ON CONFLICT(error_kind, bad_token)
+                DO UPDATE SET good_token = excluded.good_token, updated_at = CURRENT_TIMESTAMP
+            """, (kind, bad, good))
+            conn.commit()
+            conn.close()
+            self._get_learned()[(kind, bad)] = good
+            logger.info(f"[sql_repair] Learned {kind} fix: {bad} -> {good}")
+        except sqlite3.Error as e:
+            logger.warning(f"[sql_repair] Could not save learned rule: {e}")
+
+    # ----- repairs -----
+
+    def fix_dialect(self, sql: str) -> str:
+        """Rewrite Postgres/MSSQL-isms into SQLite syntax."""
+        def apply_rules(part: str) -> str:
+            for pattern, replacement in _DIALECT_RULES:
+                part = pattern.sub(replacement, part)
+            return part
+
+        fixed = _map_outside_literals(sql, apply_rules)
+
+        top = _TOP_N_RE.match(fixed)
+        if top and not _TRAILING_LIMIT_RE.search(fixed):
+            body = fixed[top.end():].strip().rstrip(";").rstrip()
+            fixed = f"{top.group(1)}{body} LIMIT {top.group(2)};"
+        return fixed
+
+    def _fix_column(self, sql: str, qualifier: Optional[str], bad: str,
+                    tables: Dict[str, List[str]]) -> Optional[str]:
+        refs = self._referenced_tables(sql, tables)
+        if qualifier and qualifier.lower() in refs:
+            candidates = tables[refs[qualifier.lower()]]
+        else:
+            candidates = [col for key in set(refs.values()) for col in tables[key]]
+        if not candidates:
+            return None
+
+        by_lower = {c.lower(): c for c in candidates}
+        match = difflib.get_close_matches(bad.lower(), list(by_lower), n=1, cutoff=FUZZY_CUTOFF)
+        if not match or match[0] == bad.lower():
+            return None
+        return _replace_identifier(sql, bad, by_lower[match[0]], qualifier)
+
+    def _fix_table(self, sql: str, db_name: Optional[str], bad: str,
+                   tables: Dict[str, List[str]]) -> Optional[str]:
+        bad_lower = bad.lower()
+
+        if (db_name and db_name.lower() in _SCHEMA_QUALIFIERS
+                and not any(key.startswith(f"{db_name.lower()}.") for key in tables)):
+            # public.table / dbo.table - a schema, not an attached database: resolve as unqualified
+            pattern = re.compile(rf'\b{re.escape(db_name)}\.({re.escape(bad)})\b', re.IGNORECASE)
+            stripped = _map_outside_literals(sql, lambda part: pattern.sub(r'\1', part))
+            return self._fix_table(stripped, None, bad, tables)
+
+        if not db_name:
+            # Missing database prefix - only fix when the table name is unambiguous
+            owners = [key for key in tables if key.split(".", 1)[1] == bad_lower]
+            if len(owners) == 1:
+                pattern = re.compile(rf'(\b(?:FROM|JOIN)\s+){re.escape(bad)}\b', re.IGNORECASE)
+                fixed = _map_outside_literals(sql, lambda part: pattern.sub(rf'\g<1>{owners[0]}', part))
+                return fixed if fixed != sql else None
+
+        scope = [key for key in tables if not db_name or key.startswith(f"{db_name.lower()}.")]
+        names = {key.split(".", 1)[1]: key for key in scope}
+        match = difflib.get_close_matches(bad_lower, list(names), n=1, cutoff=FUZZY_CUTOFF)
+        if not match:
+            return None
+        target = names[match[0]]
+        if db_name:
+            fixed = _replace_identifier(sql, bad, target.split(".", 1)[1], db_name)
+        else:
+            pattern = re.compile(rf'(\b(?:FROM|JOIN)\s+){re.escape(bad)}\b', re.IGNORECASE)
+            fixed = _map_outside_literals(sql, lambda part: pattern.sub(rf'\g<1>{target}', part))
+        return fixed if fixed != sql else None
+
+    def repair(self, sql: str, error: str) -> Optional[str]:
+        """Try to fix sql for the given error without an LLM call.
+
+        Returns the repaired SQL, or None if no local fix applies.
+        """
+        fixed = self.fix_dialect(sql)
+        if fixed != sql:
+            logger.info("[sql_repair] Applied dialect fixes")
+            return fixed
+
+        signature = _error_signature(error)
+        if not signature:
+            return None
+        kind, bad = signature
+
+        tables = self._tables()
+        learned = self._get_learned().get(signature)
+        if learned:
+            qualifier = None
+            match = (_NO_SUCH_COLUMN_RE if kind == "column" else _NO_SUCH_TABLE_RE).search(error)
+            if match:
+                qualifier = match.group(1)
+            fixed = _replace_identifier(sql, bad, learned, qualifier)
+            if fixed != sql and self._learned_fix_applies(kind, qualifier, learned, sql, tables):
+                self._record_hit(kind, bad)
+                logger.info(f"[sql_repair] Applied learned {kind} fix: {bad} -> {learned}")
+                return fixed
+
+        if kind == "column":
+            match = _NO_SUCH_COLUMN_RE.search(error)
+            fixed = self._fix_column(sql, match.group(1), match.group(2), tables)
+        else:
+            match = _NO_SUCH_TABLE_RE.search(error)
+            fixed = self._fix_table(sql, match.group(1), match.group(2), tables)
+
+        if fixed and fixed != sql:
+            logger.info(f"[sql_repair] Fuzzy-matched {kind} '{bad}' against schema")
+            return fixed
+        return None
+
+
+# Singleton
+_repairer: Optional[SQLRepairer] = None
+
+
+def get_sql_repairer() -> SQLRepairer:
+    """Get or create SQL repairer singleton."""
+    global _repairer
+    if _repairer is None:
+        from backend.schema.loader import get_schema_loader
+        _repairer = SQLRepairer(get_schema_loader())
+    return _repairer
@@ -0,0 +1,65 @@
+"""EXPLAIN-based SQL validation - prepares the statement instead of regex-scanning it.
+
+SQLite compiles the statement under an authorizer that only permits read
+operations, so string literals like 'Delete' no longer trip a keyword check,
+while real problems (writes, multiple statements, unknown tables/columns)
+are reported before the query is ever run.
+"""
+import sqlite3
+import logging
+from dataclasses import dataclass
+
+logger = logging.getLogger("chatbot.sql.validator")
+
+
+# Authorizer action codes a read-only SELECT is allowed to use
+_READ_ONLY_ACTIONS = {
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    getattr(sqlite3, "SQLITE_RECURSIVE", 33),  # WITH RECURSIVE (constant missing on old Pythons)
+}
+
+
+@dataclass
+class ValidationResult:
+    """Outcome of validating one SQL statement."""
+    is_valid: bool
+    message: str = "Valid"
+    is_safety_violation: bool = False  # Non-read-only or multi-statement SQL - never retried
+
+
+def _read_only_authorizer(action, arg1, arg2, db_name, trigger):
+    if action in _READ_ONLY_ACTIONS:
+        return sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
+
+
+def validate_select(conn: sqlite3.Connection, sql: str) -> ValidationResult:
+    """Validate that sql is a single read-only statement that compiles against conn.
+
+    Runs EXPLAIN (which prepares but does not execute the query) under a
+    read-only authorizer. The authorizer is removed again before returning.
+    """
+    statement = sql.strip()
+    if not statement:
+        return ValidationResult(False, "Empty SQL statement", is_safety_violation=True)
+
+    conn.set_authorizer(_read_only_authorizer)
+    try:
+        conn.execute(f"EXPLAIN {statement}").fetchall()
+    except sqlite3.ProgrammingError as e:
+        # Raised by the driver for "You can only execute one statement at a time."
+        return ValidationResult(False, f"Only a single SELECT statement is allowed ({e})",
+                                is_safety_violation=True)
+    except sqlite3.DatabaseError as e:
+        message = str(e)
+        if "not authorized" in message or "prohibited" in message:
+            return ValidationResult(False, "Only read-only SELECT statements are allowed",
+                                    is_safety_violation=True)
+        return ValidationResult(False, message)
+    finally:
+        conn.set_authorizer(None)
+
+    return ValidationResult(True)
+
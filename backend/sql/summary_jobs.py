@@ -0,0 +1,143 @@
+"""Background summary jobs - lets the API return SQL results before the summary is ready.
+
+The pipeline submits the summarisation step here and hands back a job id with
+the rows; clients poll (optionally long-poll) for the summary and suggestions.
+Finished jobs are kept for SUMMARY_JOB_TTL_SECONDS and then dropped.
+"""
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from backend.config import settings
+
+logger = logging.getLogger("chatbot.sql.summary_jobs")
+
+
+@dataclass
+class SummaryJob:
+    """State of one background summarisation."""
+    job_id: str
+    status: str = "pending"  # pending | running | done | failed
+    summary: Optional[str] = None
+    suggestions: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    _done: threading.Event = field(default_factory=threading.Event, repr=False)
+    _callbacks: List[Callable[["SummaryJob"], None]] = field(default_factory=list, repr=False)
+    _callbacks_fired: bool = field(default=False, repr=False)
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "summary": self.summary,
+            "suggestions": self.suggestions,
+            "error": self.error,
+        }
+
+
+class SummaryJobManager:
+    """Runs summary callables on a worker pool and tracks their results by job id."""
+
+    def __init__(self, max_workers: int = 4, ttl_seconds: int = 600):
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summary-job")
+        self._jobs: Dict[str, SummaryJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., tuple], *args, **kwargs) -> str:
+        """Run fn(*args, **kwargs) -> (summary, suggestions) in the background. Returns the job id."""
+        self._cleanup()
+        job = SummaryJob(job_id=uuid.uuid4().hex)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        logger.info(f"[summary_jobs] Submitted job {job.job_id}")
+        return job.job_id
+
+    def _run(self, job: SummaryJob, fn: Callable[..., tuple], args: tuple, kwargs: dict):
+        job.status = "running"
+        start = time.time()
+        status = "done"
+        try:
+            job.summary, job.suggestions = fn(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"[summary_jobs] Job {job.job_id} failed: {type(e).__name__}: {e}", exc_info=True)
+            job.error = str(e)
+            status = "failed"
+
+        with self._lock:
+            callbacks = list(job._callbacks)
+            job._callbacks_fired = True
+        for callback in callbacks:
+            self._fire(job, callback)
+
+        # Only publish the status once callbacks have post-processed the summary
+        job.finished_at = time.time()
+        job.status = status
+        job._done.set()
+        logger.info(f"[summary_jobs] Job {job.job_id} {job.status} in {int((job.finished_at - start) * 1000)}ms")
+
+    @staticmethod
+    def _fire(job: SummaryJob, callback: Callable[[SummaryJob], None]):
+        try:
+            callback(job)
+        except Exception as e:
+            logger.warning(f"[summary_jobs] Callback for job {job.job_id} failed: {e}")
+
+    def add_done_callback(self, job_id: str, callback: Callable[[SummaryJob], None]):
+        """Run callback(job) when the job finishes (immediately if it already has).
+
+        Callbacks run before waiters are released, so they can post-process the
+        summary (e.g. unmask PII) before any client sees it.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        with self._lock:
+            if not job._callbacks_fired:
+                job._callbacks.append(callback)
+                return
+        self._fire(job, callback)
+
+    def get(self, job_id: str, wait: float = 0) -> Optional[SummaryJob]:
+        """Look up a job, optionally waiting up to `wait` seconds for it to finish."""
+        self._cleanup()
+        job = self._jobs.get(job_id)
+        if job is not None and wait > 0:
+            job._done.wait(timeout=wait)
+        return job
+
+    def _cleanup(self):
+        """Drop finished jobs older than the TTL."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if expired:
+            logger.debug(f"[summary_jobs] Dropped {len(expired)} expired job(s)")
+
+
+# Singleton
+_job_manager: Optional[SummaryJobManager] = None
+_job_manager_lock = threading.Lock()
+
+
+def get_summary_job_manager() -> SummaryJobManager:
+    """Get or create the summary job manager singleton."""
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                _job_manager = SummaryJobManager(
+                    max_workers=getattr(settings, "SUMMARY_JOB_WORKERS", 4),
+                    ttl_seconds=getattr(settings, "SUMMARY_JOB_TTL_SECONDS", 600),
+                )
+    return _job_manager
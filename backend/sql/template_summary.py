@@ -0,0 +1,197 @@
+"""Deterministic summaries for scalar and tiny query results.
+
+A COUNT/SUM/AVG or a one-row lookup doesn't need an LLM round trip to be put
+into words: the question, the column alias and the value are enough. Follow-up
+suggestions come from the tables the query touched and their foreign-key
+neighbours in the schema. Anything larger (or anything with masked values)
+returns None and goes to the LLM summariser as before.
+"""
+import re
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.config import settings
+
+logger = logging.getLogger("chatbot.sql.template_summary")
+
+
+_TABLE_REF_RE = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)\.(\w+)', re.IGNORECASE)
+_AGG_LABEL_RE = re.compile(r'^\s*(COUNT|SUM|AVG|MIN|MAX|TOTAL)\s*\(\s*(?:DISTINCT\s+)?([\w.*]*)\s*\)\s*$', re.IGNORECASE)
+_HOW_MANY_RE = re.compile(r'\bhow\s+many\s+([a-z][\w\s-]*)', re.IGNORECASE)
+# Words that end the noun phrase after "how many"
+_NOUN_STOPWORDS = {
+    "are", "is", "were", "was", "do", "does", "did", "have", "has", "had", "can", "will", "there",
+    "in", "on", "at", "for", "from", "with", "by", "of", "to", "that", "which", "who", "where", "when",
+    "per", "each", "during", "since", "before", "after", "between", "currently", "still",
+}
+_AGG_WORDS = {"count": "number of", "sum": "total", "total": "total", "avg": "average", "min": "minimum", "max": "maximum"}
+_MASKED = "[MASKED]"
+
+
+def _humanize(name: str) -> str:
+    """flight_count -> flight count, COUNT(*) -> count, AVG(e.salary) -> average salary."""
+    match = _AGG_LABEL_RE.match(name)
+    if match:
+        func, arg = match.group(1).lower(), match.group(2).split(".")[-1]
+        word = _AGG_WORDS.get(func, func)
+        if not arg or arg == "*":
+            return "count" if func == "count" else word
+        return f"{word} {_humanize(arg)}"
+    name = re.sub(r'([a-z])([A-Z])', r'\1 \2', name)
+    return re.sub(r'[_\s]+', ' ', name).strip().lower()
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return "no value"
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, int):
+        return f"{value:,}"
+    if isinstance(value, float):
+        return f"{value:,.0f}" if value.is_integer() else f"{value:,.2f}"
+    return str(value)
+
+
+def _join_values(values: List[str]) -> str:
+    if len(values) <= 2:
+        return " and ".join(values)
+    return ", ".join(values[:-1]) + f" and {values[-1]}"
+
+
+class TemplateSummarizer:
+    """Builds summaries for scalar / single-row / short single-column results without the LLM."""
+
+    def __init__(self, schema_loader, max_rows: Optional[int] = None, max_columns: Optional[int] = None):
+        self.schema_loader = schema_loader
+        self.max_rows = max_rows if max_rows is not None else getattr(settings, "TEMPLATE_SUMMARY_MAX_ROWS", 5)
+        self.max_columns = max_columns if max_columns is not None else getattr(settings, "TEMPLATE_SUMMARY_MAX_COLUMNS", 4)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rows > 0
+
+    def summarize(self, question: str, sql: str, results: Dict) -> Optional[Tuple[str, List[str]]]:
+        """Return (summary, suggestions) for a trivial result set, or None if the LLM should handle it.
+
+        `results` should be the LLM-masked results - masked values are never templated.
+        """
+        if not self.enabled:
+            return None
+        rows = results.get("rows") or []
+        columns = results.get("columns") or (list(rows[0].keys()) if rows else [])
+        if not rows or not columns or results.get("row_count", len(rows)) != len(rows):
+            return None
+        if any(row.get(col) == _MASKED for row in rows for col in columns):
+            return None
+
+        if len(rows) == 1 and len(columns) == 1:
+            summary = self._scalar(question, columns[0], rows[0][columns[0]])
+        elif len(rows) == 1 and len(columns) <= self.max_columns:
+            summary = self._single_row(rows[0], columns)
+        elif len(columns) == 1 and len(rows) <= self.max_rows:
+            summary = self._single_column(rows, columns[0])
+        else:
+            return None
+
+        suggestions = self._suggest(sql, is_scalar=len(rows) == 1 and len(columns) == 1)
+        logger.info(f"[template_summary] Templated {len(rows)}x{len(columns)} result | suggestions={len(suggestions)}")
+        return summary, suggestions
+
+    def _scalar(self, question: str, column: str, value: Any) -> str:
+        label = _humanize(column)
+        formatted = _format_value(value)
+        how_many = _HOW_MANY_RE.search(question)
+        is_count = "count" in label.split() or label.startswith("number of")
+        if how_many and is_count and isinstance(value, (int, float)) and not isinstance(value, bool):
+            noun = self._noun_phrase(how_many.group(1))
+            if noun:
+                return f"I found **{formatted}** {noun} matching your question."
+        if value is None:
+            return f"The query ran, but the {label} has no value for the data you asked about."
+        return f"The {label} is **{formatted}**."
+
+    @staticmethod
+    def _noun_phrase(text: str) -> str:
+        words = []
+        for word in text.split():
+            if word.lower() in _NOUN_STOPWORDS:
+                break
+            words.append(word.lower())
+        return " ".join(words[:4])
+
+    @staticmethod
+    def _single_row(row: Dict, columns: List[str]) -> str:
+        lines = ["Here is what I found:"]
+        for col in columns:
+            lines.append(f"- **{_humanize(col).capitalize()}**: {_format_value(row.get(col))}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _single_column(rows: List[Dict], column: str) -> str:
+        values = [_format_value(row.get(column)) for row in rows]
+        label = _humanize(column)
+        return f"I found {len(values)} results for {label}: {_join_values(values)}."
+
+    def _suggest(self, sql: str, is_scalar: bool) -> List[str]:
+        """Follow-ups from the queried tables: a breakdown column and FK-related tables."""
+        referenced = {(db.lower(), table.lower()) for db, table in _TABLE_REF_RE.findall(sql)}
+        if not referenced:
+            return []
+
+        suggestions = []
+        schema = self.schema_loader.get_schema_data()
+        for db in schema.get("databases", []):
+            db_name = db["name"].lower()
+            tables = {t.get("name", t.get("full_name", "")).lower(): t for t in db.get("tables", [])}
+            for table_name, table in tables.items():
+                if (db_name, table_name) not in referenced:
+                    continue
+                label = _humanize(table_name)
+
+                if is_scalar:
+                    breakdown = self._breakdown_column(table, sql)
+                    if breakdown:
+                        suggestions.append(f"Break this down by {_humanize(breakdown)}")
+
+                related = [fk["to_table"] for fk in table.get("foreign_keys", [])]
+                related += [name for name, other in tables.items()
+                            if any(fk.get("to_table", "").lower() == table_name for fk in other.get("foreign_keys", []))]
+                for other in related:
+                    other = other.split(".")[-1].lower()
+                    if other == table_name or (db_name, other) in referenced:
+                        continue
+                    suggestions.append(f"Show the {_humanize(other)} related to these {label}")
+
+        deduped = list(dict.fromkeys(suggestions))
+        return deduped[:3]
+
+    @staticmethod
+    def _breakdown_column(table: Dict, sql: str) -> Optional[str]:
+        """Pick a categorical-looking column (text, not a key) not already used in the query."""
+        for col in table.get("columns", []):
+            name = col.get("name", "")
+            data_type = (col.get("data_type") or "").upper()
+            if col.get("is_primary_key") or col.get("is_foreign_key") or name.lower().endswith("_id"):
+                continue
+            if not any(t in data_type for t in ("TEXT", "CHAR", "VARCHAR")):
+                continue
+            if any(s in name.lower() for s in ("name", "email", "phone", "address", "description", "notes")):
+                continue
+            if re.search(rf'\b{re.escape(name)}\b', sql, re.IGNORECASE):
+                continue
+            return name
+        return None
+
+
+# Singleton
+_template_summarizer: Optional[TemplateSummarizer] = None
+
+
+def get_template_summarizer() -> TemplateSummarizer:
+    """Get or create template summarizer singleton."""
+    global _template_summarizer
+    if _template_summarizer is None:
+        from backend.schema.loader import get_schema_loader
+        _template_summarizer = TemplateSummarizer(get_schema_loader())
+    return _template_summarizer
@@ -428,17 +428,25 @@ class UploadService:
 
     def _run_schema_setup(self, databases: List[Dict]) -> None:
         """Run full schema setup: populate metadata, rebuild FAISS index, reload V2 schema."""
+        # Pooled multi-db connections may still hold a replaced database file open
+        from backend.db.session import get_multi_db_pool
+        get_multi_db_pool().clear()
+
         # Step 1: Populate schema metadata for new databases
         self._populate_schema_for_databases(databases)
 
         # Step 2: Detect FK relationships from matching column names
         self._detect_foreign_keys(databases)
 
-        # Step 3: Rebuild FAISS index (for V1 old chat)
-        self._rebuild_faiss_index()
+        # Step 3: Sync the uploaded databases into the FAISS index (for V1 old chat)
+        self._rebuild_faiss_index([db["db_name"] for db in databases])
 
-        # Step 4: Reload V2 schema (for V2 new chat)
-        self._reload_v2_schema()
+        # Step 4: Reload the new databases in the V1 keyword cache and V2 schema
+        db_names = [db["db_name"] for db in databases]
+        from backend.sql.schema_cache import reload_database
+        for db_name in db_names:
+            reload_database(db_name)
+        self._reload_v2_schema(db_names)
 
     def _detect_foreign_keys(self, databases: List[Dict]) -> None:
         """Detect likely FK relationships by scanning matching column names across tables.
@@ -746,36 +754,39 @@ class UploadService:
         conn.commit()
         conn.close()
 
-    def _rebuild_faiss_index(self) -> None:
-        """Rebuild FAISS index from schema_metadata."""
+    def _rebuild_faiss_index(self, db_names: Optional[List[str]] = None) -> None:
+        """Bring the FAISS schema index in line with schema_metadata.
+
+        Only tables that are new or whose text changed are embedded, and tables
+        that are gone are deleted by id.
+
+        Args:
+            db_names: Only sync these databases (e.g. just uploaded or removed).
+                      None syncs every database.
+        """
         try:
             from backend.cache.vector_store import get_schema_store
-            from backend.llm.embeddings import embed_documents
 
             store = get_schema_store()
 
-            # Clear existing index
-            store.clear()
-
-            # Load all schema metadata
             conn = sqlite3.connect(settings.app_db_path)
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
-            # Load all databases from schema_metadata
-            cursor.execute("""
+            query = """
                 SELECT db_name, table_name, column_details, row_count,
                        sample_values, ddl_statement, llm_description
                 FROM schema_metadata
-            """)
+            """
+            if db_names is None:
+                cursor.execute(query)
+            else:
+                placeholders = ",".join("?" * len(db_names))
+                cursor.execute(query + f" WHERE db_name IN ({placeholders})", tuple(db_names))
 
             rows = cursor.fetchall()
             conn.close()
 
-            if not rows:
-                print("No schema metadata to index")
-                return
-
             # Prepare texts and metadata for indexing
             texts = []
             metadata_list = []
@@ -805,18 +816,27 @@ class UploadService:
                     "row_count": row['row_count']
                 })
 
-            # Add to FAISS index
-            store.add(texts, metadata_list)
-            print(f"FAISS index rebuilt with {len(texts)} tables")
+            # Embed new/changed tables, delete the ones that are gone
+            store.sync(texts, metadata_list, partitions=db_names)
+            print(f"FAISS index synced with {len(texts)} tables")
 
         except Exception as e:
             print(f"Warning: Failed to rebuild FAISS index: {e}")
 
-    def _reload_v2_schema(self) -> None:
-        """Reload V2 schema loader and pipeline to include uploaded databases."""
+    def _reload_v2_schema(self, db_names: Optional[List[str]] = None) -> None:
+        """Reload V2 schema loader and pipeline to include uploaded databases.
+
+        Args:
+            db_names: Only reload these databases; everything else is left as is.
+                      None reloads the whole schema.
+        """
         try:
-            from backend.schema.loader import reload_schema
-            reload_schema()
+            from backend.schema.loader import reload_schema, reload_database_schema
+            if db_names is None:
+                reload_schema()
+            else:
+                for db_name in db_names:
+                    reload_database_schema(db_name)
 
             # Refresh V2 pipeline's cached system prompt (without reloading again)
             from backend.sql.pipeline_v2 import _pipeline
@@ -876,18 +896,22 @@ class UploadService:
         return True, ""
 
 
-def refresh_all_schema() -> None:
+def refresh_all_schema(db_name: Optional[str] = None) -> None:
     """Refresh schema metadata, FAISS index, V2 schema, and V1 keyword cache.
 
-    Call this when databases are added or updated.
+    Call this when databases are added or updated. With db_name only that
+    database is reloaded in the V1 keyword cache and V2 schema.
     """
-    # Clear V1 keyword cache so it reloads
-    from backend.sql.schema_cache import reload_cache
-    reload_cache()
+    from backend.sql.schema_cache import reload_cache, reload_database
+    if db_name is None:
+        # Clear V1 keyword cache so it reloads
+        reload_cache()
+    else:
+        reload_database(db_name)
 
     service = UploadService()
-    service._rebuild_faiss_index()
-    service._reload_v2_schema()
+    service._rebuild_faiss_index(None if db_name is None else [db_name])
+    service._reload_v2_schema(None if db_name is None else [db_name])
 
 
 def remove_schema_for_database(db_name: str) -> None:
@@ -898,5 +922,5 @@ def remove_schema_for_database(db_name: str) -> None:
     conn.commit()
     conn.close()
 
-    # Rebuild FAISS index and reload V2 schema
-    refresh_all_schema()
+    # Drop the database's vectors and its V2 schema
+    refresh_all_schema(db_name)
@@ -1,6 +1,7 @@
 """API client for communicating with the backend."""
+import json
 import httpx
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, List, Tuple
 from frontend.config import API_BASE
 
 
@@ -111,15 +112,88 @@ class APIClient:
     # V2 API (PostgreSQL with Full Schema)
     # ==========================================
 
-    def send_message_v2(self, message: str, conversation_id: str = None, context: str = None) -> Dict[str, Any]:
-        """Send a chat message using V2 API (PostgreSQL)."""
+    def send_message_v2(self, message: str, conversation_id: str = None, context: str = None,
+                        async_summary: bool = False) -> Dict[str, Any]:
+        """Send a chat message using V2 API (PostgreSQL).
+
+        With async_summary the rows come back immediately and the response carries a
+        summary_job_id to pass to get_summary_v2.
+        """
         payload = {"message": message}
         if conversation_id:
             payload["conversation_id"] = conversation_id
         if context:
             payload["context"] = context
+        if async_summary:
+            payload["async_summary"] = True
         return self._make_request("POST", "/v2/chat/message", json=payload)
 
+    def stream_message_v2(self, message: str, conversation_id: str = None,
+                          context: str = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Send a chat message to the V2 streaming endpoint, yielding (event, data) pairs.
+
+        Events arrive as the backend produces them ("sql", "rows", "summary_token")
+        and always end with "done", which carries the same payload as send_message_v2.
+        HTTP/connection errors are reported as a "done" event with error=True.
+        """
+        payload = {"message": message}
+        if conversation_id:
+            payload["conversation_id"] = conversation_id
+        if context:
+            payload["context"] = context
+        params = {"token": self.token} if self.token else {}
+
+        try:
+            with httpx.Client(timeout=self.timeout) as client:
+                with client.stream("POST", f"{API_BASE}/v2/chat/message/stream", headers=self._get_headers(),
+                                   json=payload, params=params) as response:
+                    response.raise_for_status()
+                    event, data_lines = "message", []
+                    for line in response.iter_lines():
+                        if line.startswith("event:"):
+                            event = line[len("event:"):].strip()
+                        elif line.startswith("data:"):
+                            data_lines.append(line[len("data:"):].strip())
+                        elif not line and data_lines:
+                            yield event, json.loads("\n".join(data_lines))
+                            event, data_lines = "message", []
+        except httpx.HTTPStatusError as e:
+            yield "done", {"error": True, "detail": str(e), "status_code": e.response.status_code}
+        except httpx.RequestError as e:
+            yield "done", {"error": True, "detail": f"Connection error: {str(e)}"}
+
+    def send_batch_v2(self, questions: List[str], context: str = None,
+                      max_concurrency: int = None) -> Iterator[Dict[str, Any]]:
+        """Run a batch of questions, yielding NDJSON lines as results arrive.
+
+        Result lines are {"index", "result"}; the final line has "done": True.
+        HTTP/connection errors are reported as a final line with error=True.
+        """
+        payload = {"questions": questions}
+        if context:
+            payload["context"] = context
+        if max_concurrency:
+            payload["max_concurrency"] = max_concurrency
+        params = {"token": self.token} if self.token else {}
+
+        try:
+            # No read timeout - a line only arrives when a question finishes
+            with httpx.Client(timeout=httpx.Timeout(self.timeout, read=None)) as client:
+                with client.stream("POST", f"{API_BASE}/v2/chat/batch", headers=self._get_headers(),
+                                   json=payload, params=params) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        if line.strip():
+                            yield json.loads(line)
+        except httpx.HTTPStatusError as e:
+            yield {"done": True, "error": True, "detail": str(e), "status_code": e.response.status_code}
+        except httpx.RequestError as e:
+            yield {"done": True, "error": True, "detail": f"Connection error: {str(e)}"}
+
+    def get_summary_v2(self, job_id: str, wait: float = 0) -> Dict[str, Any]:
+        """Fetch the summary of an async_summary response, long-polling up to `wait` seconds."""
+        return self._make_request("GET", f"/v2/chat/summary/{job_id}", params={"wait": wait})
+
     def get_schema_info(self) -> Dict[str, Any]:
         """Get schema information (V2)."""
         return self._make_request("GET", "/v2/chat/schema/info")
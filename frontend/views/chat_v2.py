@@ -348,20 +348,8 @@ def render_chat_v2():
         # Build context from recent messages
         context = build_context(st.session_state.messages_v2[-6:-1])
 
-        # Send to backend with loading animation
-        loading_placeholder = st.empty()
-        stop_event, min_shown_event = show_loading_with_facts(loading_placeholder)
-        try:
-            result = client.send_message_v2(
-                prompt,
-                st.session_state.conversation_id_v2,
-                context
-            )
-        finally:
-            stop_event.set()
-            # Wait until at least 2 facts have been shown (or no facts were shown)
-            min_shown_event.wait(timeout=15)
-            loading_placeholder.empty()
+        # Stream the answer from the backend - SQL, rows and summary render as they arrive
+        result = _stream_answer(client, prompt, context, chat_container)
 
         # Distinguish HTTP/connection errors (error=True) from application-level errors
         is_http_error = result.get("error") is True
@@ -400,6 +388,50 @@ def render_chat_v2():
             st.rerun()
 
 
+def _stream_answer(client: APIClient, prompt: str, context: str, container) -> dict:
+    """Render a streamed V2 answer progressively and return the final response payload.
+
+    The loading facts are shown only until the first event arrives. The streamed
+    preview is replaced by the normal message rendering on the next rerun.
+    """
+    loading_placeholder = st.empty()
+    stop_event, _ = show_loading_with_facts(loading_placeholder)
+
+    with container:
+        with st.chat_message("assistant", avatar=None):
+            summary_box = st.empty()
+            sql_box = st.empty()
+            rows_box = st.empty()
+
+    summary_text = ""
+    result = {"error": True, "detail": "No response from backend"}
+    try:
+        for event, data in client.stream_message_v2(prompt, st.session_state.conversation_id_v2, context):
+            if not stop_event.is_set():
+                stop_event.set()
+                loading_placeholder.empty()
+
+            if event == "sql":
+                with sql_box.expander("🔍 SQL Query", expanded=False):
+                    st.code(data.get("sql", ""), language="sql")
+            elif event == "rows":
+                results = data.get("results") or {}
+                rows = results.get("rows", [])
+                if rows:
+                    with rows_box.expander(f"📊 Results ({results.get('row_count', len(rows))} rows)", expanded=True):
+                        st.dataframe(pd.DataFrame(rows), width="stretch", hide_index=True)
+            elif event == "summary_token":
+                summary_text += data.get("text", "")
+                summary_box.markdown(summary_text + "▌")
+            elif event == "done":
+                result = data
+    finally:
+        stop_event.set()
+        loading_placeholder.empty()
+
+    return result
+
+
 def build_context(messages: list) -> str:
     """Builds a short context string from the last few messages for the LLM."""
     if not messages:
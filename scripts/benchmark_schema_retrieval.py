@@ -0,0 +1,49 @@
+"""Benchmark schema retrieval: recall@k and latency of lexical, dense and hybrid modes.
+
+Usage:
+    python scripts/benchmark_schema_retrieval.py [--cases data/eval/schema_retrieval.json] [-k 8]
+
+The cases file is a JSON list of {"question": ..., "tables": ["db.table", ...]}.
+Dense retrieval needs the FAISS schema index and the embedding API; if either
+is unavailable the dense mode reports 0 recall and hybrid equals lexical.
+"""
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.sql.hybrid_retriever import get_hybrid_retriever
+
+DEFAULT_CASES = Path(__file__).parent.parent / "data" / "eval" / "schema_retrieval.json"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", default=str(DEFAULT_CASES), help="Labelled question -> tables JSON file")
+    parser.add_argument("-k", type=int, default=8, help="Cut-off for recall@k")
+    parser.add_argument("--show-misses", action="store_true", help="List tables each mode failed to retrieve")
+    args = parser.parse_args()
+
+    with open(args.cases) as f:
+        cases = json.load(f)
+
+    report = get_hybrid_retriever().benchmark(cases, k=args.k)
+
+    print(f"\n{len(cases)} cases, k={args.k}\n")
+    print(f"{'mode':<10}{'recall@' + str(args.k):>12}{'mean ms':>12}{'p95 ms':>12}")
+    for mode, stats in report.items():
+        print(f"{mode:<10}{stats[f'recall@{args.k}']:>12.3f}{stats['mean_ms']:>12.2f}{stats['p95_ms']:>12.2f}")
+
+    if args.show_misses:
+        for mode, stats in report.items():
+            if stats["misses"]:
+                print(f"\n{mode} misses:")
+                for question, tables in stats["misses"]:
+                    print(f"  {question!r}: {', '.join(tables)}")
+
+
+if __name__ == "__main__":
+    main()
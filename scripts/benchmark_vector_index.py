@@ -0,0 +1,65 @@
+"""Benchmark ANN index types against exact search for a vector store.
+
+Usage:
+    python scripts/benchmark_vector_index.py --store documents --type hnsw
+    python scripts/benchmark_vector_index.py --store schema --type ivf_flat --sweep 1,4,16
+    python scripts/benchmark_vector_index.py --store documents --set nprobe=16
+
+Reports recall@k (vs the exact flat index) and latency per query for each
+nprobe (IVF) or efSearch (HNSW) value. Queries are perturbed stored vectors,
+so no embedding API calls are made. --set persists a search parameter for the
+store's configured index type (FAISS_SCHEMA_INDEX_TYPE / FAISS_DOCUMENT_INDEX_TYPE).
+Partitioned stores (schema) also report searches restricted to one database.
+"""
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.cache.vector_store import get_schema_store, get_document_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--store", choices=["schema", "documents"], default="documents")
+    parser.add_argument("--type", dest="index_type", choices=["hnsw", "ivf_flat", "ivf_pq"],
+                        help="Index type to benchmark (default: the store's configured one)")
+    parser.add_argument("-k", type=int, default=10, help="Cut-off for recall@k")
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled queries")
+    parser.add_argument("--sweep", help="Comma-separated nprobe / efSearch values")
+    parser.add_argument("--set", dest="assignment", help="Persist a parameter, e.g. nprobe=16 or ef_search=128")
+    args = parser.parse_args()
+
+    store = get_schema_store() if args.store == "schema" else get_document_store()
+
+    if args.assignment:
+        if store.ann is None:
+            print(f"Store '{store.name}' uses exact search - set its index type first.")
+            sys.exit(1)
+        key, _, value = args.assignment.partition("=")
+        if key not in ("nprobe", "ef_search") or not value.isdigit():
+            print("--set expects nprobe=<int> or ef_search=<int>")
+            sys.exit(1)
+        store.ann.set_params(**{key: int(value)})
+        print(f"{store.name}: {key}={value} saved to {store.ann.params_path}")
+        return
+
+    sweep = [int(v) for v in args.sweep.split(",")] if args.sweep else None
+    report = store.benchmark_ann(args.index_type, k=args.k, n_queries=args.queries, sweep=sweep)
+    if not report:
+        print(f"Store '{store.name}' is empty.")
+        return
+
+    key = next(k for k in report[0] if k in ("nprobe", "ef_search"))
+    print(f"\n{store.name}: {store.count} vectors, k={args.k}\n")
+    print(f"{'index':<10}{key:>10}{'recall@' + str(args.k):>12}{'ms/query':>12}")
+    for row in report:
+        value = "-" if row[key] is None else row[key]
+        print(f"{row['index']:<10}{value:>10}{row[f'recall@{args.k}']:>12.3f}{row['ms_per_query']:>12.4f}")
+        if "full_k" in row:
+            print(f"{'':<10}{'':>10}  {row['full_k']:.1%} of single-partition searches returned k hits")
+
+
+if __name__ == "__main__":
+    main()
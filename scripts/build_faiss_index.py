@@ -121,9 +121,8 @@ def build_schema_index():
 
     # Build FAISS index
     store = get_schema_store()
-    store.clear()
-    print(f"\nGenerating embeddings for {len(texts)} tables...")
-    store.add(texts, metadata)
+    print(f"\nGenerating embeddings for new or changed tables ({len(texts)} total)...")
+    store.sync(texts, metadata)
     print(f"Schema FAISS index built with {store.count} entries.")
     return True
 
@@ -166,9 +165,8 @@ def build_document_index():
         })
 
     store = get_document_store()
-    store.clear()
-    print(f"  Generating embeddings for {len(texts)} document chunks...")
-    store.add(texts, metadata)
+    print(f"  Generating embeddings for new or changed document chunks ({len(texts)} total)...")
+    store.sync(texts, metadata)
     print(f"  Document FAISS index built with {store.count} entries.")
     return True
 
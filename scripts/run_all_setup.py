@@ -88,19 +88,21 @@ def verify_setup():
             print(f"  [MISSING] {name}: {path}")
             all_ok = False
 
-    # Check FAISS indexes
+    # Check vector indexes (FAISS .index, or .vectors.npy for the numpy backend)
     faiss_dir = settings.FAISS_INDEX_DIR
     faiss_files = [
-        ("Schema Index", os.path.join(faiss_dir, "schema_metadata.index")),
-        ("Document Index", os.path.join(faiss_dir, "document_chunks.index")),
+        ("Schema Index", "schema_metadata"),
+        ("Document Index", "document_chunks"),
     ]
 
-    for name, path in faiss_files:
-        if os.path.exists(path):
+    for name, store in faiss_files:
+        paths = [os.path.join(faiss_dir, f"{store}{ext}") for ext in (".index", ".vectors.npy")]
+        path = next((p for p in paths if os.path.exists(p)), None)
+        if path:
             size = os.path.getsize(path) / 1024
             print(f"  [OK] {name}: {path} ({size:.1f} KB)")
         else:
-            print(f"  [MISSING] {name}: {path}")
+            print(f"  [MISSING] {name}: {paths[0]}")
 
     return all_ok
 
@@ -0,0 +1,82 @@
+"""Regression tests for local follow-up edits (backend/sql/followup_editor.py)."""
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("sqlglot")
+
+from backend.sql.followup_editor import FollowupEditor  # noqa: E402
+
+
+COLUMNS = {
+    ("crew", "crew_members"): [
+        {"name": "employee_id", "data_type": "INTEGER"},
+        {"name": "status", "data_type": "TEXT"},
+        {"name": "role", "data_type": "TEXT"},
+        {"name": "hire_date", "data_type": "DATE"},
+    ],
+}
+PREVIOUS_SQL = "SELECT * FROM crew.crew_members WHERE status = 'Inactive';"
+
+
+class _Loader:
+    def get_table_info(self, db, table):
+        columns = COLUMNS.get((db, table))
+        return {"columns": columns} if columns is not None else None
+
+
+@pytest.fixture
+def editor():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("ATTACH DATABASE ':memory:' AS crew")
+    conn.execute("CREATE TABLE crew.crew_members (employee_id INTEGER, status TEXT, role TEXT, hire_date DATE)")
+    conn.executemany("INSERT INTO crew.crew_members VALUES (?, ?, ?, ?)", [
+        (1, "Active", "Captain", "2020-01-01"),
+        (2, "Inactive", "First Officer", "2018-05-01"),
+        (3, "Active", "Flight Attendant", "2021-03-15"),
+    ])
+
+    @contextmanager
+    def connection():
+        yield conn
+
+    editor = FollowupEditor(_Loader(), connection_factory=connection)
+    editor.enabled = True
+    yield editor
+    conn.close()
+
+
+@pytest.mark.parametrize("followup", [
+    "show only active pilots",   # "pilots" is not the crew_members entity - must not be dropped
+    "only active captains",      # two values from different columns
+    "only the active flights",   # noun naming another table
+])
+def test_unresolved_words_fall_back_to_llm(editor, followup):
+    assert editor.apply(followup, PREVIOUS_SQL) is None
+
+
+@pytest.mark.parametrize("followup", [
+    "only active",
+    "only active crew",
+    "only active crew members",
+    "only the active ones",
+])
+def test_entity_and_row_nouns_are_dropped(editor, followup):
+    edit = editor.apply(followup, PREVIOUS_SQL)
+    assert edit is not None
+    assert "status = 'Active'" in edit.sql
+    assert "Inactive" not in edit.sql
+
+
+def test_single_value_phrase(editor):
+    edit = editor.apply("only the captains", PREVIOUS_SQL)
+    assert edit is not None
+    assert "role = 'Captain'" in edit.sql
+    assert "status = 'Inactive'" in edit.sql
+
+
+def test_value_candidates_keep_unknown_nouns():
+    assert FollowupEditor._value_candidates("active pilots", {"crew", "member", "members"}) == [
+        "active pilots", "active pilot"]
+    assert "active" in FollowupEditor._value_candidates("active crew members", {"crew", "member", "members"})